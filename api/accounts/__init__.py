@@ -1,3 +1,4 @@
 from api.accounts.group import GroupDriver
 from api.accounts.tenancy import TenancyDriver
 from api.accounts.user import UserDriver
+from api.accounts.provision import Provisioner, read_roster
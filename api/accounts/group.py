@@ -46,9 +46,9 @@ class GroupDriver(BaseDriver):
         """Add a user member to group and return a response."""
         return self._put("membership", {"group_pk": key}, data)
 
-    def get_members(self, key: int) -> APIResponse:
+    def get_members(self, key: int, params: Dict[str, Any] = None) -> APIResponse:
         """Get members of the group and return a response."""
-        return self._get("membership", {"group_pk": key})
+        return self._get("membership", {"group_pk": key}, params)
 
     def delete(self, key: int) -> APIResponse:
         """Delete a user and return response."""
@@ -58,6 +58,6 @@ class GroupDriver(BaseDriver):
         """Get groups settings and return response."""
         return self._get("detail", {"group_pk": key})
 
-    def get_all_groups(self) -> APIResponse:
+    def get_all_groups(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get all groups settings and return response."""
-        return self._get("list")
+        return self._get("list", params=params)
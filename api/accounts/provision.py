@@ -0,0 +1,279 @@
+"""Provisioner class object"""
+from typing import Any, Callable, Dict, List, Set
+
+import csv
+import functools
+import json
+
+from api.accounts.group import GroupDriver
+from api.accounts.tenancy import TenancyDriver
+from api.accounts.user import UserDriver
+from api.bulk import BulkExecutor, BulkResult
+from api.driver import APIDriver
+from api.driver import APIResponse
+from api.pagination import Paginator
+
+
+class ProvisionError(RuntimeError):
+    """Raise exception when a roster cannot be read, SDI OS accounts cannot be listed or a tenancy is missing"""
+
+
+def read_roster(path: str) -> List[Dict[str, Any]]:
+    """Return the rows of a CSV or JSON roster file.
+
+    Each row is a user with at least a "username". "tenancy" is a tenancy
+    name and "groups" a list of group names, separated by ";" in CSV files.
+    Any other field is sent as is when the user is created or modified.
+    """
+    with open(path, newline="") as roster_file:
+        if path.lower().endswith(".json"):
+            rows = json.load(roster_file)
+            rows = rows.get("users", []) if isinstance(rows, dict) else rows
+        else:
+            rows = [{field: value for field, value in row.items() if field and value not in (None, "")}
+                    for row in csv.DictReader(roster_file)]
+    for row in rows:
+        if not row.get("username"):
+            raise ProvisionError("Roster {} has a row without username: {}".format(path, row))
+        if isinstance(row.get("groups"), str):
+            row["groups"] = [name.strip() for name in row["groups"].split(";") if name.strip()]
+    return rows
+
+
+def get_unique_rows(roster: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return the rows of a roster with one row per username, in first seen order.
+
+    Fields of later duplicate rows override earlier ones and their groups are added.
+    """
+    rows = {} # type: Dict[str, Dict[str, Any]]
+    for row in roster:
+        merged = rows.get(row["username"])
+        if merged is None:
+            rows[row["username"]] = dict(row)
+            continue
+        groups = list(merged.get("groups") or [])
+        groups.extend(group for group in row.get("groups") or [] if group not in groups)
+        merged.update(row)
+        if groups:
+            merged["groups"] = groups
+    return list(rows.values())
+
+
+def get_pk(item: Any) -> Any:
+    """Return the pk of an account list item or nested account."""
+    return item.get("pk", item.get("id")) if isinstance(item, dict) else item
+
+
+class ProvisionPlan:
+    """Changes needed to bring SDI OS accounts in line with a roster"""
+
+    def __init__(self) -> None:
+        self.tenancies = [] # type: List[str]
+        self.groups = [] # type: List[str]
+        self.creates = [] # type: List[Dict[str, Any]]
+        self.updates = {} # type: Dict[str, Dict[str, Any]]
+        self.members = {} # type: Dict[str, Set[str]]
+        self.user_pks = {} # type: Dict[str, int]
+        self.group_pks = {} # type: Dict[str, int]
+        self.tenancy_pks = {} # type: Dict[str, int]
+        self.existing_members = {} # type: Dict[str, Set[int]]
+
+    def __str__(self) -> str:
+        padding = 15
+        return "\n {:>{pad}}: {}\n".format("New Tenancies", len(self.tenancies), pad=padding) + \
+               " {:>{pad}}: {}\n".format("New Groups", len(self.groups), pad=padding) + \
+               " {:>{pad}}: {}\n".format("New Users", len(self.creates), pad=padding) + \
+               " {:>{pad}}: {}\n".format("Modified Users", len(self.updates), pad=padding) + \
+               " {:>{pad}}: {}\n".format("New Memberships", sum(len(names) for names in self.members.values()), pad=padding)
+
+    @property
+    def empty(self) -> bool:
+        """True if SDI OS already matches the roster."""
+        return not (self.tenancies or self.groups or self.creates or self.updates or self.members)
+
+
+class ProvisionReport:
+    """Results of applying a ProvisionPlan"""
+
+    def __init__(self, plan: ProvisionPlan) -> None:
+        self.plan = plan
+        self.tenancies = [] # type: List[BulkResult]
+        self.groups = [] # type: List[BulkResult]
+        self.users = [] # type: List[BulkResult]
+        self.members = [] # type: List[BulkResult]
+        self.logins = [] # type: List[BulkResult]
+
+    @property
+    def failed(self) -> List[BulkResult]:
+        """Results of every call that failed."""
+        return [result for results in (self.tenancies, self.groups, self.users, self.members, self.logins)
+                for result in results if not result.ok]
+
+
+class Provisioner:
+    """Create and update users, groups and tenancies from a roster.
+
+    plan lists users, groups and tenancies once, concurrently, and diffs the
+    roster against them, so the cost grows with the roster and not with
+    roster size times user count. apply then creates missing tenancies, then
+    groups, then creates and modifies users, then adds group members, each
+    step concurrently, and finally creates one time logins for the new users.
+    Existing accounts are never deleted.
+    """
+    _special_fields = ("username", "password", "groups", "tenancy")
+    _case_insensitive_fields = ("email",)
+    _members_field = "members"
+
+    def __init__(self, api_driver: APIDriver, max_workers: int = None) -> None:
+        """Initialize Provisioner class object
+
+        :param api_driver: Allows Provisioner to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        :param max_workers: Most calls at once. Default is settings BULK_WORKERS.
+        :type max_workers: int
+        """
+        self.api_driver = api_driver
+        self.__executor = BulkExecutor(max_workers)
+
+    def run(self, roster: List[Dict[str, Any]], logins: bool = True, login_expires: int = 900) -> ProvisionReport:
+        """Plan and apply a roster and return the report."""
+        return self.apply(self.plan(roster), logins, login_expires)
+
+    def plan(self, roster: List[Dict[str, Any]]) -> ProvisionPlan:
+        """Return the changes needed to bring SDI OS in line with roster. Duplicate usernames are merged."""
+        roster = get_unique_rows(roster)
+        listed = self.__executor.map(lambda list_method: list(Paginator(list_method)), [
+            UserDriver(self.api_driver).get_all_users, GroupDriver(self.api_driver).get_all_groups,
+            TenancyDriver(self.api_driver).get_all_tenancies])
+        for result in listed:
+            if not result.ok:
+                raise ProvisionError("Failure to list accounts: {}".format(result.error))
+        users = {user["username"]: user for user in listed[0].value}
+        plan = ProvisionPlan()
+        plan.user_pks = {name: get_pk(user) for name, user in users.items()}
+        plan.group_pks = {group["name"]: get_pk(group) for group in listed[1].value}
+        plan.tenancy_pks = {tenancy["name"]: get_pk(tenancy) for tenancy in listed[2].value}
+
+        for row in roster:
+            tenancy = row.get("tenancy")
+            if tenancy is not None and tenancy not in plan.tenancy_pks and tenancy not in plan.tenancies:
+                plan.tenancies.append(tenancy)
+            for group in row.get("groups") or []:
+                if group not in plan.group_pks and group not in plan.groups:
+                    plan.groups.append(group)
+                plan.members.setdefault(group, set()).add(row["username"])
+
+            user = users.get(row["username"])
+            if user is None:
+                plan.creates.append(row)
+                continue
+            changes = self.get_changes(row, user, plan.tenancy_pks)
+            if changes:
+                plan.updates[row["username"]] = changes
+
+        existing_groups = [name for name in plan.members if name in plan.group_pks]
+        fetched = self.__executor.map(lambda name: self.__get_members(plan.group_pks[name]), existing_groups)
+        for result in fetched:
+            if not result.ok:
+                raise ProvisionError("Failure to list members of group {}: {}".format(result.item, result.error))
+            plan.existing_members[result.item] = result.value
+            pks = result.value
+            plan.members[result.item] = {name for name in plan.members[result.item] if plan.user_pks.get(name) not in pks}
+        plan.members = {group: names for group, names in plan.members.items() if names}
+        return plan
+
+    def apply(self, plan: ProvisionPlan, logins: bool = True, login_expires: int = 900) -> ProvisionReport:
+        """Make the changes of plan and return the report.
+
+        A user whose tenancy could not be created is reported as failed and
+        not sent, so an existing user keeps their tenancy.
+
+        :param plan: Changes returned by plan.
+        :type plan: ProvisionPlan
+        :param logins: Create a one time login for each new user.
+        :type logins: bool
+        :param login_expires: Seconds until the one time logins expire.
+        :type login_expires: int
+        """
+        report = ProvisionReport(plan)
+        tenancy_driver = TenancyDriver(self.api_driver)
+        report.tenancies = self.__executor.map(lambda name: tenancy_driver.create({"name": name}), plan.tenancies)
+        self.__record_pks(report.tenancies, plan.tenancy_pks, tenancy_driver.get_all_tenancies)
+
+        group_driver = GroupDriver(self.api_driver)
+        report.groups = self.__executor.map(lambda name: group_driver.create({"name": name}), plan.groups)
+        self.__record_pks(report.groups, plan.group_pks, group_driver.get_all_groups)
+
+        user_driver = UserDriver(self.api_driver)
+        creates = self.__executor.map(lambda row: user_driver.create(self.__get_user_data(row, plan)), plan.creates)
+        self.__record_pks(creates, plan.user_pks, user_driver.get_all_users, "username")
+        updates = self.__executor.map(
+            lambda name: user_driver.modify(plan.user_pks[name], self.__get_user_data(plan.updates[name], plan)),
+            list(plan.updates))
+        report.users = creates + updates
+
+        groups = [group for group in plan.members if group in plan.group_pks]
+        report.members = self.__executor.map(lambda group: self.__add_members(group, plan), groups)
+
+        if logins:
+            created = [result.item["username"] for result in creates
+                       if result.ok and plan.user_pks.get(result.item["username"]) is not None]
+            report.logins = self.__executor.map(
+                lambda name: self.api_driver.create_one_time_login(plan.user_pks[name], login_expires), created)
+        return report
+
+    @classmethod
+    def get_changes(cls, row: Dict[str, Any], user: Dict[str, Any], tenancy_pks: Dict[str, int]) -> Dict[str, Any]:
+        """Return the fields of a roster row that differ from the existing user, with the tenancy by name.
+
+        Values are compared exactly, except _case_insensitive_fields and
+        boolean fields, which CSV rosters hold as text like "true".
+        """
+        changes = {}
+        for field, value in row.items():
+            if field in cls._special_fields or field not in user:
+                continue
+            current = user[field]
+            if isinstance(current, bool):
+                same = current == (str(value).strip().lower() in ("true", "1", "yes"))
+            elif field in cls._case_insensitive_fields:
+                same = str(current).lower() == str(value).lower()
+            else:
+                same = str(current) == str(value)
+            if not same:
+                changes[field] = value
+        tenancy = row.get("tenancy")
+        if tenancy is not None and (tenancy not in tenancy_pks or get_pk(user.get("tenancy")) != tenancy_pks[tenancy]):
+            changes["tenancy"] = tenancy
+        return changes
+
+    @staticmethod
+    def __get_user_data(row: Dict[str, Any], plan: ProvisionPlan) -> Dict[str, Any]:
+        data = {field: value for field, value in row.items() if field not in ("groups", "tenancy")}
+        if row.get("tenancy") is not None:
+            pk = plan.tenancy_pks.get(row["tenancy"])
+            if pk is None:
+                raise ProvisionError("Tenancy {} was not created".format(row["tenancy"]))
+            data["tenancy"] = pk
+        return data
+
+    def __get_members(self, group_pk: int) -> Set[int]:
+        return {get_pk(member) for member in Paginator(functools.partial(GroupDriver(self.api_driver).get_members, group_pk))}
+
+    def __add_members(self, group: str, plan: ProvisionPlan) -> APIResponse:
+        pks = set(plan.existing_members.get(group, ()))
+        pks.update(plan.user_pks[name] for name in plan.members[group] if plan.user_pks.get(name) is not None)
+        return GroupDriver(self.api_driver).modify_members(plan.group_pks[group], {self._members_field: sorted(pks)})
+
+    @staticmethod
+    def __record_pks(results: List[BulkResult], pks: Dict[str, Any], list_method: Callable[..., APIResponse], field: str = "name") -> None:
+        missing = False
+        for result in results:
+            name = result.item[field] if isinstance(result.item, dict) else result.item
+            pk = get_pk(result.value.detail) if result.ok and isinstance(result.value.detail, dict) else None
+            if pk is not None:
+                pks[name] = pk
+            elif result.ok:
+                missing = True
+        if missing:
+            pks.update({item[field]: get_pk(item) for item in Paginator(list_method)})
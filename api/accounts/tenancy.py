@@ -51,6 +51,6 @@ class TenancyDriver(BaseDriver):
         """Modify a tenancy's secuity settings and return response."""
         return self._put("security", {"ten_pk": key}, data)
 
-    def get_all_tenancies(self) -> APIResponse:
+    def get_all_tenancies(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get all tenancies in SDI OS and return response."""
-        return self._get("list")
+        return self._get("list", params=params)
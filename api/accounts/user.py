@@ -50,13 +50,13 @@ class UserDriver(BaseDriver):
         """Get user's settings and return response."""
         return self._get("detail", {"pk": key})
 
-    def get_all_users(self) -> APIResponse:
+    def get_all_users(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get all users in SDI OS and return response."""
-        return self._get("list")
+        return self._get("list", params=params)
 
     def get_user_pk(self, username: str) -> Optional[int]:
         """Search through get all users and find pk of the matching username."""
-        response = self.get_all_users()
+        response = self.get_all_users({"username": username})
         if response.ok:
             user_list = response.detail
             for user in user_list:
@@ -64,14 +64,14 @@ class UserDriver(BaseDriver):
                     return int(user["pk"])
         return None
 
-    def get_shared_networks(self, key: int) -> APIResponse:
+    def get_shared_networks(self, key: int, params: Dict[str, Any] = None) -> APIResponse:
         """Get networks shared with user and return response."""
-        return self._get("sharing_networks", {"pk": key})
+        return self._get("sharing_networks", {"pk": key}, params)
 
-    def get_shared_sdis(self, key: int) -> APIResponse:
+    def get_shared_sdis(self, key: int, params: Dict[str, Any] = None) -> APIResponse:
         """Get SDIs shared with user and return response."""
-        return self._get("sharing_sdis", {"pk": key})
+        return self._get("sharing_sdis", {"pk": key}, params)
 
-    def get_shared_disks(self, key: int) -> APIResponse:
+    def get_shared_disks(self, key: int, params: Dict[str, Any] = None) -> APIResponse:
         """Get disks shared with user and return response."""
-        return self._get("sharing_disks", {"pk": key})
+        return self._get("sharing_disks", {"pk": key}, params)
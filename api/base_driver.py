@@ -12,11 +12,16 @@ class BaseDriver:
     def __init__(self, api_driver: APIDriver) -> None:
         self.__api_driver = api_driver
 
+    @property
+    def api_driver(self) -> APIDriver:
+        """APIDriver object the driver makes its calls through."""
+        return self.__api_driver
+
     def __url(self, name: str) -> Dict[Tuple[str, str], str]:
         return urls.API_URLS[self._category][name]["url"]
 
-    def _get(self, name: str, url_args: Dict[str, Any] = None) -> APIResponse:
-        return self.__api_driver.get(self.__url(name), url_args)
+    def _get(self, name: str, url_args: Dict[str, Any] = None, params: Dict[str, Any] = None) -> APIResponse:
+        return self.__api_driver.get(self.__url(name), url_args, params)
 
     def _post(self, name: str, url_args: Dict[str, Any] = None, data: Dict[str, Any] = None) -> APIResponse:
         return self.__api_driver.post(self.__url(name), url_args, data)
@@ -0,0 +1,88 @@
+"""BulkExecutor class object"""
+from typing import Any, Callable, Iterable, List
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import settings.general as g_settings
+from api import deadline
+
+
+class BulkResult:
+    """Outcome of one item of a bulk operation"""
+
+    def __init__(self, item: Any, value: Any = None, error: BaseException = None) -> None:
+        """Initialize BulkResult class object
+
+        :param item: Item the operation was run on.
+        :type item: Any
+        :param value: Value returned by the operation, usually an APIResponse.
+        :type value: Any
+        :param error: Exception raised by the operation, if any.
+        :type error: BaseException
+        """
+        self.item = item
+        self.value = value
+        self.error = error
+
+    def __repr__(self) -> str:
+        outcome = "error={!r}".format(self.error) if self.error is not None else "ok={}".format(self.ok)
+        return "<BulkResult {!r} {}>".format(self.item, outcome)
+
+    @property
+    def ok(self) -> bool:
+        """True if the operation did not raise and its response, if any, is ok."""
+        return self.error is None and getattr(self.value, "ok", True)
+
+
+class BulkExecutor:
+    """Run an operation over many items in threads, at most max_workers at a time.
+
+    Results are returned in the order of the items. Exceptions are captured in
+    the results instead of stopping the other items. With stagger set, item n
+    starts no earlier than n * stagger seconds after the first, so a burst of
+    heavy operations does not hit SDI OS at the same instant.
+
+    Items run under the api.deadline.Deadline of the thread calling map.
+    Once it is exceeded, items not started yet are not run and get a
+    DeadlineExceededError result.
+    """
+
+    def __init__(self, max_workers: int = None, stagger: float = 0.0) -> None:
+        """Initialize BulkExecutor class object
+
+        :param max_workers: Most operations running at once. Default is settings BULK_WORKERS.
+        :type max_workers: int
+        :param stagger: Seconds between the starts of consecutive items.
+        :type stagger: float
+        """
+        self.max_workers = max_workers or g_settings.BULK_WORKERS
+        self.stagger = stagger
+
+    def map(self, function: Callable[[Any], Any], items: Iterable[Any]) -> List[BulkResult]:
+        """Call function on every item and return their results."""
+        items = list(items)
+        if not items:
+            return []
+        start = time.monotonic()
+        call = deadline.bind(lambda index: self.__call(function, items[index], start + index * self.stagger))
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(call, range(len(items))))
+
+    @staticmethod
+    def __call(function: Callable[[Any], Any], item: Any, not_before: float) -> BulkResult:
+        delay = not_before - time.monotonic()
+        if delay > 0:
+            left = deadline.remaining()
+            time.sleep(delay if left is None else min(delay, left))
+        try:
+            deadline.check()
+            return BulkResult(item, function(item))
+        except Exception as err:  # pylint: disable=broad-except
+            return BulkResult(item, error=err)
+
+
+def get_failed(results: Iterable[BulkResult]) -> List[BulkResult]:
+    """Return the results that are not ok."""
+    return [result for result in results if not result.ok]
+
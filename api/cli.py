@@ -0,0 +1,180 @@
+"""sdios command line interface
+
+Subcommands are generated from settings.urls.API_URLS: one per API category
+and, below it, one per URL name. URL arguments become options:
+
+    sdios sdis status --sdi-id 74e9bd22-1ac1-47d6-9381-5d6b6505ff78
+    sdios disks list --param name=blank
+    sdios sdis checkpoint -X POST --pk 2 --sdi-id ... --data '{"tag": "before"}'
+
+Only the parser of the selected category is built, and api.driver (which
+imports requests) is only imported to make a call, so "sdios --help" starts
+quickly. With --daemon, calls go through a running SDK daemon instead of
+creating a token.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import argparse
+import os
+import re
+import sys
+
+import settings.urls as urls
+
+ENV_PREFIX = "SDIOS_"
+URL_ARG = re.compile(r"{(\w+)}")
+
+
+def get_command_name(name: str) -> str:
+    """Return the command line spelling of a category or URL name."""
+    return name.lower().replace(" ", "-").replace("_", "-")
+
+
+def get_categories() -> Dict[str, urls.APICategory]:
+    """Return the API categories by command name."""
+    return {get_command_name(category.value): category for category in urls.APICategory}
+
+
+def get_url_args(url_dict: Dict[Tuple[str, ...], str]) -> List[str]:
+    """Return the names of all arguments used by any version of a URL."""
+    names = [] # type: List[str]
+    for url in url_dict.values():
+        for name in URL_ARG.findall(url):
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def get_flag(name: str) -> bool:
+    """Return the boolean value of an SDIOS_* environment variable, False when unset."""
+    value = os.environ.get(ENV_PREFIX + name, "").strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("", "0", "false", "no", "off"):
+        return False
+    raise SystemExit("sdios: environment variable {} must be true or false, got {!r}".format(ENV_PREFIX + name, value))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the top level parser, with the API categories as commands."""
+    parser = argparse.ArgumentParser(prog="sdios", description="Make SDI OS API calls.")
+    parser.add_argument("--domain", default=os.environ.get(ENV_PREFIX + "DOMAIN"),
+                        help="IP address or domain name of SDI OS (env SDIOS_DOMAIN)")
+    parser.add_argument("--api-version", default=os.environ.get(ENV_PREFIX + "API_VERSION"),
+                        help="API version, e.g. 2.1.0 (env SDIOS_API_VERSION)")
+    parser.add_argument("--daemon", action="store_true", default=get_flag("DAEMON"),
+                        help="make the call through a running SDK daemon (env SDIOS_DAEMON)")
+    parser.add_argument("--json", action="store_true", help="print only the JSON detail of the response")
+    parser.add_argument("category", choices=sorted(get_categories()), metavar="category",
+                        help="one of: " + ", ".join(sorted(get_categories())))
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="URL name and its options, see sdios <category> --help")
+    return parser
+
+
+def build_category_parser(category: urls.APICategory) -> argparse.ArgumentParser:
+    """Return the parser of one API category, with its URL names as commands."""
+    parser = argparse.ArgumentParser(prog="sdios " + get_command_name(category.value),
+                                     description="SDI OS {} API calls.".format(category.value))
+    commands = parser.add_subparsers(dest="name", metavar="name")
+    commands.required = True
+    for name, endpoint in urls.API_URLS[category].items():
+        methods = endpoint["methods"]
+        command = commands.add_parser(get_command_name(name), help=", ".join(methods),
+                                      description="{} {} ({})".format(category.value, name, ", ".join(methods)))
+        command.set_defaults(endpoint=name)
+        command.add_argument("-X", "--method", choices=methods, type=str.upper,
+                             default="GET" if "GET" in methods else methods[0])
+        for url_arg in get_url_args(endpoint["url"]):
+            command.add_argument("--" + get_command_name(url_arg), dest="url_" + url_arg, metavar=url_arg.upper())
+        command.add_argument("--param", action="append", default=[], metavar="NAME=VALUE", help="query parameter")
+        command.add_argument("--data", help="JSON request body, or @path of a JSON file")
+        command.add_argument("--file", action="append", default=[], metavar="FIELD=PATH", help="file to upload")
+    return parser
+
+
+def get_credentials() -> Dict[str, str]:
+    """Return the API credentials from the SDIOS_* environment variables, prompting for a missing password."""
+    credentials = {}
+    for name in ("username", "password", "client_id", "client_secret"):
+        value = os.environ.get(ENV_PREFIX + name.upper())
+        if value is None and name == "password":
+            import getpass
+            value = getpass.getpass("SDI OS password: ")
+        if value is None:
+            raise SystemExit("sdios: environment variable {} is not set".format(ENV_PREFIX + name.upper()))
+        credentials[name] = value
+    return credentials
+
+
+def get_data(value: Optional[str]) -> Any:
+    """Return the request body of a --data option."""
+    if value is None:
+        return None
+    import json
+    if value.startswith("@"):
+        with open(value[1:]) as data_file:
+            return json.load(data_file)
+    return json.loads(value)
+
+
+def split_pairs(pairs: List[str]) -> Dict[str, str]:
+    """Return a dict of NAME=VALUE options."""
+    result = {}
+    for pair in pairs:
+        name, separator, value = pair.partition("=")
+        if not separator:
+            raise SystemExit("sdios: expected NAME=VALUE, got {!r}".format(pair))
+        result[name] = value
+    return result
+
+
+def call(options: argparse.Namespace, category: urls.APICategory, command: argparse.Namespace) -> Any:
+    """Make the API call selected on the command line and return its response."""
+    if options.domain is None:
+        raise SystemExit("sdios: --domain or environment variable SDIOS_DOMAIN is required")
+    if options.daemon:
+        from api.daemon import DaemonClient
+        api_driver = DaemonClient().api_driver(options.domain, get_credentials(), options.api_version)
+    else:
+        from api.driver import APIDriver
+        api_driver = APIDriver(options.domain, get_credentials(), options.api_version)
+
+    url_dict = urls.API_URLS[category][command.endpoint]["url"]
+    url_args = {name[4:]: value for name, value in vars(command).items() if name.startswith("url_") and value is not None}
+    params = split_pairs(command.param) or None
+    data = get_data(command.data)
+    method = command.method
+    if method == "GET":
+        return api_driver.get(url_dict, url_args, params)
+    if method == "POST":
+        return api_driver.post(url_dict, url_args, data)
+    if method == "PUT":
+        from contextlib import ExitStack
+        with ExitStack() as stack:
+            files = {field: stack.enter_context(open(path, "rb")) for field, path in split_pairs(command.file).items()} or None
+            return api_driver.put(url_dict, url_args, data, files)
+    if method == "DELETE":
+        return api_driver.delete(url_dict, url_args)
+    if method == "HEAD":
+        return api_driver.head(url_dict, url_args)
+    return api_driver.options(url_dict, url_args)
+
+
+def main(argv: List[str] = None) -> int:
+    """Run the sdios command line and return the exit status."""
+    options = build_parser().parse_args(argv)
+    category = get_categories()[options.category]
+    command = build_category_parser(category).parse_args(options.args)
+
+    response = call(options, category, command)
+    if options.json:
+        import json
+        import settings.general as g_settings
+        sys.stdout.write(json.dumps(response.detail, indent=g_settings.JSON_FORMAT_INDENT) + "\n")
+    else:
+        print(response)
+    return 0 if response.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,438 @@
+"""SDK daemon and client shim
+
+The daemon is a long lived local process holding authenticated APIDrivers,
+their pooled connections and caches. Short lived scripts talk to it over a
+Unix domain socket through DaemonClient, which keeps the same method surface
+as the drivers without importing requests or creating a token:
+
+    $ python3 -m api.daemon &
+
+    >>> from api.daemon import DaemonClient
+    >>> client = DaemonClient()
+    >>> api_driver = client.api_driver("192.168.1.101", credentials, "2.1.0")
+    >>> sdi_driver = api_driver.driver("SDIDriver")
+    >>> sdi_driver.user_pk = 2
+    >>> print(sdi_driver.get_status("74e9bd22-1ac1-47d6-9381-5d6b6505ff78"))
+
+Only public methods of APIDriver and the driver classes of the api packages
+can be called. The socket is only accessible by its owner and connections
+must present the key the daemon writes next to it.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import hashlib
+import json
+import os
+import threading
+from multiprocessing import AuthenticationError
+from pickle import PicklingError
+from multiprocessing.connection import Client, Connection, Listener
+
+import settings.general as g_settings
+
+DRIVER_PACKAGES = ("api.accounts", "api.sdis", "api.sdis.machine_components", "api.sharing.driver", "api.storage", "api.system")
+
+
+class DaemonError(RuntimeError):
+    """Raise exception when the daemon cannot be reached or a remote call fails"""
+
+
+def get_key_path(socket_path: str) -> str:
+    """Return the path of the file holding the connection key of socket_path."""
+    return socket_path + ".key"
+
+
+class RemoteResponse:
+    """Copy of an APIResponse returned by the daemon"""
+    def __init__(self, state: Dict[str, Any]) -> None:
+        self.__state = state
+
+    def __str__(self) -> str:
+        padding = 11
+        return " {:>{pad}}: {}\n".format("Detail", json.dumps(self.detail, indent=g_settings.JSON_FORMAT_INDENT), pad=padding) + \
+               " {:>{pad}}: {}\n".format("Method", self.method, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Status Code", self.status_code, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Reason", self.reason, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Ok", self.ok, pad=padding) + \
+               " {:>{pad}}: {}\n".format("URL", self.url, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Allow", self.allow, pad=padding)
+
+    @property
+    def status_code(self) -> int:
+        """Integer Code of responded HTTP Status, e.g. 404 or 200"""
+        return self.__state["status_code"]
+
+    @property
+    def reason(self) -> str:
+        """Textual reason of responded HTTP Status, e.g. “Not Found” or “OK”."""
+        return self.__state["reason"]
+
+    @property
+    def url(self) -> str:
+        """Final URL location of the response"""
+        return self.__state["url"]
+
+    @property
+    def method(self) -> str:
+        """HTTP verb sent to the server"""
+        return self.__state["method"]
+
+    @property
+    def ok(self) -> bool:
+        """Returns True if status_code is less than 400, False if not."""
+        return self.__state["ok"]
+
+    @property
+    def allow(self) -> List[str]:
+        """List of the set of methods supported by the resource."""
+        return self.__state["allow"]
+
+    @property
+    def from_cache(self) -> bool:
+        """True if the daemon's APIDriver answered from its validator cache."""
+        return self.__state["from_cache"]
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Response headers"""
+        return self.__state["headers"]
+
+    @property
+    def content(self) -> bytes:
+        """Raw response body"""
+        return self.__state["content"]
+
+    @property
+    def detail(self) -> Any:
+        """Returns the json-encoded content of the response, if any."""
+        try:
+            return json.loads(self.content.decode("utf-8"))
+        except (ValueError, UnicodeDecodeError):
+            pass
+        return None
+
+
+class SDKDaemon:
+    """Serve APIDrivers and drivers over a Unix domain socket."""
+
+    def __init__(self, socket_path: str = None) -> None:
+        """Initialize SDKDaemon class object
+
+        :param socket_path: Path of the Unix domain socket. Default is settings DAEMON_SOCKET.
+        :type socket_path: str
+        """
+        self.socket_path = socket_path or g_settings.DAEMON_SOCKET
+        self.__api_drivers = {} # type: Dict[str, Any]
+        self.__credentials = {} # type: Dict[str, str]
+        self.__lock = threading.Lock()
+        self.__listener = None # type: Optional[Listener]
+        self.__stopped = threading.Event()
+        self.__driver_classes = self.__load_driver_classes()
+
+    def serve_forever(self) -> None:
+        """Accept client connections until stop is called or a client sends "stop"."""
+        directory = os.path.dirname(self.socket_path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        authkey = os.urandom(32)
+        key_path = get_key_path(self.socket_path)
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as key_file:
+            key_file.write(authkey)
+
+        old_umask = os.umask(0o177)
+        try:
+            self.__listener = Listener(self.socket_path, family="AF_UNIX", authkey=authkey)
+        finally:
+            os.umask(old_umask)
+
+        try:
+            while not self.__stopped.is_set():
+                try:
+                    conn = self.__listener.accept()
+                except (OSError, EOFError, AuthenticationError):
+                    if self.__stopped.is_set():
+                        break
+                    continue
+                threading.Thread(target=self.__serve, args=(conn,), daemon=True).start()
+        finally:
+            self.__close()
+
+    def stop(self) -> None:
+        """Stop accepting connections."""
+        self.__stopped.set()
+        if self.__listener is not None:
+            # Wake up accept() so serve_forever can exit.
+            try:
+                Client(self.socket_path, family="AF_UNIX", authkey=b"").close()
+            except (OSError, EOFError, AuthenticationError):
+                pass
+
+    def __close(self) -> None:
+        if self.__listener is not None:
+            self.__listener.close()
+            self.__listener = None
+        for path in (self.socket_path, get_key_path(self.socket_path)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self.__lock:
+            for api_driver in self.__api_drivers.values():
+                api_driver.session.close()
+            self.__api_drivers.clear()
+
+    def __serve(self, conn: Connection) -> None:
+        with conn:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    result = ("ok", self.__handle(message))
+                except Exception as err:  # pylint: disable=broad-except
+                    result = ("error", "{}: {}".format(type(err).__name__, err))
+                try:
+                    conn.send(result)
+                except (PicklingError, TypeError, AttributeError) as err:
+                    # Nothing was written yet: results are pickled before they are sent
+                    error = DaemonError("Result of type {} cannot be sent: {}".format(type(result[1]).__name__, err))
+                    try:
+                        conn.send(("error", "{}: {}".format(type(error).__name__, error)))
+                    except (OSError, ValueError):
+                        return
+                except (OSError, ValueError):
+                    return
+                if message[0] == "stop":
+                    self.stop()
+                    return
+
+    def __handle(self, message: Tuple[Any, ...]) -> Any:
+        command = message[0]
+        if command == "login":
+            return self.__login(*message[1:])
+        if command == "call":
+            return self.__call(*message[1:])
+        if command == "ping" or command == "stop":
+            return command
+        raise DaemonError("Unknown command {!r}".format(command))
+
+    def __login(self, domain: str, credentials: Dict[str, str], api_version: Optional[str]) -> str:
+        from api.driver import APIDriver
+
+        driver_id = "{}|{}|{}".format(domain, credentials["username"], api_version)
+        secret = hashlib.sha256(json.dumps(credentials, sort_keys=True).encode("utf-8")).hexdigest()
+        with self.__lock:
+            if driver_id in self.__api_drivers:
+                if self.__credentials[driver_id] != secret:
+                    raise DaemonError("Credentials do not match the logged in APIDriver for {}".format(driver_id))
+                return driver_id
+            self.__api_drivers[driver_id] = APIDriver(domain, credentials, api_version)
+            self.__credentials[driver_id] = secret
+        return driver_id
+
+    def __call(self, driver_id: str, class_name: str, attributes: Dict[str, Any], method: str,
+               args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        from api.driver import APIResponse
+
+        with self.__lock:
+            if driver_id not in self.__api_drivers:
+                raise DaemonError("Not logged in: {}".format(driver_id))
+            api_driver = self.__api_drivers[driver_id]
+
+        if class_name == "APIDriver":
+            target = api_driver
+        elif class_name in self.__driver_classes:
+            target = self.__driver_classes[class_name](api_driver)
+            for name, value in attributes.items():
+                setattr(target, name, value)
+        else:
+            raise DaemonError("Unknown driver {!r}".format(class_name))
+
+        for name in method.split("."):
+            if name.startswith("_"):
+                raise DaemonError("Private attribute {!r} cannot be called".format(method))
+            target = getattr(target, name)
+        result = target(*args, **kwargs)
+
+        if isinstance(result, APIResponse):
+            return RemoteResponse({
+                "status_code": result.status_code,
+                "reason": result.reason,
+                "url": result.url,
+                "method": result.method,
+                "ok": result.ok,
+                "allow": result.allow,
+                "from_cache": result.from_cache,
+                "headers": dict(result.response.headers),
+                "content": result.response.content,
+            })
+        return result
+
+    @staticmethod
+    def __load_driver_classes() -> Dict[str, type]:
+        import importlib
+        from api.base_driver import BaseDriver
+
+        classes = {}
+        for package in DRIVER_PACKAGES:
+            module = importlib.import_module(package)
+            for name, value in vars(module).items():
+                if isinstance(value, type) and issubclass(value, BaseDriver) and name.endswith("Driver"):
+                    classes[name] = value
+        return classes
+
+
+class RemoteMember:
+    """Callable proxy of a driver method or sub-driver served by the daemon"""
+    def __init__(self, driver: "RemoteDriver", path: str) -> None:
+        self.__driver = driver
+        self.__path = path
+
+    def __getattr__(self, name: str) -> "RemoteMember":
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return RemoteMember(self.__driver, self.__path + "." + name)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.__driver.call(self.__path, *args, **kwargs)
+
+
+class RemoteDriver:
+    """Client side stand-in for a driver class, e.g. RemoteDriver(api_driver, "SDIDriver").
+
+    Attributes such as user_pk and sdi_pk are kept locally and sent with every
+    call, so the daemon never holds per-script state.
+    """
+    _state_attributes = ("user_pk", "sdi_pk", "tenancy_pk")
+
+    def __init__(self, api_driver: "RemoteAPIDriver", class_name: str) -> None:
+        object.__setattr__(self, "_RemoteDriver__api_driver", api_driver)
+        object.__setattr__(self, "_RemoteDriver__class_name", class_name)
+        object.__setattr__(self, "_RemoteDriver__attributes", {name: None for name in self._state_attributes})
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        attributes = self.__attributes
+        if name in attributes:
+            return attributes[name]
+        return RemoteMember(self, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self.__attributes[name] = value
+
+    def clear(self) -> None:
+        """Clear pks."""
+        for name in self.__attributes:
+            self.__attributes[name] = None
+
+    def call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Call a method of the driver in the daemon and return its result."""
+        attributes = {name: value for name, value in self.__attributes.items() if value is not None}
+        return self.__api_driver.request("call", self.__class_name, attributes, method, args, kwargs)
+
+
+class RemoteAPIDriver:
+    """Client side stand-in for an APIDriver logged in by the daemon"""
+    def __init__(self, client: "DaemonClient", driver_id: str) -> None:
+        self.__client = client
+        self.driver_id = driver_id
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return RemoteMember(RemoteDriver(self, "APIDriver"), name)
+
+    def driver(self, class_name: str) -> RemoteDriver:
+        """Return a RemoteDriver for a driver class name, e.g. "MachineDriver"."""
+        return RemoteDriver(self, class_name)
+
+    def request(self, command: str, *args: Any) -> Any:
+        """Send a command for this APIDriver to the daemon and return the result."""
+        return self.__client.request(command, self.driver_id, *args)
+
+
+class DaemonClient:
+    """Connection to a running SDKDaemon."""
+
+    def __init__(self, socket_path: str = None) -> None:
+        """Initialize DaemonClient class object
+
+        :param socket_path: Path of the daemon's Unix domain socket. Default is settings DAEMON_SOCKET.
+        :type socket_path: str
+        """
+        self.socket_path = socket_path or g_settings.DAEMON_SOCKET
+        self.__conn = None # type: Optional[Connection]
+        self.__lock = threading.Lock()
+
+    def __enter__(self) -> "DaemonClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def api_driver(self, domain: str, credentials: Dict[str, str], api_version: Optional[str]) -> RemoteAPIDriver:
+        """Return a RemoteAPIDriver, logging in through the daemon if it is not already."""
+        return RemoteAPIDriver(self, self.request("login", domain, credentials, api_version))
+
+    def ping(self) -> bool:
+        """Return True if the daemon answers."""
+        try:
+            return self.request("ping") == "ping"
+        except DaemonError:
+            return False
+
+    def stop(self) -> None:
+        """Ask the daemon to shut down."""
+        self.request("stop")
+        self.close()
+
+    def request(self, command: str, *args: Any) -> Any:
+        """Send a command to the daemon and return the result."""
+        with self.__lock:
+            try:
+                conn = self.__connect()
+                conn.send((command,) + args)
+                status, result = conn.recv()
+            except (OSError, EOFError) as err:
+                self.__conn = None
+                raise DaemonError("Failure to reach SDK daemon at {}: {}".format(self.socket_path, err))
+        if status == "error":
+            raise DaemonError(result)
+        return result
+
+    def close(self) -> None:
+        """Close the connection to the daemon."""
+        if self.__conn is not None:
+            self.__conn.close()
+            self.__conn = None
+
+    def __connect(self) -> Connection:
+        if self.__conn is None:
+            with open(get_key_path(self.socket_path), "rb") as key_file:
+                authkey = key_file.read()
+            self.__conn = Client(self.socket_path, family="AF_UNIX", authkey=authkey)
+        return self.__conn
+
+
+def main() -> None:
+    """Run the SDK daemon in the foreground."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve SDI OS API drivers over a Unix domain socket.")
+    parser.add_argument("--socket", default=g_settings.DAEMON_SOCKET, help="Unix domain socket path")
+    args = parser.parse_args()
+    daemon = SDKDaemon(args.socket)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Deadline class object"""
+from typing import Any, Callable, Optional, Tuple
+
+import functools
+import threading
+import time
+
+import settings.general as g_settings
+
+_local = threading.local()
+
+
+class DeadlineExceededError(RuntimeError):
+    """Raise exception when an operation runs past its deadline"""
+
+
+class Deadline:
+    """Time budget of an operation and of every API call it makes.
+
+    Used as a context manager, the deadline applies to all calls the thread
+    makes inside the with block: each call's connect and read timeouts are
+    cut to the time left, and no call starts once the time is up. Nested
+    deadlines can only shorten the budget. Threads started by the SDK, e.g.
+    by api.bulk.BulkExecutor, run under the deadline of the thread that
+    started them.
+    """
+
+    def __init__(self, seconds: float = None, connect_timeout: float = None, read_timeout: float = None) -> None:
+        """Initialize Deadline class object
+
+        :param seconds: Time budget in seconds from now, or None for no budget.
+        :type seconds: float
+        :param connect_timeout: Connect timeout of each call. Default is the enclosing deadline's or settings CONNECT_TIMEOUT.
+        :type connect_timeout: float
+        :param read_timeout: Read timeout of each call. Default is the enclosing deadline's or settings READ_TIMEOUT.
+        :type read_timeout: float
+        """
+        self.expires = None if seconds is None else time.monotonic() + seconds
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.__parent = None # type: Optional[Deadline]
+
+    def __repr__(self) -> str:
+        remaining = self.remaining()
+        left = "unbounded" if remaining is None else "{:.3f}s left".format(remaining)
+        return "<Deadline {}>".format(left)
+
+    def __enter__(self) -> "Deadline":
+        self.__parent = get_deadline()
+        if self.__parent is not None:
+            if self.__parent.expires is not None and (self.expires is None or self.__parent.expires < self.expires):
+                self.expires = self.__parent.expires
+            if self.connect_timeout is None:
+                self.connect_timeout = self.__parent.connect_timeout
+            if self.read_timeout is None:
+                self.read_timeout = self.__parent.read_timeout
+        _set_deadline(self)
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        _set_deadline(self.__parent)
+
+    @property
+    def expired(self) -> bool:
+        """True if the time budget is used up."""
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def remaining(self) -> Optional[float]:
+        """Return the seconds left, never below 0, or None without a budget."""
+        if self.expires is None:
+            return None
+        return max(self.expires - time.monotonic(), 0.0)
+
+    def check(self) -> None:
+        """Raise DeadlineExceededError if the time budget is used up."""
+        if self.expired:
+            raise DeadlineExceededError("Deadline exceeded")
+
+
+def get_deadline() -> Optional[Deadline]:
+    """Return the innermost deadline of the current thread, or None."""
+    return getattr(_local, "deadline", None)
+
+
+def _set_deadline(deadline: Optional[Deadline]) -> None:
+    _local.deadline = deadline
+
+
+def check() -> None:
+    """Raise DeadlineExceededError if the current thread's deadline is used up."""
+    deadline = get_deadline()
+    if deadline is not None:
+        deadline.check()
+
+
+def remaining() -> Optional[float]:
+    """Return the seconds left to the current thread's deadline, or None without one."""
+    deadline = get_deadline()
+    return None if deadline is None else deadline.remaining()
+
+
+def get_timeout() -> Tuple[float, float]:
+    """Return the (connect, read) timeout of the next API call of the current thread.
+
+    Raise DeadlineExceededError if the thread's deadline is used up.
+    """
+    deadline = get_deadline()
+    if deadline is None:
+        return g_settings.CONNECT_TIMEOUT, g_settings.READ_TIMEOUT
+    deadline.check()
+    connect = g_settings.CONNECT_TIMEOUT if deadline.connect_timeout is None else deadline.connect_timeout
+    read = g_settings.READ_TIMEOUT if deadline.read_timeout is None else deadline.read_timeout
+    left = deadline.remaining()
+    if left is not None:
+        connect, read = min(connect, left), min(read, left)
+    return connect, read
+
+
+def shielded(function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Call function outside of any deadline and return its result, e.g. to clean up after a deadline miss."""
+    parent = get_deadline()
+    _set_deadline(None)
+    try:
+        return function(*args, **kwargs)
+    finally:
+        _set_deadline(parent)
+
+
+def bind(function: Callable[..., Any]) -> Callable[..., Any]:
+    """Return function wrapped to run under the current thread's deadline, for use in other threads."""
+    deadline = get_deadline()
+    if deadline is None:
+        return function
+
+    @functools.wraps(function)
+    def bound(*args: Any, **kwargs: Any) -> Any:
+        parent = get_deadline()
+        _set_deadline(deadline)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _set_deadline(parent)
+    return bound
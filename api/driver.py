@@ -1,18 +1,45 @@
 """APIDriver class object"""
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 
 import ast
+import gzip
 import io
 import json
 import sys
+import threading
 import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from enum import Enum
+from urllib.parse import urlsplit
 
 import requests
 from semantic_version import Version
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
 import settings.general as g_settings
 import settings.urls as urls
+from api import deadline
 from settings.urls import APICategory
 
 # disable ssl verify warnings
@@ -42,6 +69,10 @@ class NoActiveTokenError(APITokenError):
 class InvalidURLError(APIDriverError):
     """Raise exception when API URL is invalid"""
 
+class InvalidCodecError(APIDriverError):
+    """Raise exception when the JSON codec requested is unknown or not installed"""
+
+
 class InvalidVersionError(APIDriverError):
     """Raise exception when API version is invalid"""
 
@@ -78,10 +109,255 @@ class HTTPMethod(Enum):
     DELETE = 6
 
 
+def get_accept_encoding() -> str:
+    """Return the Accept-Encoding header value for the content codings this install can decode."""
+    encodings = ["gzip", "deflate"]
+    decoders = getattr(requests.packages.urllib3.response.HTTPResponse, "CONTENT_DECODERS", [])
+    if zstandard is not None and "zstd" in decoders:
+        encodings.insert(0, "zstd")
+    return ", ".join(encodings)
+
+
+class JSONCodec:
+    """JSON encoder and decoder of request and response bodies.
+
+    dumps returns UTF-8 bytes and loads takes bytes, so bodies are never
+    copied into an intermediate str.
+    """
+
+    def __init__(self, name: str, dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any]) -> None:
+        """Initialize JSONCodec class object
+
+        :param name: Name of the codec, e.g. "orjson".
+        :type name: str
+        :param dumps: Encode an object to JSON bytes.
+        :type dumps: Callable[[Any], bytes]
+        :param loads: Decode JSON bytes to an object. Raises ValueError on invalid JSON.
+        :type loads: Callable[[bytes], Any]
+        """
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self) -> str:
+        return "<JSONCodec {}>".format(self.name)
+
+
+def get_json_codecs() -> Dict[str, JSONCodec]:
+    """Return the JSON codecs installed, fastest first."""
+    codecs = OrderedDict() # type: Dict[str, JSONCodec]
+    if orjson is not None:
+        codecs["orjson"] = JSONCodec("orjson", lambda data: orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS), orjson.loads)
+    if simdjson is not None:
+        # simdjson only parses, bodies are encoded with the stdlib.
+        codecs["simdjson"] = JSONCodec("simdjson", lambda data: json.dumps(data).encode("utf-8"), simdjson.loads)
+    if ujson is not None:
+        codecs["ujson"] = JSONCodec("ujson", lambda data: ujson.dumps(data, ensure_ascii=False).encode("utf-8"), ujson.loads)
+    codecs["json"] = JSONCodec("json", lambda data: json.dumps(data).encode("utf-8"), json.loads)
+    return codecs
+
+
+def get_json_codec(name: str = None) -> JSONCodec:
+    """Return the JSON codec called name, or the fastest installed if name is None."""
+    codecs = JSON_CODECS
+    if name is None:
+        return next(iter(codecs.values()))
+    try:
+        return codecs[name]
+    except KeyError:
+        raise InvalidCodecError("JSON codec {!r} is not installed. Installed: {}".format(name, ", ".join(codecs)))
+
+
+JSON_CODECS = get_json_codecs()
+
+
+URL_CATEGORIES = {id(endpoint["url"]): category for category, endpoints in urls.API_URLS.items()
+                  for endpoint in endpoints.values()}
+
+
+def get_category(url_dict: Dict[Tuple[str, str], str]) -> Optional[APICategory]:
+    """Return the API category of a settings.urls URL dict, or None."""
+    return URL_CATEGORIES.get(id(url_dict))
+
+
+def get_coalesce_categories() -> Optional[Set[APICategory]]:
+    """Return the API categories of settings COALESCE_CATEGORIES, or None for all categories."""
+    if g_settings.COALESCE_CATEGORIES is None:
+        return None
+    return {APICategory(category) for category in g_settings.COALESCE_CATEGORIES}
+
+
+class APIStats:
+    """Counters of the traffic sent and received by an APIDriver"""
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.requests = 0
+        self.request_bytes = 0
+        self.request_bytes_sent = 0
+        self.response_bytes = 0
+        self.response_bytes_received = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.coalesced = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def __str__(self) -> str:
+        padding = 24
+        return "\n {:>{pad}}: {}\n".format("Requests", self.requests, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Request Bytes", self.request_bytes, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Request Bytes Sent", self.request_bytes_sent, pad=padding) + \
+               " {:>{pad}}: {:.2f}\n".format("Request Ratio", self.request_ratio, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Response Bytes", self.response_bytes, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Response Bytes Received", self.response_bytes_received, pad=padding) + \
+               " {:>{pad}}: {:.2f}\n".format("Response Ratio", self.response_ratio, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Cache Hits", self.cache_hits, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Cache Misses", self.cache_misses, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Coalesced", self.coalesced, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Hedges", self.hedges, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Hedge Wins", self.hedge_wins, pad=padding)
+
+    @property
+    def request_ratio(self) -> float:
+        """Uncompressed size divided by sent size of request bodies."""
+        return self.request_bytes / self.request_bytes_sent if self.request_bytes_sent else 1.0
+
+    @property
+    def response_ratio(self) -> float:
+        """Decoded size divided by received size of response bodies."""
+        return self.response_bytes / self.response_bytes_received if self.response_bytes_received else 1.0
+
+    def add(self, **counters: int) -> None:
+        """Add to counters by name, e.g. add(requests=1)."""
+        with self.__lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def reset(self) -> None:
+        """Set all counters back to zero."""
+        with self.__lock:
+            for name in [name for name, value in vars(self).items() if isinstance(value, int) and not name.startswith("_")]:
+                setattr(self, name, 0)
+
+
+class Hedger:
+    """Recent latencies of each endpoint and budget of hedged requests.
+
+    The hedge delay of an endpoint is the percentile of its last window
+    latencies, once it has min_samples of them. Every request adds budget
+    tokens, up to burst, and every hedge spends one, so hedges stay under
+    budget of all requests.
+    """
+
+    def __init__(self, percentile: float, budget: float, window: int, min_samples: int, burst: float = 10.0) -> None:
+        """Initialize Hedger class object
+
+        :param percentile: Latency percentile, 0 to 100, after which a request is hedged.
+        :type percentile: float
+        :param budget: Most hedges per request, e.g. 0.05 for 5%.
+        :type budget: float
+        :param window: Number of recent latencies kept per endpoint.
+        :type window: int
+        :param min_samples: Latencies needed before an endpoint is hedged.
+        :type min_samples: int
+        :param burst: Most unspent hedge tokens.
+        :type burst: float
+        """
+        self.percentile = percentile
+        self.budget = budget
+        self.window = window
+        self.min_samples = min_samples
+        self.burst = burst
+        self.__lock = threading.Lock()
+        self.__latencies = {} # type: Dict[str, deque]
+        self.__tokens = 0.0
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        """Add a latency sample of endpoint."""
+        with self.__lock:
+            latencies = self.__latencies.get(endpoint)
+            if latencies is None:
+                latencies = self.__latencies[endpoint] = deque(maxlen=self.window)
+            latencies.append(seconds)
+
+    def get_delay(self, endpoint: str) -> Optional[float]:
+        """Return the seconds to wait before hedging a request to endpoint, or None to not hedge it."""
+        with self.__lock:
+            latencies = sorted(self.__latencies.get(endpoint, ()))
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))]
+
+    def add_request(self) -> None:
+        """Earn the hedge tokens of one request."""
+        with self.__lock:
+            self.__tokens = min(self.burst, self.__tokens + self.budget)
+
+    def acquire(self) -> bool:
+        """Spend a hedge token and return True, or return False if the budget is used up."""
+        with self.__lock:
+            if self.__tokens < 1:
+                return False
+            self.__tokens -= 1
+            return True
+
+
+class ValidatorCache:
+    """Least recently used store of GET responses that carry an ETag or Last-Modified validator"""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.__lock = threading.Lock()
+        self.__responses = OrderedDict() # type: OrderedDict
+
+    def __len__(self) -> int:
+        return len(self.__responses)
+
+    def get(self, key: Tuple[str, Optional[str]]) -> Optional[requests.Response]:
+        """Return the stored response for key, or None."""
+        with self.__lock:
+            response = self.__responses.get(key)
+            if response is not None:
+                self.__responses.move_to_end(key)
+            return response
+
+    def store(self, key: Tuple[str, Optional[str]], response: requests.Response) -> None:
+        """Keep response for key if it has a validator, otherwise forget key."""
+        cache_control = response.headers.get("Cache-Control", "")
+        cacheable = response.status_code == 200 and "no-store" not in cache_control and \
+            ("ETag" in response.headers or "Last-Modified" in response.headers)
+        with self.__lock:
+            if not cacheable:
+                self.__responses.pop(key, None)
+                return
+            self.__responses[key] = response
+            self.__responses.move_to_end(key)
+            while len(self.__responses) > self.max_size:
+                self.__responses.popitem(last=False)
+
+    def clear(self) -> None:
+        """Forget all stored responses."""
+        with self.__lock:
+            self.__responses.clear()
+
+    @staticmethod
+    def get_conditional_headers(response: requests.Response) -> Dict[str, str]:
+        """Return the If-None-Match/If-Modified-Since headers to revalidate response."""
+        headers = {}
+        if "ETag" in response.headers:
+            headers["If-None-Match"] = response.headers["ETag"]
+        if "Last-Modified" in response.headers:
+            headers["If-Modified-Since"] = response.headers["Last-Modified"]
+        return headers
+
+
 class APIResponse:
     """Reponse object for API Driver"""
-    def __init__(self, response: requests.Response) -> None:
+    def __init__(self, response: requests.Response, from_cache: bool = False, codec: JSONCodec = None) -> None:
         self.__response = response
+        self.__from_cache = from_cache
+        self.__codec = codec or get_json_codec(g_settings.JSON_CODEC)
 
     def __str__(self) -> str:
         padding = 11
@@ -98,6 +374,11 @@ class APIResponse:
         """requests Response object"""
         return self.__response
 
+    @property
+    def from_cache(self) -> bool:
+        """True if the server answered 304 Not Modified and the stored response is returned."""
+        return self.__from_cache
+
     @property
     def status_code(self) -> int:
         """Integer Code of responded HTTP Status, e.g. 404 or 200"""
@@ -136,7 +417,7 @@ class APIResponse:
     def detail(self) -> Any:
         """Returns the json-encoded content of the response, if any."""
         try:
-            return self.__response.json()
+            return self.__codec.loads(self.__response.content)
         except (ValueError, KeyError):
             pass
         return None
@@ -210,7 +491,7 @@ class APIToken:
             headers["Accept"] = "application/json; version={}".format(self.__api_version)
 
         url = "https://{}:{}@{}/api/o/token/".format(self.__client_id, self.__client_secret, self.__domain)
-        response = requests.post(url, data=payload, headers=headers, verify=False)
+        response = requests.post(url, data=payload, headers=headers, verify=False, timeout=deadline.get_timeout())
         if response.ok:
             if self.is_active and not self.is_expired:
                 self.revoke()
@@ -265,7 +546,7 @@ class APIToken:
                 "client_secret": self.__client_secret
             }
             url = "https://{}/api/o/revoke_token/".format(self.__domain)
-            response = requests.post(url, data=payload, headers=headers, verify=False)
+            response = requests.post(url, data=payload, headers=headers, verify=False, timeout=deadline.get_timeout())
 
             if response.ok:
                 self.__is_active = False
@@ -292,6 +573,21 @@ class APIDriver:
         self.domain = domain
         self.__token = APIToken(self.domain, credentials, self.__api_version)
         self.__api_version = None # type: Optional[Version]
+        self.__session = self.__create_session()
+        self.__token_lock = threading.Lock()
+        self.__stats = APIStats()
+        self.__validators = ValidatorCache(g_settings.VALIDATOR_CACHE_SIZE)
+        self.json_codec = get_json_codec(g_settings.JSON_CODEC)
+        self.coalesce_categories = get_coalesce_categories()
+        self.__in_flight = {} # type: Dict[Tuple[str, Optional[str]], Future]
+        self.__in_flight_lock = threading.Lock()
+        self.hedging = g_settings.HEDGE_REQUESTS
+        self.__hedger = Hedger(g_settings.HEDGE_PERCENTILE, g_settings.HEDGE_BUDGET, g_settings.HEDGE_WINDOW,
+                               g_settings.HEDGE_MIN_SAMPLES)
+        self.__hedge_executors = None # type: Optional[Tuple[ThreadPoolExecutor, ThreadPoolExecutor]]
+        self.__hedge_lock = threading.Lock()
+        self.__primary_slots = threading.BoundedSemaphore(g_settings.HEDGE_WORKERS)
+        self.__hedge_slots = threading.BoundedSemaphore(g_settings.HEDGE_WORKERS)
 
     @property
     def api_version(self) -> Optional[str]:
@@ -313,11 +609,58 @@ class APIDriver:
         """APIToken object that has all Oauth token information."""
         return self.__token
 
-    def get(self, url_dict: Dict[Tuple[str, str], str], url_args: Dict[str, Any] = None) -> APIResponse:
-        """Call GET request. Return dictionary response of outcome."""
+    @property
+    def session(self) -> requests.Session:
+        """requests Session object holding the pooled connections to SDI OS."""
+        return self.__session
+
+    @property
+    def stats(self) -> APIStats:
+        """APIStats object counting the traffic of this driver."""
+        return self.__stats
+
+    @property
+    def hedger(self) -> Hedger:
+        """Hedger object holding the endpoint latencies and hedge budget used when hedging is set."""
+        return self.__hedger
+
+    @property
+    def validators(self) -> ValidatorCache:
+        """ValidatorCache object holding GET responses used for conditional requests."""
+        return self.__validators
+
+    def sdi(self, user_pk: int, sdi_id: str) -> Any:
+        """Return an immutable SDIContext of one SDI, safe to share between threads.
+
+        e.g. api_driver.sdi(user_pk, sdi_id).machine(machine_id).interfaces.get_vlans(conn_id)
+        """
+        from api.sdis.context import SDIContext
+        return SDIContext(self, user_pk, sdi_id)
+
+    @staticmethod
+    def __create_session() -> requests.Session:
+        session = requests.Session()
+        session.headers["Accept-Encoding"] = get_accept_encoding()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=g_settings.CONNECTION_POOLS,
+                                                pool_maxsize=g_settings.CONNECTION_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.verify = False
+        return session
+
+    def get(self, url_dict: Dict[Tuple[str, str], str], url_args: Dict[str, Any] = None, params: Dict[str, Any] = None) -> APIResponse:
+        """Call GET request. Return dictionary response of outcome.
+
+        params are sent as the query string, e.g. for server side filtering and pagination.
+        With settings COALESCE_GETS, concurrent identical GETs of the
+        coalesce_categories share one request, counted in stats.coalesced.
+        A GET sent right after a write may join a GET started before it and
+        read the state from before the write.
+        """
         version_url = self.__get_version_url(url_dict)
         url = version_url.format(**url_args) if url_args is not None else version_url
-        return self.__call_url(url, HTTPMethod.GET)
+        coalesce = g_settings.COALESCE_GETS and (self.coalesce_categories is None or
+                                                 get_category(url_dict) in self.coalesce_categories)
+        return self.__call_url(url, HTTPMethod.GET, params=params, coalesce=coalesce, endpoint=version_url)
 
     def __get_version_url(self, url_dict: Dict[Tuple[str, str], str]) -> str:
         if self.__api_version is None:
@@ -361,13 +704,13 @@ class APIDriver:
         """Call OPTIONS request. Return APIResponse object."""
         version_url = self.__get_version_url(url_dict)
         url = version_url.format(**url_args) if url_args is not None else version_url
-        return self.__call_url(url, HTTPMethod.OPTIONS)
+        return self.__call_url(url, HTTPMethod.OPTIONS, endpoint=version_url)
 
     def head(self, url_dict: Dict[Tuple[str, str], str], url_args: Dict[str, Any] = None) -> APIResponse:
         """Call HEAD request. Return APIResponse object."""
         version_url = self.__get_version_url(url_dict)
         url = version_url.format(**url_args) if url_args is not None else version_url
-        return self.__call_url(url, HTTPMethod.HEAD)
+        return self.__call_url(url, HTTPMethod.HEAD, endpoint=version_url)
 
     def create_one_time_login(self, user_pk: int, expires: int = 900) -> APIResponse:
         """Return one time user login information in an APIResponse object.
@@ -383,6 +726,37 @@ class APIDriver:
                    "expires": expires}
         return self.post(urls.API_URLS[APICategory.AUTHENTICATION]["token"]["url"], data=payload)
 
+    def fetch(self, url: str, method: HTTPMethod = HTTPMethod.GET, headers: Dict[str, str] = None) -> requests.Response:
+        """Send an authenticated request and return the raw, streamed requests Response.
+
+        Used for transfers that are not JSON, e.g. downloading file content.
+        The API token is only sent to the SDI OS host itself, never to
+        absolute URLs on other hosts.
+
+        :param url: Absolute URL, or URL relative to the API root.
+        :type url: str
+        :param method: HTTPMethod.GET or HTTPMethod.HEAD.
+        :type method: HTTPMethod
+        :param headers: Extra headers, e.g. {"Range": "bytes=0-1023"}.
+        :type headers: Dict[str, str]
+        """
+        absolute_url = url if url.startswith("https://") or url.startswith("http://") else self.__build_url(url)
+        request_headers = {} # type: Dict[str, str]
+        parts = urlsplit(absolute_url)
+        if self.domain.lower() in (parts.netloc.lower(), (parts.hostname or "").lower()):
+            self.__refresh_token()
+            request_headers = self.__header()
+        request_headers.update(headers or {})
+        if method is HTTPMethod.HEAD:
+            return self.__request(self.__session.head, absolute_url, headers=request_headers, allow_redirects=True)
+        return self.__request(self.__session.get, absolute_url, headers=request_headers, stream=True)
+
+    def __refresh_token(self) -> None:
+        if self.token.is_expired:
+            with self.__token_lock:
+                if self.token.is_expired:
+                    self.token.refresh()
+
     def __build_url(self, relative_url: str) -> str:
         return "https://{}/api/{}".format(self.domain, relative_url)
 
@@ -397,9 +771,9 @@ class APIDriver:
         return headers
 
     def __call_url(self, url: str, method: HTTPMethod = HTTPMethod.OPTIONS, data: Union[List[Dict[str, Any]], Dict[str, Any]] = None,
-                   files: Dict[str, Any] = None) -> APIResponse:
-        if self.token.is_expired:
-            self.token.refresh()
+                   files: Dict[str, Any] = None, params: Dict[str, Any] = None, coalesce: bool = False,
+                   endpoint: str = None) -> APIResponse:
+        self.__refresh_token()
 
         absolute_url = self.__build_url(url)
         headers = self.__header()
@@ -410,22 +784,161 @@ class APIDriver:
             files = {}
             headers["content-type"] = "application/json"
 
+        session = self.__session
         if method is HTTPMethod.GET:
-            response = requests.get(absolute_url, headers=headers, verify=False)
+            def get() -> APIResponse:
+                return self.__hedged(endpoint, lambda: self.__conditional_get(absolute_url, dict(headers), params))
+            if coalesce:
+                key = (absolute_url + self.__query_key(params), headers.get("Accept"))
+                return self.__single_flight(key, get)
+            return get()
         elif method is HTTPMethod.POST:
-            response = requests.post(
-                absolute_url, data=json.dumps(data), headers=headers, verify=False)
+            response = self.__request(
+                session.post, absolute_url, data=self.__encode_body(data, headers), headers=headers, verify=False)
         elif method is HTTPMethod.PUT:
             if files:
-                response = requests.put(absolute_url, files=files, headers=headers, verify=False)
+                response = self.__request(session.put, absolute_url, files=files, headers=headers, verify=False)
             else:
-                response = requests.put(absolute_url, data=json.dumps(data),
-                                        headers=headers, verify=False)
+                response = self.__request(session.put, absolute_url, data=self.__encode_body(data, headers),
+                                          headers=headers, verify=False)
         elif method is HTTPMethod.DELETE:
-            response = requests.delete(absolute_url, headers=headers, verify=False)
+            response = self.__request(session.delete, absolute_url, headers=headers, verify=False)
         elif method is HTTPMethod.OPTIONS:
-            response = requests.options(absolute_url, headers=headers, verify=False)
+            return self.__hedged(endpoint, lambda: self.__send(session.options, absolute_url, headers))
         elif method is HTTPMethod.HEAD:
-            response = requests.head(absolute_url, headers=headers, verify=False)
+            return self.__hedged(endpoint, lambda: self.__send(session.head, absolute_url, headers))
+
+        self.__count_response(response)
+        return APIResponse(response, codec=self.json_codec)
 
-        return APIResponse(response)
+    def __send(self, request: Callable[..., requests.Response], absolute_url: str, headers: Dict[str, str]) -> APIResponse:
+        response = self.__request(request, absolute_url, headers=headers, verify=False)
+        self.__count_response(response)
+        return APIResponse(response, codec=self.json_codec)
+
+    @staticmethod
+    def __request(request: Callable[..., requests.Response], absolute_url: str, **kwargs: Any) -> requests.Response:
+        try:
+            return request(absolute_url, timeout=deadline.get_timeout(), **kwargs)
+        except requests.Timeout as err:
+            current = deadline.get_deadline()
+            if current is not None and current.expired:
+                raise deadline.DeadlineExceededError("Deadline exceeded waiting for {}".format(absolute_url)) from err
+            raise
+
+    def __hedged(self, endpoint: Optional[str], call: Callable[[], APIResponse]) -> APIResponse:
+        if not self.hedging or endpoint is None:
+            return call()
+
+        call = deadline.bind(call)
+
+        def timed() -> APIResponse:
+            start = time.monotonic()
+            response = call()
+            self.__hedger.record(endpoint, time.monotonic() - start)
+            return response
+
+        self.__hedger.add_request()
+        delay = self.__hedger.get_delay(endpoint)
+        if delay is None or not self.__primary_slots.acquire(blocking=False):
+            return timed()
+
+        # Primaries and hedges have pools of their own and only take a free
+        # thread, so a primary never queues behind other requests
+        primary_executor, hedge_executor = self.__get_hedge_executors()
+        primary = primary_executor.submit(timed)
+        primary.add_done_callback(lambda _: self.__primary_slots.release())
+        done, _ = wait([primary], timeout=delay)
+        if done or not self.__hedge_slots.acquire(blocking=False):
+            return primary.result()
+        if not self.__hedger.acquire():
+            self.__hedge_slots.release()
+            return primary.result()
+
+        self.__stats.add(hedges=1)
+        hedge = hedge_executor.submit(timed)
+        hedge.add_done_callback(lambda _: self.__hedge_slots.release())
+        done, pending = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        first = hedge if hedge in done else primary
+        if first.exception() is not None and pending:
+            first = pending.pop()
+        if first is hedge:
+            self.__stats.add(hedge_wins=1)
+        return first.result()
+
+    def __get_hedge_executors(self) -> Tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+        with self.__hedge_lock:
+            if self.__hedge_executors is None:
+                self.__hedge_executors = (ThreadPoolExecutor(max_workers=g_settings.HEDGE_WORKERS),
+                                          ThreadPoolExecutor(max_workers=g_settings.HEDGE_WORKERS))
+            return self.__hedge_executors
+
+    def __single_flight(self, key: Tuple[str, Optional[str]], call: Callable[[], APIResponse]) -> APIResponse:
+        with self.__in_flight_lock:
+            future = self.__in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self.__in_flight[key] = Future()
+        if not leader:
+            self.__stats.add(coalesced=1)
+            try:
+                shared = future.result(timeout=deadline.remaining())
+            except FutureTimeoutError:
+                raise deadline.DeadlineExceededError("Deadline exceeded waiting for {}".format(key[0]))
+            return APIResponse(shared.response, shared.from_cache, self.json_codec)
+
+        try:
+            response = call()
+        except BaseException as err:
+            with self.__in_flight_lock:
+                del self.__in_flight[key]
+            future.set_exception(err)
+            raise
+        with self.__in_flight_lock:
+            del self.__in_flight[key]
+        future.set_result(response)
+        return response
+
+    def __conditional_get(self, absolute_url: str, headers: Dict[str, str], params: Dict[str, Any] = None) -> APIResponse:
+        if not g_settings.CONDITIONAL_GET:
+            response = self.__request(self.__session.get, absolute_url, headers=headers, params=params, verify=False)
+            self.__count_response(response)
+            return APIResponse(response, codec=self.json_codec)
+
+        key = (absolute_url + self.__query_key(params), headers.get("Accept"))
+        cached = self.__validators.get(key)
+        if cached is not None:
+            headers.update(ValidatorCache.get_conditional_headers(cached))
+
+        response = self.__request(self.__session.get, absolute_url, headers=headers, params=params, verify=False)
+        self.__count_response(response)
+        if response.status_code == 304 and cached is not None:
+            self.__stats.add(cache_hits=1)
+            return APIResponse(cached, from_cache=True, codec=self.json_codec)
+
+        self.__stats.add(cache_misses=1)
+        self.__validators.store(key, response)
+        return APIResponse(response, codec=self.json_codec)
+
+    @staticmethod
+    def __query_key(params: Optional[Dict[str, Any]]) -> str:
+        if not params:
+            return ""
+        return "?" + "&".join("{}={}".format(name, params[name]) for name in sorted(params))
+
+    def __encode_body(self, data: Union[List[Dict[str, Any]], Dict[str, Any]], headers: Dict[str, str]) -> bytes:
+        body = self.json_codec.dumps(data)
+        sent = body
+        if g_settings.COMPRESS_REQUESTS and len(body) >= g_settings.COMPRESS_MIN_SIZE:
+            sent = gzip.compress(body, compresslevel=g_settings.COMPRESS_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+        self.__stats.add(request_bytes=len(body), request_bytes_sent=len(sent))
+        return sent
+
+    def __count_response(self, response: requests.Response) -> None:
+        received = len(response.content)
+        try:
+            wire = response.raw.tell()
+        except (AttributeError, IOError):
+            wire = 0
+        self.__stats.add(requests=1, response_bytes=received, response_bytes_received=wire or received)
@@ -0,0 +1,2 @@
+from api.inventory.mirror import InventoryMirror
+from api.inventory.columnar import ColumnarExporter, Column
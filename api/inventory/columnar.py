@@ -0,0 +1,269 @@
+"""ColumnarExporter class object"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+import settings.general as g_settings
+from api.bulk import BulkExecutor
+from api.driver import APIDriver
+from api.driver import APIResponse
+from api.pagination import Paginator, get_results
+from api.sdis.sdi import SDIDriver
+from api.storage.disk import DiskDriver
+from api.system.status import StatusDriver
+from api.system.task import TaskDriver
+from api.utils import get_key, get_timestamp
+
+
+class ColumnarError(RuntimeError):
+    """Raise exception when an export needs a package that is not installed or a kind is unknown"""
+
+
+class Column:
+    """One typed column of an export schema.
+
+    The value of a list item is read from the first of fields present in the
+    item; dotted fields read nested objects. Nested objects with a pk or id,
+    e.g. an owning user, give that key. Missing values are null in Arrow and
+    fill in NumPy: -1 for int, NaN for float and time, "" for str and False
+    for bool. time columns hold POSIX seconds.
+    """
+    _numpy_kinds = {"bool": "?", "int": "i8", "float": "f8", "time": "f8"}
+    _fills = {"bool": False, "int": -1, "float": float("nan"), "time": float("nan"), "str": ""}
+
+    def __init__(self, name: str, kind: str, fields: Sequence[str] = None, width: int = 64) -> None:
+        """Initialize Column class object
+
+        :param name: Column name.
+        :type name: str
+        :param kind: "bool", "int", "float", "time" or "str".
+        :type kind: str
+        :param fields: Item fields to read, first found wins. Default is (name,).
+        :type fields: Sequence[str]
+        :param width: Most characters of a str column in NumPy.
+        :type width: int
+        """
+        if kind not in self._fills:
+            raise ColumnarError("Unknown column kind {}".format(kind))
+        self.name = name
+        self.kind = kind
+        self.fields = tuple(fields or (name,))
+        self.width = width
+
+    def __repr__(self) -> str:
+        return "<Column {} {}>".format(self.name, self.kind)
+
+    @property
+    def fill(self) -> Any:
+        """NumPy value of missing values."""
+        return self._fills[self.kind]
+
+    @property
+    def numpy_type(self) -> str:
+        """NumPy dtype of the column."""
+        return self._numpy_kinds.get(self.kind, "U{}".format(self.width))
+
+    @property
+    def arrow_type(self) -> Any:
+        """Arrow type of the column."""
+        return {"bool": pyarrow.bool_(), "int": pyarrow.int64(), "float": pyarrow.float64(),
+                "time": pyarrow.float64(), "str": pyarrow.string()}[self.kind]
+
+    def get(self, item: Dict[str, Any]) -> Any:
+        """Return the typed value of the column in a list item, or None."""
+        for field in self.fields:
+            value = item
+            for part in field.split("."):
+                value = value.get(part) if isinstance(value, dict) else None
+            if value is not None:
+                return self.convert(get_key(value) if isinstance(value, dict) else value)
+        return None
+
+    def convert(self, value: Any) -> Any:
+        """Return value as the kind of the column, or None if it does not convert."""
+        try:
+            if self.kind == "time":
+                return get_timestamp(value)
+            if self.kind == "bool":
+                return value if isinstance(value, bool) else str(value).lower() in ("1", "true", "yes")
+            if self.kind == "int":
+                return int(value)
+            if self.kind == "float":
+                return float(value)
+            return str(value)
+        except (TypeError, ValueError):
+            return None
+
+
+SCHEMAS = {
+    "disks": [
+        Column("image_id", "str", width=36), Column("name", "str"), Column("owner", "int", ("user", "owner")),
+        Column("size", "int", ("size", "virtual_size", "file_size")), Column("pending", "bool"),
+        Column("created", "time", ("created", "created_at")),
+    ],
+    "sdis": [
+        Column("sdi_id", "str", width=36), Column("name", "str"), Column("owner", "int", ("user", "owner")),
+        Column("description", "str", width=128),
+    ],
+    "tasks": [
+        Column("lrpid", "str", ("lrpid", "id", "pk"), width=36), Column("name", "str", ("name", "type")),
+        Column("owner", "int", ("user", "owner")), Column("state", "str", ("state", "status"), width=16),
+        Column("progress", "float", ("progress", "percent")), Column("created", "time", ("created", "created_at")),
+    ],
+    "nodes": [
+        Column("name", "str", ("name", "hostname")), Column("state", "str", ("state", "status"), width=16),
+        Column("cpus", "int", ("cpus", "cpu_count", "cores")), Column("cpu_used", "float", ("cpu_used", "cpu_usage", "cpu_percent")),
+        Column("memory", "int", ("memory", "memory_total")), Column("memory_used", "int"),
+        Column("storage", "int", ("storage", "disk", "storage_total")), Column("storage_used", "int", ("storage_used", "disk_used")),
+    ],
+} # type: Dict[str, List[Column]]
+
+
+def get_items(detail: Any) -> List[Any]:
+    """Return the items of a list response detail, including node lists under a "nodes" field."""
+    if isinstance(detail, dict) and isinstance(detail.get("nodes"), list):
+        return detail["nodes"]
+    return get_results(detail)
+
+
+def get_totals(array: Any, key: str, value: str = None) -> Dict[Any, float]:
+    """Return the sum of column value, or the row count, per distinct key of a structured array.
+
+    e.g. get_totals(disks, "owner", "size") is the disk bytes of every owner.
+    """
+    if numpy is None:
+        raise ColumnarError("numpy is not installed")
+    keys, inverse = numpy.unique(array[key], return_inverse=True)
+    weights = None if value is None else numpy.nan_to_num(array[value].astype("f8"))
+    sums = numpy.bincount(inverse.ravel(), weights=weights, minlength=len(keys))
+    return {k.item(): float(total) for k, total in zip(keys, sums)}
+
+
+class ColumnarExporter:
+    """Stream SDI OS list endpoints into Arrow record batches, NumPy structured arrays or Parquet files.
+
+    Items are read page by page and converted to typed columns batch_size
+    rows at a time, so memory holds one batch of rows plus the page being
+    fetched, whatever the size of the list. Every batch of a kind has the
+    same fixed schema, SCHEMAS[kind] unless another is given.
+    """
+
+    def __init__(self, api_driver: APIDriver, batch_size: int = None, max_workers: int = None) -> None:
+        """Initialize ColumnarExporter class object
+
+        :param api_driver: Allows ColumnarExporter to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        :param batch_size: Rows per batch and per Parquet row group. Default is settings EXPORT_BATCH_SIZE.
+        :type batch_size: int
+        :param max_workers: Most exports at once in export_all. Default is settings BULK_WORKERS.
+        :type max_workers: int
+        """
+        self.api_driver = api_driver
+        self.batch_size = batch_size or g_settings.EXPORT_BATCH_SIZE
+        self.__executor = BulkExecutor(max_workers)
+
+    def get_columns(self, kind: str, schema: List[Column] = None) -> Iterator[Tuple[List[Column], Dict[str, List[Any]]]]:
+        """Yield (schema, {column name: values}) batches of a kind, values being None when missing."""
+        schema = self.__get_schema(kind, schema)
+        columns = {column.name: [] for column in schema} # type: Dict[str, List[Any]]
+        rows = 0
+        for page in Paginator(self.__get_list_method(kind)).pages():
+            for item in get_items(page.detail):
+                for column in schema:
+                    columns[column.name].append(column.get(item))
+                rows += 1
+                if rows == self.batch_size:
+                    yield schema, columns
+                    columns = {column.name: [] for column in schema}
+                    rows = 0
+        if rows:
+            yield schema, columns
+
+    def get_record_batches(self, kind: str, schema: List[Column] = None) -> Iterator[Any]:
+        """Yield the pyarrow RecordBatches of a kind."""
+        if pyarrow is None:
+            raise ColumnarError("pyarrow is not installed")
+        for batch_schema, columns in self.get_columns(kind, schema):
+            arrow_schema = self.get_arrow_schema(batch_schema)
+            yield pyarrow.RecordBatch.from_arrays(
+                [pyarrow.array(columns[column.name], type=column.arrow_type) for column in batch_schema], schema=arrow_schema)
+
+    def get_arrays(self, kind: str, schema: List[Column] = None) -> Iterator[Any]:
+        """Yield the NumPy structured arrays of a kind, one per batch."""
+        if numpy is None:
+            raise ColumnarError("numpy is not installed")
+        for batch_schema, columns in self.get_columns(kind, schema):
+            array = numpy.empty(len(columns[batch_schema[0].name]), dtype=self.get_dtype(batch_schema))
+            for column in batch_schema:
+                array[column.name] = [column.fill if value is None else value for value in columns[column.name]]
+            yield array
+
+    def to_numpy(self, kind: str, schema: List[Column] = None) -> Any:
+        """Return every item of a kind in one NumPy structured array."""
+        arrays = list(self.get_arrays(kind, schema))
+        if not arrays:
+            return numpy.empty(0, dtype=self.get_dtype(self.__get_schema(kind, schema)))
+        return numpy.concatenate(arrays)
+
+    def to_table(self, kind: str, schema: List[Column] = None) -> Any:
+        """Return every item of a kind in one pyarrow Table."""
+        batches = list(self.get_record_batches(kind, schema))
+        return pyarrow.Table.from_batches(batches, schema=self.get_arrow_schema(self.__get_schema(kind, schema)))
+
+    def to_parquet(self, kind: str, path: str, schema: List[Column] = None, compression: str = "zstd") -> int:
+        """Write every item of a kind to a Parquet file, one row group per batch, and return the row count."""
+        if pyarrow is None:
+            raise ColumnarError("pyarrow is not installed")
+        rows = 0
+        arrow_schema = self.get_arrow_schema(self.__get_schema(kind, schema))
+        with pyarrow.parquet.ParquetWriter(path, arrow_schema, compression=compression) as writer:
+            for batch in self.get_record_batches(kind, schema):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        return rows
+
+    def export_all(self, paths: Dict[str, str], compression: str = "zstd") -> List[Any]:
+        """Write several kinds to Parquet files concurrently, {kind: path}, and return the results."""
+        return self.__executor.map(lambda kind: self.to_parquet(kind, paths[kind], compression=compression), list(paths))
+
+    @staticmethod
+    def get_dtype(schema: List[Column]) -> Any:
+        """Return the NumPy dtype of a schema."""
+        if numpy is None:
+            raise ColumnarError("numpy is not installed")
+        return numpy.dtype([(column.name, column.numpy_type) for column in schema])
+
+    @staticmethod
+    def get_arrow_schema(schema: List[Column]) -> Any:
+        """Return the pyarrow Schema of a schema."""
+        if pyarrow is None:
+            raise ColumnarError("pyarrow is not installed")
+        return pyarrow.schema([(column.name, column.arrow_type) for column in schema])
+
+    @staticmethod
+    def __get_schema(kind: str, schema: Optional[List[Column]]) -> List[Column]:
+        if schema is not None:
+            return schema
+        if kind not in SCHEMAS:
+            raise ColumnarError("Unknown export kind {}".format(kind))
+        return SCHEMAS[kind]
+
+    def __get_list_method(self, kind: str) -> Callable[..., APIResponse]:
+        if kind == "disks":
+            return DiskDriver(self.api_driver).get_all
+        if kind == "sdis":
+            return SDIDriver(self.api_driver).get_all_sdis
+        if kind == "tasks":
+            return TaskDriver(self.api_driver).get_all_tasks
+        if kind == "nodes":
+            return StatusDriver(self.api_driver).get_nodes
+        raise ColumnarError("Unknown export kind {}".format(kind))
@@ -0,0 +1,297 @@
+"""InventoryMirror class object"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import settings.general as g_settings
+from api.accounts.tenancy import TenancyDriver
+from api.accounts.user import UserDriver
+from api.bulk import BulkExecutor, BulkResult
+from api.driver import APIDriver
+from api.driver import APIResponse
+from api.pagination import Paginator, get_results
+from api.sdis.sdi import SDIDriver
+from api.storage.disk import DiskDriver
+from api.utils import get_key
+
+# (kind, scope): scope is "" for the lists of the whole deployment, or the sdi_id of machines and networks
+RefreshKey = Tuple[str, str]
+
+
+class InventoryError(RuntimeError):
+    """Raise exception when an unknown list of the inventory is refreshed"""
+
+
+def get_machines(detail: Any) -> List[Dict[str, Any]]:
+    """Return the machines of a machine list response detail, user and managed machines alike."""
+    if isinstance(detail, dict) and ("user" in detail or "managed" in detail):
+        return (detail.get("user") or []) + (detail.get("managed") or [])
+    return get_results(detail)
+
+
+class InventoryMirror:
+    """Local SQLite copy of the tenancies, users, SDIs, disks, machines and networks of SDI OS.
+
+    refresh fetches the lists of the whole deployment concurrently, then the
+    machines and networks of every SDI concurrently, and stores them in one
+    transaction per list. Lists answered by a 304 Not Modified are not
+    rewritten, and max_age skips lists refreshed recently, so a refresh only
+    pays for what changed. The time of the last refresh of every list is
+    kept, so callers can tell how stale the mirror is. Queries are indexed
+    SQL run locally; each returned item is the list item as SDI OS sent it.
+    """
+    kinds = ("tenancies", "users", "sdis", "disks", "machines", "networks")
+    _sdi_kinds = ("machines", "networks")
+    _schema = (
+        "CREATE TABLE IF NOT EXISTS tenancies (pk PRIMARY KEY, name TEXT, data TEXT)",
+        "CREATE INDEX IF NOT EXISTS tenancies_name ON tenancies (name)",
+        "CREATE TABLE IF NOT EXISTS users (pk PRIMARY KEY, username TEXT, tenancy, data TEXT)",
+        "CREATE INDEX IF NOT EXISTS users_username ON users (username)",
+        "CREATE INDEX IF NOT EXISTS users_tenancy ON users (tenancy)",
+        "CREATE TABLE IF NOT EXISTS sdis (sdi_id TEXT PRIMARY KEY, owner, name TEXT, state TEXT, data TEXT)",
+        "CREATE INDEX IF NOT EXISTS sdis_owner ON sdis (owner)",
+        "CREATE INDEX IF NOT EXISTS sdis_state ON sdis (state)",
+        "CREATE TABLE IF NOT EXISTS disks (image_id TEXT PRIMARY KEY, owner, name TEXT, data TEXT)",
+        "CREATE INDEX IF NOT EXISTS disks_owner ON disks (owner)",
+        "CREATE INDEX IF NOT EXISTS disks_name ON disks (name)",
+        "CREATE TABLE IF NOT EXISTS machines (machine_id TEXT PRIMARY KEY, sdi_id TEXT, name TEXT, role TEXT, data TEXT)",
+        "CREATE INDEX IF NOT EXISTS machines_sdi_id ON machines (sdi_id)",
+        "CREATE TABLE IF NOT EXISTS machine_disks (machine_id TEXT, sdi_id TEXT, image_id TEXT)",
+        "CREATE INDEX IF NOT EXISTS machine_disks_image_id ON machine_disks (image_id)",
+        "CREATE INDEX IF NOT EXISTS machine_disks_sdi_id ON machine_disks (sdi_id)",
+        "CREATE TABLE IF NOT EXISTS machine_networks (machine_id TEXT, sdi_id TEXT, network_id TEXT)",
+        "CREATE INDEX IF NOT EXISTS machine_networks_network_id ON machine_networks (network_id)",
+        "CREATE INDEX IF NOT EXISTS machine_networks_sdi_id ON machine_networks (sdi_id)",
+        "CREATE TABLE IF NOT EXISTS networks (network_id TEXT PRIMARY KEY, sdi_id TEXT, name TEXT, data TEXT)",
+        "CREATE INDEX IF NOT EXISTS networks_sdi_id ON networks (sdi_id)",
+        "CREATE TABLE IF NOT EXISTS refreshes (kind TEXT, scope TEXT, refreshed REAL, PRIMARY KEY (kind, scope))",
+    )
+
+    def __init__(self, api_driver: APIDriver, path: str = None, max_workers: int = None) -> None:
+        """Initialize InventoryMirror class object
+
+        :param api_driver: Allows InventoryMirror to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        :param path: SQLite database file, or ":memory:". Default is settings INVENTORY_DATABASE.
+        :type path: str
+        :param max_workers: Most calls at once. Default is settings BULK_WORKERS.
+        :type max_workers: int
+        """
+        self.api_driver = api_driver
+        self.path = path or g_settings.INVENTORY_DATABASE
+        self.__executor = BulkExecutor(max_workers)
+        self.__lock = threading.RLock()
+
+        directory = os.path.dirname(self.path)
+        if self.path != ":memory:" and directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.__connection.row_factory = sqlite3.Row
+        with self.__lock, self.__connection:
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.execute("PRAGMA synchronous=NORMAL")
+            for statement in self._schema:
+                self.__connection.execute(statement)
+
+    def close(self) -> None:
+        """Close the database."""
+        with self.__lock:
+            self.__connection.close()
+
+    def refresh(self, kinds: Iterable[str] = None, sdi_ids: Iterable[str] = None, max_age: float = None) -> List[BulkResult]:
+        """Fetch lists from SDI OS concurrently and store them. Return a result per (kind, scope) list.
+
+        A result's value is the number of items stored, or None if the list
+        was not modified since the last refresh.
+
+        :param kinds: Lists to refresh, from InventoryMirror.kinds. Default is all of them.
+        :type kinds: Iterable[str]
+        :param sdi_ids: SDIs whose machines and networks are refreshed. Default is every mirrored SDI.
+        :type sdi_ids: Iterable[str]
+        :param max_age: Skip lists refreshed less than max_age seconds ago.
+        :type max_age: float
+        """
+        kinds = list(self.kinds if kinds is None else kinds)
+        for kind in kinds:
+            if kind not in self.kinds:
+                raise InventoryError("Unknown inventory kind {}".format(kind))
+
+        keys = [(kind, "") for kind in kinds if kind not in self._sdi_kinds]
+        results = self.__refresh(self.__get_due(keys, max_age), {})
+        if not any(kind in self._sdi_kinds for kind in kinds):
+            return results
+
+        owners = {row["sdi_id"]: row["owner"] for row in self.query("SELECT sdi_id, owner FROM sdis")}
+        scopes = list(owners) if sdi_ids is None else [str(sdi_id) for sdi_id in sdi_ids if str(sdi_id) in owners]
+        keys = [(kind, sdi_id) for sdi_id in scopes for kind in kinds if kind in self._sdi_kinds]
+        return results + self.__refresh(self.__get_due(keys, max_age), owners)
+
+    def get_age(self, kind: str, scope: str = "") -> Optional[float]:
+        """Return the seconds since a list was last refreshed, or None if it never was."""
+        rows = self.query("SELECT refreshed FROM refreshes WHERE kind = ? AND scope = ?", (kind, scope))
+        return time.time() - rows[0]["refreshed"] if rows else None
+
+    def get_staleness(self) -> Dict[str, Optional[float]]:
+        """Return the seconds since each kind was last refreshed, the oldest SDI for machines and networks."""
+        ages = {kind: None for kind in self.kinds} # type: Dict[str, Optional[float]]
+        now = time.time()
+        for row in self.query("SELECT kind, MIN(refreshed) AS refreshed FROM refreshes GROUP BY kind"):
+            ages[row["kind"]] = now - row["refreshed"]
+        return ages
+
+    def query(self, sql: str, parameters: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        """Run an SQL query on the mirror and return its rows."""
+        with self.__lock:
+            return self.__connection.execute(sql, parameters).fetchall()
+
+    def get_tenancies(self, name: str = None) -> List[Dict[str, Any]]:
+        """Return the mirrored tenancies, optionally only the one called name."""
+        return self.__select("tenancies", [("name = ?", name)])
+
+    def get_users(self, tenancy: Any = None, username: str = None) -> List[Dict[str, Any]]:
+        """Return the mirrored users, optionally of a tenancy, given by pk or name, or with a username."""
+        return self.__select("users", [self.__tenancy_condition("users.pk", tenancy), ("username = ?", username)])
+
+    def get_sdis(self, owner: int = None, tenancy: Any = None, state: Any = None, disk: str = None) -> List[Dict[str, Any]]:
+        """Return the mirrored SDIs matching every filter given.
+
+        :param owner: pk of the owning user.
+        :type owner: int
+        :param tenancy: pk or name of the owning user's tenancy.
+        :type tenancy: int or str
+        :param state: SDI state, e.g. 0 for stopped and 2 for running.
+        :type state: int or str
+        :param disk: image_id of a disk used by a machine of the SDI.
+        :type disk: str
+        """
+        return self.__select("sdis", [
+            ("owner = ?", owner), self.__tenancy_condition("owner", tenancy),
+            ("state = ?", None if state is None else str(state)),
+            ("sdi_id IN (SELECT sdi_id FROM machine_disks WHERE image_id = ?)", disk)])
+
+    def get_disks(self, owner: int = None, name: str = None, tenancy: Any = None) -> List[Dict[str, Any]]:
+        """Return the mirrored disks, optionally of an owner or tenancy, or with a name."""
+        return self.__select("disks", [("owner = ?", owner), ("name = ?", name), self.__tenancy_condition("owner", tenancy)])
+
+    def get_machines(self, sdi_id: str = None, role: str = None, disk: str = None, network: str = None) -> List[Dict[str, Any]]:
+        """Return the mirrored machines, optionally of an SDI or role, or using a disk or network."""
+        return self.__select("machines", [
+            ("sdi_id = ?", sdi_id), ("role = ?", role),
+            ("machine_id IN (SELECT machine_id FROM machine_disks WHERE image_id = ?)", disk),
+            ("machine_id IN (SELECT machine_id FROM machine_networks WHERE network_id = ?)", network)])
+
+    def get_networks(self, sdi_id: str = None) -> List[Dict[str, Any]]:
+        """Return the mirrored networks, optionally of an SDI."""
+        return self.__select("networks", [("sdi_id = ?", sdi_id)])
+
+    def __get_due(self, keys: List[RefreshKey], max_age: Optional[float]) -> List[RefreshKey]:
+        if max_age is None:
+            return keys
+        fresh = {(row["kind"], row["scope"]) for row in self.query(
+            "SELECT kind, scope FROM refreshes WHERE refreshed > ?", (time.time() - max_age,))}
+        return [key for key in keys if key not in fresh]
+
+    def __refresh(self, keys: List[RefreshKey], owners: Dict[str, Any]) -> List[BulkResult]:
+        results = self.__executor.map(lambda key: self.__fetch(key, owners.get(key[1])), keys)
+        with self.__lock, self.__connection:
+            for result in results:
+                if result.ok:
+                    items = result.value
+                    result.value = None if items is None else self.__store(result.item, items)
+                    self.__connection.execute("INSERT OR REPLACE INTO refreshes VALUES (?, ?, ?)",
+                                              result.item + (time.time(),))
+        return results
+
+    def __fetch(self, key: RefreshKey, owner: Any) -> Optional[List[Dict[str, Any]]]:
+        kind, scope = key
+        if kind in self._sdi_kinds:
+            sdi = self.api_driver.sdi(owner, scope)
+            list_method = sdi.machines.get_all if kind == "machines" else sdi.networks.get_all_networks
+        else:
+            list_method = self.__get_list_method(kind)
+
+        pages = list(Paginator(list_method).pages())
+        unchanged = all(page.from_cache for page in pages)
+        get_items = get_machines if kind == "machines" else get_results
+        items = [item for page in pages for item in get_items(page.detail)]
+        if kind == "sdis" and any("state" not in item for item in items):
+            statuses = self.__executor.map(self.__get_status, items)
+            unchanged = unchanged and all(result.ok and result.value.from_cache for result in statuses)
+            for result in statuses:
+                if result.ok and isinstance(result.value.detail, dict):
+                    result.item.setdefault("state", result.value.detail.get("state"))
+        return None if unchanged else items
+
+    def __get_list_method(self, kind: str) -> Callable[..., APIResponse]:
+        if kind == "tenancies":
+            return TenancyDriver(self.api_driver).get_all_tenancies
+        if kind == "users":
+            return UserDriver(self.api_driver).get_all_users
+        if kind == "sdis":
+            return SDIDriver(self.api_driver).get_all_sdis
+        return DiskDriver(self.api_driver).get_all
+
+    def __get_status(self, sdi: Dict[str, Any]) -> APIResponse:
+        return self.api_driver.sdi(get_key(sdi.get("user") or sdi.get("owner")), sdi["sdi_id"]).get_status()
+
+    def __store(self, key: RefreshKey, items: List[Dict[str, Any]]) -> int:
+        kind, scope = key
+        execute = self.__connection.execute
+        insert = self.__connection.executemany
+        if kind == "tenancies":
+            execute("DELETE FROM tenancies")
+            insert("INSERT OR REPLACE INTO tenancies VALUES (?, ?, ?)",
+                   [(get_key(item), item.get("name"), json.dumps(item)) for item in items])
+        elif kind == "users":
+            execute("DELETE FROM users")
+            insert("INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?)",
+                   [(get_key(item), item.get("username"), get_key(item.get("tenancy")), json.dumps(item)) for item in items])
+        elif kind == "sdis":
+            execute("DELETE FROM sdis")
+            insert("INSERT OR REPLACE INTO sdis VALUES (?, ?, ?, ?, ?)",
+                   [(str(item["sdi_id"]), get_key(item.get("user") or item.get("owner")), item.get("name"),
+                     None if item.get("state") is None else str(item["state"]), json.dumps(item)) for item in items])
+            for table in ("machines", "machine_disks", "machine_networks", "networks"):
+                execute("DELETE FROM {} WHERE sdi_id NOT IN (SELECT sdi_id FROM sdis)".format(table))
+            execute("DELETE FROM refreshes WHERE scope != '' AND scope NOT IN (SELECT sdi_id FROM sdis)")
+        elif kind == "disks":
+            execute("DELETE FROM disks")
+            insert("INSERT OR REPLACE INTO disks VALUES (?, ?, ?, ?)",
+                   [(str(item["image_id"]), get_key(item.get("user") or item.get("owner")), item.get("name"), json.dumps(item))
+                    for item in items])
+        elif kind == "machines":
+            for table in ("machines", "machine_disks", "machine_networks"):
+                execute("DELETE FROM {} WHERE sdi_id = ?".format(table), (scope,))
+            insert("INSERT OR REPLACE INTO machines VALUES (?, ?, ?, ?, ?)",
+                   [(str(item["id"]), scope, item.get("name"), item.get("role"), json.dumps(item)) for item in items])
+            insert("INSERT INTO machine_disks VALUES (?, ?, ?)",
+                   [(str(item["id"]), scope, str(get_key(drive, ("master_id", "image_id", "disk"))))
+                    for item in items for drive in item.get("drives") or []
+                    if get_key(drive, ("master_id", "image_id", "disk")) is not None])
+            insert("INSERT INTO machine_networks VALUES (?, ?, ?)",
+                   [(str(item["id"]), scope, str(get_key(interface, ("network",))))
+                    for item in items for interface in item.get("interfaces") or []
+                    if get_key(interface, ("network",)) is not None])
+        else:
+            execute("DELETE FROM networks WHERE sdi_id = ?", (scope,))
+            insert("INSERT OR REPLACE INTO networks VALUES (?, ?, ?, ?)",
+                   [(str(item["id"]), scope, item.get("name"), json.dumps(item)) for item in items])
+        return len(items)
+
+    @staticmethod
+    def __tenancy_condition(user_column: str, tenancy: Any) -> Tuple[str, Any]:
+        if isinstance(tenancy, str):
+            return ("{} IN (SELECT users.pk FROM users JOIN tenancies ON users.tenancy = tenancies.pk "
+                    "WHERE tenancies.name = ?)".format(user_column), tenancy)
+        return "{} IN (SELECT pk FROM users WHERE tenancy = ?)".format(user_column), tenancy
+
+    def __select(self, table: str, conditions: List[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+        used = [(condition, value) for condition, value in conditions if value is not None]
+        sql = "SELECT data FROM {}".format(table)
+        if used:
+            sql += " WHERE " + " AND ".join(condition for condition, _ in used)
+        return [json.loads(row["data"]) for row in self.query(sql, [value for _, value in used])]
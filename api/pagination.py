@@ -0,0 +1,88 @@
+"""Paginator class object"""
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import settings.general as g_settings
+from api import deadline
+from api.driver import APIDriverError
+from api.driver import APIResponse
+
+
+class PaginationError(APIDriverError):
+    """Raise exception when a page of a list cannot be retrieved"""
+
+
+def get_results(detail: Any) -> List[Any]:
+    """Return the list of items of a list response detail, paginated or not."""
+    if isinstance(detail, dict) and "results" in detail:
+        return detail["results"] or []
+    if isinstance(detail, list):
+        return detail
+    return []
+
+
+class Paginator:
+    """Iterate over every item of a list endpoint one page at a time.
+
+    list_method is any driver list method taking a params argument, e.g.
+    DiskDriver.get_all or functools.partial(SDIDriver.get_history, sdi_id).
+    Pages are requested with the PAGE_PARAM and PAGE_SIZE_PARAM query
+    parameters. While the items of one page are consumed, the next page is
+    already being fetched in a background thread. Endpoints that do not
+    paginate return everything as a single page.
+    """
+
+    def __init__(self, list_method: Callable[..., APIResponse], params: Dict[str, Any] = None,
+                 page_size: int = None, prefetch: bool = True) -> None:
+        """Initialize Paginator class object
+
+        :param list_method: Driver method returning one page of the list.
+        :type list_method: Callable taking params
+        :param params: Query parameters sent with every page, e.g. filters.
+        :type params: Dict[str, Any]
+        :param page_size: Items per page. Default is settings PAGE_SIZE.
+        :type page_size: int
+        :param prefetch: Fetch the next page while the current one is consumed.
+        :type prefetch: bool
+        """
+        self.list_method = list_method
+        self.params = dict(params or {})
+        self.page_size = page_size or g_settings.PAGE_SIZE
+        self.prefetch = prefetch
+        self.count = None # type: Optional[int]
+
+    def __iter__(self) -> Iterator[Any]:
+        for response in self.pages():
+            for item in get_results(response.detail):
+                yield item
+
+    def pages(self) -> Iterator[APIResponse]:
+        """Yield the APIResponse of each page in order."""
+        executor = ThreadPoolExecutor(max_workers=1) if self.prefetch else None
+        try:
+            page = 1
+            pending = self.__submit(executor, page)
+            while pending is not None:
+                response = pending.result() if isinstance(pending, Future) else self.list_method(params=pending)
+                if not response.ok:
+                    raise PaginationError("Failure to get page {}: {}".format(page, response))
+                detail = response.detail
+                has_next = isinstance(detail, dict) and bool(detail.get("next"))
+                if isinstance(detail, dict) and "count" in detail:
+                    self.count = detail["count"]
+
+                page += 1
+                pending = self.__submit(executor, page) if has_next else None
+                yield response
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def __submit(self, executor: Optional[ThreadPoolExecutor], page: int) -> Any:
+        params = dict(self.params)
+        params[g_settings.PAGE_PARAM] = page
+        params[g_settings.PAGE_SIZE_PARAM] = self.page_size
+        if executor is None:
+            return params
+        return executor.submit(deadline.bind(self.list_method), params=params)
@@ -1,3 +1,10 @@
 from api.sdis.machine import MachineDriver
 from api.sdis.network import NetworkDriver
 from api.sdis.sdi import SDIDriver
+from api.sdis.context import DriverContext, MachineContext, NetworkContext, SDIContext
+from api.sdis.power import PowerOrchestrator
+from api.sdis.checkpoints import CheckpointManager, RetentionPolicy
+from api.sdis.topology import TopologyGraph
+from api.sdis.ipam import IPAM
+from api.sdis.vlans import VLANConfigurator
+from api.sdis.rollout import RoutingRollout
@@ -0,0 +1,158 @@
+"""CheckpointManager class object"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import time
+
+import settings.general as g_settings
+from api.bulk import BulkExecutor, BulkResult
+from api.driver import APIDriver
+from api.driver import APIResponse
+from api.utils import get_timestamp
+
+# (user_pk, sdi_id) for SDI checkpoints, or (user_pk, sdi_id, machine_id) for machine snapshots
+CheckpointTarget = Union[Tuple[int, str], Tuple[int, str, str]]
+
+
+class CheckpointError(RuntimeError):
+    """Raise exception when the checkpoints or snapshots of a target cannot be listed"""
+
+
+class RetentionPolicy:
+    """Which checkpoints or snapshots of a target to delete.
+
+    Only items whose tag starts with prefix are managed. A managed item
+    expires when it is not one of the keep newest managed items, or when it
+    is older than max_age seconds. Items without a creation time are never
+    deleted.
+    """
+    _time_fields = ("created", "created_at", "timestamp", "date", "time")
+
+    def __init__(self, keep: int = None, max_age: float = None, prefix: str = "") -> None:
+        """Initialize RetentionPolicy class object
+
+        :param keep: Number of newest managed items to keep, or None for no limit.
+        :type keep: int
+        :param max_age: Age in seconds after which managed items expire, or None for no limit.
+        :type max_age: float
+        :param prefix: Tag prefix of the managed items, e.g. "nightly-".
+        :type prefix: str
+        """
+        self.keep = keep
+        self.max_age = max_age
+        self.prefix = prefix
+
+    def get_expired(self, items: List[Dict[str, Any]], now: float = None) -> List[str]:
+        """Return the tags of the expired items of a checkpoint or snapshot list."""
+        now = time.time() if now is None else now
+        dated = []
+        for item in items:
+            created = self.get_created(item)
+            tag = item.get("tag")
+            if tag is not None and str(tag).startswith(self.prefix) and created is not None:
+                dated.append((created, str(tag)))
+        dated.sort(reverse=True)
+
+        expired = []
+        for rank, (created, tag) in enumerate(dated):
+            if (self.keep is not None and rank >= self.keep) or (self.max_age is not None and now - created > self.max_age):
+                expired.append(tag)
+        return expired
+
+    @classmethod
+    def get_created(cls, item: Dict[str, Any]) -> Optional[float]:
+        """Return the creation time of a checkpoint or snapshot, or None."""
+        for field in cls._time_fields:
+            if field in item:
+                return get_timestamp(item[field])
+        return None
+
+
+class CheckpointManager:
+    """Create, list and garbage collect checkpoints and snapshots of many targets at once.
+
+    SDI targets get checkpoints and machine targets get snapshots. Creations
+    are staggered so SDI OS storage is not hit by all targets at the same
+    instant. Listing and deleting run concurrently, at most max_workers at a
+    time, and each target is listed once per call.
+    """
+
+    def __init__(self, api_driver: APIDriver, max_workers: int = None, stagger: float = None) -> None:
+        """Initialize CheckpointManager class object
+
+        :param api_driver: Allows CheckpointManager to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        :param max_workers: Most calls at once. Default is settings BULK_WORKERS.
+        :type max_workers: int
+        :param stagger: Seconds between the starts of consecutive creations. Default is settings CHECKPOINT_STAGGER.
+        :type stagger: float
+        """
+        self.api_driver = api_driver
+        stagger = g_settings.CHECKPOINT_STAGGER if stagger is None else stagger
+        self.__creator = BulkExecutor(max_workers, stagger)
+        self.__executor = BulkExecutor(max_workers)
+
+    def create(self, targets: Iterable[CheckpointTarget], tag: str, data: Dict[str, Any] = None) -> List[BulkResult]:
+        """Create a checkpoint or snapshot called tag on every target and return the results.
+
+        :param targets: SDIs and machines to checkpoint.
+        :type targets: Iterable[CheckpointTarget]
+        :param tag: Tag of the new checkpoints and snapshots.
+        :type tag: str
+        :param data: Extra fields of the create request.
+        :type data: Dict[str, Any]
+        """
+        create_data = dict(data or {})
+        create_data["tag"] = tag
+        return self.__creator.map(lambda target: self.__create(target, create_data), targets)
+
+    def get_all(self, targets: Iterable[CheckpointTarget]) -> List[BulkResult]:
+        """Return results holding the checkpoint or snapshot list of every target."""
+        return self.__executor.map(self.__get_all, targets)
+
+    def get_tags(self, targets: Iterable[CheckpointTarget]) -> Dict[CheckpointTarget, Optional[List[str]]]:
+        """Return the checkpoint or snapshot tags of every target, None for targets that could not be listed."""
+        return {result.item: [str(item["tag"]) for item in result.value if item.get("tag") is not None] if result.ok else None
+                for result in self.get_all(targets)}
+
+    def delete(self, tags: Iterable[Tuple[CheckpointTarget, str]]) -> List[BulkResult]:
+        """Delete (target, tag) checkpoints and snapshots and return the results."""
+        return self.__executor.map(self.__delete, tags)
+
+    def collect(self, targets: Iterable[CheckpointTarget], policy: RetentionPolicy, dry_run: bool = False) -> List[BulkResult]:
+        """Delete the checkpoints and snapshots of targets expired by policy and return the results.
+
+        Results are per (target, tag). Targets that could not be listed give a
+        failed result with tag None. With dry_run, nothing is deleted and the
+        results hold no value.
+        """
+        now = time.time()
+        expired = [] # type: List[Tuple[CheckpointTarget, str]]
+        failed = [] # type: List[BulkResult]
+        for result in self.get_all(targets):
+            if result.ok:
+                expired.extend((result.item, tag) for tag in policy.get_expired(result.value, now))
+            else:
+                failed.append(BulkResult((result.item, None), error=result.error))
+        if dry_run:
+            return failed + [BulkResult(item) for item in expired]
+        return failed + self.delete(expired)
+
+    def __create(self, target: CheckpointTarget, data: Dict[str, Any]) -> APIResponse:
+        sdi = self.api_driver.sdi(target[0], target[1])
+        if len(target) == 2:
+            return sdi.create_checkpoint(data)
+        return sdi.machine(target[2]).snapshots.create_snapshot(data)
+
+    def __get_all(self, target: CheckpointTarget) -> List[Dict[str, Any]]:
+        sdi = self.api_driver.sdi(target[0], target[1])
+        response = sdi.get_all_checkpoints() if len(target) == 2 else sdi.machine(target[2]).snapshots.get_snapshots()
+        if not response.ok:
+            raise CheckpointError("Failure to list checkpoints of {}: {}".format(target, response))
+        return response.detail or []
+
+    def __delete(self, target_tag: Tuple[CheckpointTarget, str]) -> APIResponse:
+        target, tag = target_tag
+        sdi = self.api_driver.sdi(target[0], target[1])
+        if len(target) == 2:
+            return sdi.delete_checkpoint(tag)
+        return sdi.machine(target[2]).snapshots.delete_snapshot(tag)
@@ -0,0 +1,221 @@
+"""SDIContext class object
+
+Contexts are immutable handles with the user, SDI and resource ids bound:
+
+    sdi = api_driver.sdi(user_pk, sdi_id)
+    sdi.get_status()
+    sdi.machine(machine_id).interfaces.get_vlans(conn_id)
+    sdi.networks.get_all_networks()
+
+Each context owns drivers whose pks are set once when it is created and never
+changed, so one context, or many contexts sharing one APIDriver, can be used
+from any number of threads without locking.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import functools
+import inspect
+
+from api.base_driver import BaseDriver
+from api.driver import APIDriver
+from api.sdis.machine import MachineDriver
+from api.sdis.machine_components import BaseMachine, DriveDriver, InterfaceDriver, RoutingDriver, SnapshotDriver
+from api.sdis.network import NetworkDriver
+from api.sdis.sdi import SDIDriver
+
+_methods = {} # type: Dict[Tuple[type, Optional[str]], Tuple[str, ...]]
+
+
+def get_methods(driver_class: type, arg: Optional[str]) -> Tuple[str, ...]:
+    """Return the public method names of driver_class whose first argument is arg.
+
+    With arg None, return the methods whose first argument is not a resource id.
+    """
+    key = (driver_class, arg)
+    if key not in _methods:
+        names = []
+        for name, member in inspect.getmembers(driver_class, inspect.isfunction):
+            if name.startswith("_") or name == "clear" or hasattr(BaseDriver, name):
+                continue
+            parameters = list(inspect.signature(member).parameters)[1:]
+            first = parameters[0] if parameters else None
+            if (first == arg) if arg is not None else (first is None or not first.endswith("_id")):
+                names.append(name)
+        _methods[key] = tuple(names)
+    return _methods[key]
+
+
+class DriverContext:
+    """Immutable view of a driver with a resource id bound to its methods.
+
+    Methods of the driver that take the bound id as their first argument are
+    available without it. Without a bound id, the methods that do not take a
+    resource id are available.
+    """
+    __slots__ = ("__driver", "__arg", "__value")
+
+    def __init__(self, driver: BaseDriver, arg: str = None, value: Any = None) -> None:
+        """Initialize DriverContext class object
+
+        :param driver: Driver with its pks already set. It must not be changed afterwards.
+        :type driver: BaseDriver class object
+        :param arg: Name of the first argument bound, e.g. "machine_id".
+        :type arg: str
+        :param value: Value of the bound argument.
+        :type value: Any
+        """
+        self.__driver = driver
+        self.__arg = arg
+        self.__value = value
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        if name.startswith("_") or name not in get_methods(type(self.__driver), self.__arg):
+            raise AttributeError("{} has no method {!r}".format(type(self).__name__, name))
+        method = getattr(self.__driver, name)
+        return method if self.__arg is None else functools.partial(method, self.__value)
+
+    def __dir__(self) -> List[str]:
+        return sorted(set(super().__dir__()) | set(get_methods(type(self.__driver), self.__arg)))
+
+    def __repr__(self) -> str:
+        bound = "" if self.__arg is None else " {}={!r}".format(self.__arg, self.__value)
+        return "<{} {}{}>".format(type(self).__name__, type(self.__driver).__name__, bound)
+
+    @property
+    def api_driver(self) -> APIDriver:
+        """APIDriver object the context makes its calls through."""
+        return self.__driver.api_driver
+
+    @property
+    def user_pk(self) -> Optional[int]:
+        """User's pk bound to the context."""
+        return self.__driver.user_pk
+
+    @property
+    def sdi_pk(self) -> Optional[str]:
+        """SDI's pk bound to the context, or None above SDI level."""
+        return getattr(self.__driver, "sdi_pk", None)
+
+
+def create_driver(driver_class: type, api_driver: APIDriver, user_pk: int, sdi_pk: str = None) -> BaseDriver:
+    """Return a new driver with its pks set."""
+    driver = driver_class(api_driver)
+    driver.user_pk = user_pk
+    if isinstance(driver, (BaseMachine, NetworkDriver)):
+        driver.sdi_pk = sdi_pk
+    return driver
+
+
+class MachineContext(DriverContext):
+    """Machine calls of one machine, e.g. context.start() or context.interfaces.get_vlans(conn_id)."""
+    __slots__ = ("__machine_id",)
+
+    def __init__(self, api_driver: APIDriver, user_pk: int, sdi_pk: str, machine_id: str) -> None:
+        """Initialize MachineContext class object
+
+        :param api_driver: Allows the context to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        :param user_pk: User's pk
+        :type user_pk: int
+        :param sdi_pk: SDI's pk
+        :type sdi_pk: str
+        :param machine_id: Machine's id
+        :type machine_id: str
+        """
+        super().__init__(create_driver(MachineDriver, api_driver, user_pk, sdi_pk), "machine_id", machine_id)
+        self.__machine_id = machine_id
+
+    @property
+    def machine_id(self) -> str:
+        """Machine's id bound to the context."""
+        return self.__machine_id
+
+    @property
+    def interfaces(self) -> DriverContext:
+        """Context of the machine's interface calls."""
+        return self.__component(InterfaceDriver)
+
+    @property
+    def drives(self) -> DriverContext:
+        """Context of the machine's drive calls."""
+        return self.__component(DriveDriver)
+
+    @property
+    def routing(self) -> DriverContext:
+        """Context of the machine's routing calls."""
+        return self.__component(RoutingDriver)
+
+    @property
+    def snapshots(self) -> DriverContext:
+        """Context of the machine's snapshot calls."""
+        return self.__component(SnapshotDriver)
+
+    def __component(self, driver_class: type) -> DriverContext:
+        driver = create_driver(driver_class, self.api_driver, self.user_pk, self.sdi_pk)
+        return DriverContext(driver, "machine_id", self.__machine_id)
+
+
+class NetworkContext(DriverContext):
+    """Network calls of one network, e.g. context.get_all_services()."""
+    __slots__ = ("__network_id",)
+
+    def __init__(self, api_driver: APIDriver, user_pk: int, sdi_pk: str, network_id: str) -> None:
+        """Initialize NetworkContext class object
+
+        :param api_driver: Allows the context to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        :param user_pk: User's pk
+        :type user_pk: int
+        :param sdi_pk: SDI's pk
+        :type sdi_pk: str
+        :param network_id: Network's id
+        :type network_id: str
+        """
+        super().__init__(create_driver(NetworkDriver, api_driver, user_pk, sdi_pk), "network_id", network_id)
+        self.__network_id = network_id
+
+    @property
+    def network_id(self) -> str:
+        """Network's id bound to the context."""
+        return self.__network_id
+
+
+class SDIContext(DriverContext):
+    """SDI calls of one SDI, e.g. context.start(), and contexts of its machines and networks."""
+    __slots__ = ("__sdi_id",)
+
+    def __init__(self, api_driver: APIDriver, user_pk: int, sdi_id: str) -> None:
+        """Initialize SDIContext class object
+
+        :param api_driver: Allows the context to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        :param user_pk: User's pk
+        :type user_pk: int
+        :param sdi_id: SDI's id
+        :type sdi_id: str
+        """
+        super().__init__(create_driver(SDIDriver, api_driver, user_pk), "sdi_id", sdi_id)
+        self.__sdi_id = sdi_id
+
+    @property
+    def sdi_pk(self) -> str:
+        """SDI's pk bound to the context."""
+        return self.__sdi_id
+
+    @property
+    def machines(self) -> DriverContext:
+        """Context of the SDI's machine list calls, e.g. get_all() and create(data)."""
+        return DriverContext(create_driver(MachineDriver, self.api_driver, self.user_pk, self.__sdi_id))
+
+    @property
+    def networks(self) -> DriverContext:
+        """Context of the SDI's network list calls, e.g. get_all_networks() and create(data)."""
+        return DriverContext(create_driver(NetworkDriver, self.api_driver, self.user_pk, self.__sdi_id))
+
+    def machine(self, machine_id: str) -> MachineContext:
+        """Return the context of one of the SDI's machines."""
+        return MachineContext(self.api_driver, self.user_pk, self.__sdi_id, machine_id)
+
+    def network(self, network_id: str) -> NetworkContext:
+        """Return the context of one of the SDI's networks."""
+        return NetworkContext(self.api_driver, self.user_pk, self.__sdi_id, network_id)
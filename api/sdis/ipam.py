@@ -0,0 +1,358 @@
+"""AddressIndex and IPAM class objects"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import bisect
+import functools
+import ipaddress
+import threading
+
+from api.bulk import BulkExecutor, BulkResult
+from api.driver import APIDriver
+from api.driver import APIResponse
+from api.pagination import PaginationError, Paginator
+
+Address = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+Subnet = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+class IPAMError(RuntimeError):
+    """Raise exception when an allocation does not fit in the DHCP subnets of a network"""
+
+
+class Allocation:
+    """An address range of a network: a DHCP service subnet or a DHCP pool"""
+
+    def __init__(self, first: Address, last: Address, network_id: str, service_id: Any = None,
+                 pool_id: Any = None, subnet: Subnet = None) -> None:
+        """Initialize Allocation class object
+
+        :param first: First address of the range.
+        :type first: IPv4Address or IPv6Address
+        :param last: Last address of the range.
+        :type last: IPv4Address or IPv6Address
+        :param network_id: Network the range belongs to.
+        :type network_id: str
+        :param service_id: DHCP service of the range.
+        :type service_id: Any
+        :param pool_id: DHCP pool of the range, None for a service subnet or a pending pool.
+        :type pool_id: Any
+        :param subnet: Subnet of the range when it is a service subnet.
+        :type subnet: IPv4Network or IPv6Network
+        """
+        self.first = first
+        self.last = last
+        self.network_id = network_id
+        self.service_id = service_id
+        self.pool_id = pool_id
+        self.subnet = subnet
+
+    def __repr__(self) -> str:
+        name = str(self.subnet) if self.subnet is not None else "pool {}".format(self.pool_id)
+        return "<Allocation {} {}-{} network {}>".format(name, self.first, self.last, self.network_id)
+
+    @property
+    def size(self) -> int:
+        """Number of addresses in the range."""
+        return int(self.last) - int(self.first) + 1
+
+
+def get_address(item: Dict[str, Any], fields: Tuple[str, ...]) -> Optional[Address]:
+    """Return the address in the first of fields of item that holds one, or None."""
+    for field in fields:
+        try:
+            return ipaddress.ip_address(str(item[field]).split("/")[0])
+        except (KeyError, ValueError):
+            continue
+    return None
+
+
+def get_subnet(item: Dict[str, Any], fields: Tuple[str, ...]) -> Optional[Subnet]:
+    """Return the subnet in the first of fields of item that holds one, with a "netmask" or "prefix" field if any."""
+    for field in fields:
+        if item.get(field) is None:
+            continue
+        value = str(item[field])
+        mask = item.get("netmask", item.get("prefix"))
+        if "/" not in value and mask is not None:
+            value = "{}/{}".format(value, mask)
+        try:
+            return ipaddress.ip_network(value, strict=False)
+        except ValueError:
+            continue
+    return None
+
+
+class AddressIndex:
+    """Interval tree of the address ranges of one address family.
+
+    Ranges are kept sorted by first address in parallel arrays; the tree is
+    implicit, the middle range of each slice being the root of that slice,
+    and each root keeps the highest last address of its slice. An overlap
+    query walks O(log n + k) ranges instead of all of them. Ranges added one
+    at a time are inserted in order and the highest last addresses are
+    recomputed on the next query.
+    """
+
+    def __init__(self, allocations: Iterable[Allocation] = ()) -> None:
+        """Initialize AddressIndex class object
+
+        :param allocations: Ranges of one address family.
+        :type allocations: Iterable[Allocation]
+        """
+        ordered = sorted(allocations, key=lambda allocation: int(allocation.first))
+        self.__firsts = [int(allocation.first) for allocation in ordered]
+        self.__allocations = ordered
+        self.__max_lasts = [] # type: List[int]
+        self.__dirty = True
+
+    def __len__(self) -> int:
+        return len(self.__allocations)
+
+    def __iter__(self) -> Any:
+        return iter(list(self.__allocations))
+
+    def add(self, allocation: Allocation) -> None:
+        """Add a range."""
+        position = bisect.bisect_right(self.__firsts, int(allocation.first))
+        self.__firsts.insert(position, int(allocation.first))
+        self.__allocations.insert(position, allocation)
+        self.__dirty = True
+
+    def remove(self, allocation: Allocation) -> None:
+        """Remove a range added before."""
+        position = self.__allocations.index(allocation)
+        del self.__firsts[position]
+        del self.__allocations[position]
+        self.__dirty = True
+
+    def get_overlaps(self, first: int, last: int) -> List[Allocation]:
+        """Return the ranges holding any address from first to last, as integers, in order."""
+        if self.__dirty:
+            self.__max_lasts = [0] * len(self.__allocations)
+            self.__build(0, len(self.__allocations))
+            self.__dirty = False
+        found = [] # type: List[Allocation]
+        self.__query(0, len(self.__allocations), first, last, found)
+        return found
+
+    def __build(self, low: int, high: int) -> int:
+        if low >= high:
+            return -1
+        middle = (low + high) // 2
+        highest = max(int(self.__allocations[middle].last), self.__build(low, middle), self.__build(middle + 1, high))
+        self.__max_lasts[middle] = highest
+        return highest
+
+    def __query(self, low: int, high: int, first: int, last: int, found: List[Allocation]) -> None:
+        if low >= high:
+            return
+        middle = (low + high) // 2
+        if self.__max_lasts[middle] < first:
+            return
+        self.__query(low, middle, first, last, found)
+        if self.__firsts[middle] > last:
+            return
+        if int(self.__allocations[middle].last) >= first:
+            found.append(self.__allocations[middle])
+        self.__query(middle + 1, high, first, last, found)
+
+
+class IPAM:
+    """Address management over the DHCP services and pools of an SDI.
+
+    load lists the networks, then every network's services, then the pools
+    of every DHCP service, each step concurrently and page by page, and
+    indexes service subnets and pools in one AddressIndex per address
+    family. Subnets whose pools could not be listed are left out, so they
+    are never allocated from. Overlap and free range queries then run
+    locally, and allocate creates any number of pools in one concurrent
+    batch, reserving their ranges first so that pools allocated together
+    never overlap.
+    """
+    _service_types = ("dhcp",)
+    _type_fields = ("type", "service", "kind", "name")
+    _subnet_fields = ("subnet", "network", "cidr")
+    _first_fields = ("start", "range_start", "first", "begin")
+    _last_fields = ("end", "range_end", "last", "stop")
+    _start_field = "start"
+    _end_field = "end"
+
+    def __init__(self, api_driver: APIDriver, user_pk: int, sdi_id: str, max_workers: int = None) -> None:
+        """Initialize IPAM class object
+
+        :param api_driver: Allows IPAM to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        :param user_pk: pk of the SDI's owner.
+        :type user_pk: int
+        :param sdi_id: SDI whose addresses are managed.
+        :type sdi_id: str
+        :param max_workers: Most calls at once. Default is settings BULK_WORKERS.
+        :type max_workers: int
+        """
+        self.sdi = api_driver.sdi(user_pk, sdi_id)
+        self.__executor = BulkExecutor(max_workers)
+        self.__lock = threading.RLock()
+        self.__indexes = {4: AddressIndex(), 6: AddressIndex()} # type: Dict[int, AddressIndex]
+
+    def load(self) -> List[BulkResult]:
+        """Fetch every DHCP service and pool and rebuild the index. Return the failed fetches."""
+        try:
+            network_ids = [str(network["id"]) for network in Paginator(self.sdi.networks.get_all_networks)]
+        except PaginationError as err:
+            return [BulkResult("networks", error=err)]
+
+        listed = self.__executor.map(lambda network_id: self.__get_list(self.sdi.network(network_id).get_all_services),
+                                     network_ids)
+        services = [(result.item, service) for result in listed if result.ok for service in result.value
+                    if self.is_dhcp(service)]
+        pooled = self.__executor.map(lambda network_service: self.__get_list(functools.partial(
+            self.sdi.network(network_service[0]).get_dhcp_pools, network_service[1]["id"])), services)
+
+        allocations = [] # type: List[Allocation]
+        for (network_id, service), result in zip(services, pooled):
+            # Without all its pools a subnet would look free, so it is left out for allocate
+            if not result.ok:
+                continue
+            subnet = get_subnet(service, self._subnet_fields)
+            if subnet is not None:
+                allocations.append(Allocation(subnet[0], subnet[-1], network_id, service["id"], subnet=subnet))
+            for pool in result.value:
+                first = get_address(pool, self._first_fields)
+                last = get_address(pool, self._last_fields)
+                if first is not None and last is not None:
+                    allocations.append(Allocation(first, last, network_id, service["id"], pool.get("id")))
+
+        with self.__lock:
+            self.__indexes = {version: AddressIndex(allocation for allocation in allocations if allocation.first.version == version)
+                              for version in (4, 6)}
+        return [result for result in listed + pooled if not result.ok]
+
+    @classmethod
+    def is_dhcp(cls, service: Dict[str, Any]) -> bool:
+        """Return True if a service item is a DHCP service, or has no type field."""
+        present = [field for field in cls._type_fields if service.get(field) is not None]
+        if not present:
+            return True
+        return any(str(service[field]).lower().startswith(cls._service_types) for field in present)
+
+    def get_subnets(self, network_id: str = None) -> List[Allocation]:
+        """Return the indexed DHCP service subnets, optionally of one network."""
+        with self.__lock:
+            return [allocation for index in self.__indexes.values() for allocation in index
+                    if allocation.subnet is not None and network_id in (None, allocation.network_id)]
+
+    def get_pools(self, network_id: str = None) -> List[Allocation]:
+        """Return the indexed DHCP pools, optionally of one network."""
+        with self.__lock:
+            return [allocation for index in self.__indexes.values() for allocation in index
+                    if allocation.subnet is None and network_id in (None, allocation.network_id)]
+
+    def get_overlaps(self, first: Union[str, Address], last: Union[str, Address] = None,
+                     pools_only: bool = True) -> List[Allocation]:
+        """Return the pools, and subnets unless pools_only, holding any address of a range or CIDR subnet."""
+        first_address, last_address = self.__get_range(first, last)
+        with self.__lock:
+            found = self.__indexes[first_address.version].get_overlaps(int(first_address), int(last_address))
+        return [allocation for allocation in found if not pools_only or allocation.subnet is None]
+
+    def get_conflicts(self) -> List[Tuple[Allocation, Allocation]]:
+        """Return every pair of indexed pools that share addresses."""
+        conflicts = []
+        with self.__lock:
+            for index in self.__indexes.values():
+                open_pools = [] # type: List[Allocation]
+                for pool in (allocation for allocation in index if allocation.subnet is None):
+                    open_pools = [other for other in open_pools if int(other.last) >= int(pool.first)]
+                    conflicts.extend((other, pool) for other in open_pools)
+                    open_pools.append(pool)
+        return conflicts
+
+    def get_free(self, subnet: Union[str, Subnet], size: int = 1) -> List[Tuple[Address, Address]]:
+        """Return the (first, last) ranges of at least size addresses of a subnet not used by any pool.
+
+        The network and broadcast addresses of IPv4 subnets are left out.
+        """
+        subnet = ipaddress.ip_network(str(subnet), strict=False)
+        first, last = int(subnet[0]), int(subnet[-1])
+        if subnet.version == 4 and subnet.num_addresses > 2:
+            first, last = first + 1, last - 1
+        with self.__lock:
+            used = [allocation for allocation in self.__indexes[subnet.version].get_overlaps(first, last)
+                    if allocation.subnet is None]
+        free = []
+        cursor = first
+        for pool in used:
+            if int(pool.first) - cursor >= size:
+                free.append((cursor, int(pool.first) - 1))
+            cursor = max(cursor, int(pool.last) + 1)
+        if last - cursor + 1 >= size:
+            free.append((cursor, last))
+        address = type(subnet[0])
+        return [(address(start), address(end)) for start, end in free]
+
+    def allocate(self, requests: Iterable[Tuple[str, int]], data: Dict[str, Any] = None) -> List[BulkResult]:
+        """Create a pool of size addresses on the DHCP service of each (network_id, size) and return the results.
+
+        Each pool gets the first free range of its network's service subnet.
+        All ranges are reserved before the pools are created concurrently,
+        and released again if their creation fails. A request whose network
+        has no DHCP subnet or no room fails with IPAMError.
+
+        :param requests: (network_id, number of addresses) of each pool.
+        :type requests: Iterable[Tuple[str, int]]
+        :param data: Extra fields of every create request.
+        :type data: Dict[str, Any]
+        """
+        planned = [] # type: List[Tuple[Tuple[str, int], Optional[Allocation], Optional[IPAMError]]]
+        with self.__lock:
+            for network_id, size in requests:
+                try:
+                    planned.append(((network_id, size), self.__reserve(network_id, size), None))
+                except IPAMError as err:
+                    planned.append(((network_id, size), None, err))
+
+        to_create = [(request, allocation) for request, allocation, _ in planned if allocation is not None]
+        created = iter(self.__executor.map(lambda request_allocation: self.__create(request_allocation[1], data), to_create))
+        results = []
+        for request, allocation, error in planned:
+            if allocation is None:
+                results.append(BulkResult(request, error=error))
+                continue
+            result = next(created)
+            result.item = request
+            if result.ok:
+                detail = result.value.detail
+                allocation.pool_id = detail.get("id") if isinstance(detail, dict) else None
+            else:
+                with self.__lock:
+                    self.__indexes[allocation.first.version].remove(allocation)
+            results.append(result)
+        return results
+
+    def __reserve(self, network_id: str, size: int) -> Allocation:
+        for subnet in self.get_subnets(network_id):
+            free = self.get_free(subnet.subnet, size)
+            if free:
+                first = free[0][0]
+                allocation = Allocation(first, first + (size - 1), network_id, subnet.service_id)
+                self.__indexes[first.version].add(allocation)
+                return allocation
+        raise IPAMError("No DHCP subnet of network {} has {} free addresses".format(network_id, size))
+
+    def __create(self, allocation: Allocation, data: Optional[Dict[str, Any]]) -> APIResponse:
+        pool_data = dict(data or {})
+        pool_data[self._start_field] = str(allocation.first)
+        pool_data[self._end_field] = str(allocation.last)
+        return self.sdi.network(allocation.network_id).create_dhcp_pool(allocation.service_id, pool_data)
+
+    @staticmethod
+    def __get_range(first: Union[str, Address], last: Union[str, Address, None]) -> Tuple[Address, Address]:
+        if last is None:
+            subnet = ipaddress.ip_network(str(first), strict=False)
+            return subnet[0], subnet[-1]
+        return ipaddress.ip_address(str(first)), ipaddress.ip_address(str(last))
+
+    @staticmethod
+    def __get_list(list_method: Callable[..., APIResponse]) -> List[Dict[str, Any]]:
+        # Lists already run concurrently, so pages are not prefetched in more threads
+        return list(Paginator(list_method, prefetch=False))
@@ -2,6 +2,7 @@
 from typing import Any, Dict, Optional
 
 from api.base_driver import BaseDriver
+from api.deadline import Deadline
 from api.sdis.machine_components import BaseMachine, DriveDriver, InterfaceDriver, RoutingDriver, SnapshotDriver
 from api.driver import APIDriver
 from api.driver import APIResponse
@@ -15,66 +16,72 @@ class MachineDriver(BaseMachine):
     def __init__(self, api_driver: APIDriver) -> None:
         """Initialize MachineDriver class
 
+        The interface, drive, routing and snapshot drivers are created on first use.
+
         :param api_driver: Allows MachineDriver to communicate with SDI OS
         :type api_driver: APIDriver class object
         """
         super().__init__(api_driver)
-        self.__interface_driver = InterfaceDriver(api_driver)
-        self.__drive_driver = DriveDriver(api_driver)
-        self.__routing_driver = RoutingDriver(api_driver)
-        self.__snapshot_driver = SnapshotDriver(api_driver)
+        self.__components = {} # type: Dict[type, BaseMachine]
 
     @property
     def sdi_pk(self) -> Optional[str]:
         """String to store SDI's pk used for machine calls"""
-        return self.__sdi_pk
+        return BaseMachine.sdi_pk.fget(self)
 
     @sdi_pk.setter
     def sdi_pk(self, sdi_pk: str) -> None:
-        self.__sdi_pk = sdi_pk
-        self.__interface_driver.sdi_pk = sdi_pk
-        self.__routing_driver.sdi_pk = sdi_pk
-        self.__snapshot_driver.sdi_pk = sdi_pk
+        BaseMachine.sdi_pk.fset(self, sdi_pk)
+        for component in self.__components.values():
+            component.sdi_pk = sdi_pk
 
     @property
     def user_pk(self) -> Optional[int]:
         """String to store user's pk used for machine calls"""
-        return self.__user_pk
+        return BaseMachine.user_pk.fget(self)
 
     @user_pk.setter
     def user_pk(self, user_pk: int) -> None:
-        self.__user_pk = user_pk
-        self.__interface_driver.user_pk = user_pk
-        self.__routing_driver.user_pk = user_pk
-        self.__snapshot_driver.user_pk = user_pk
+        BaseMachine.user_pk.fset(self, user_pk)
+        for component in self.__components.values():
+            component.user_pk = user_pk
 
     @property
     def interface(self) -> InterfaceDriver:
         """Interface driver object used to make calls specific to machine interfaces"""
-        return self.__interface_driver
+        return self.__component(InterfaceDriver)
 
     @property
     def drive(self) -> DriveDriver:
         """Drive driver object used to make calls specific to machine drives"""
-        return self.__drive_driver
+        return self.__component(DriveDriver)
 
     @property
     def routing(self) -> RoutingDriver:
         """Router driver object used to make calls specific to machine routing"""
-        return self.__routing_driver
+        return self.__component(RoutingDriver)
 
     @property
     def snapshot(self) -> SnapshotDriver:
         """Snapshot driver object used to make calls specific to machine snapshots"""
-        return self.__snapshot_driver
+        return self.__component(SnapshotDriver)
+
+    def __component(self, driver_class: type) -> BaseMachine:
+        component = self.__components.get(driver_class)
+        if component is None:
+            component = driver_class(self.api_driver)
+            component.user_pk = self.user_pk
+            component.sdi_pk = self.sdi_pk
+            component = self.__components.setdefault(driver_class, component)
+        return component
 
     def create(self, data: Dict[str, Any]) -> APIResponse:
         """Create machine and return response."""
         return self._post("list", {"pk": self.user_pk, "sdi_id": self.sdi_pk}, data)
 
-    def get_all(self) -> APIResponse:
+    def get_all(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get all machines in the sdi and return response."""
-        return self._get("list", {"pk": self.user_pk, "sdi_id": self.sdi_pk})
+        return self._get("list", {"pk": self.user_pk, "sdi_id": self.sdi_pk}, params)
 
     def get_machine(self, machine_id: str) -> APIResponse:
         """Get machine details and return response."""
@@ -114,17 +121,18 @@ class MachineDriver(BaseMachine):
             print(response)
         return None
 
-    def is_machines_running(self) -> Optional[bool]:
-        """Check if all machines in sdi are running and return boolean."""
+    def is_machines_running(self, timeout: float = None) -> Optional[bool]:
+        """Check if all machines in sdi are running within timeout seconds and return boolean."""
         all_running = None
-        response = self.get_all()
-        if response.ok:
-            all_running = True
-            machines_list = response.detail["user"] + response.detail["managed"]
-            for machine in machines_list:
-                running = self.is_running(machine["id"])
-                if not running:
-                    all_running = False
+        with Deadline(timeout):
+            response = self.get_all()
+            if response.ok:
+                all_running = True
+                machines_list = response.detail["user"] + response.detail["managed"]
+                for machine in machines_list:
+                    running = self.is_running(machine["id"])
+                    if not running:
+                        all_running = False
         return all_running
 
     def kill(self, machine_id: str) -> APIResponse:
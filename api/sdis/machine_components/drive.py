@@ -19,9 +19,9 @@ class DriveDriver(BaseMachine):
         """
         super().__init__(api_driver)
 
-    def get_drives(self, machine_id: str) -> APIResponse:
+    def get_drives(self, machine_id: str, params: Dict[str, Any] = None) -> APIResponse:
         """Get machine's drives and return a response."""
-        return self._get("list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id})
+        return self._get("list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id}, params)
 
     def delete_drive(self, machine_id: str, slot: int) -> APIResponse:
         """Remove machine's drive in given slot and return a response."""
@@ -19,9 +19,9 @@ class InterfaceDriver(BaseMachine):
         """
         super().__init__(api_driver)
 
-    def get_interfaces(self, machine_id: str) -> APIResponse:
+    def get_interfaces(self, machine_id: str, params: Dict[str, Any] = None) -> APIResponse:
         """Get machine's interfaces and return response."""
-        return self._get("list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id})
+        return self._get("list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id}, params)
 
     def create_interface(self, machine_id: str, data: Dict[str, Any]) -> APIResponse:
         """Create interface for machine and return response."""
@@ -39,13 +39,13 @@ class InterfaceDriver(BaseMachine):
         """Delete an interface and return a response."""
         return self._delete("detail", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id, "connection_id": conn_id})
 
-    def get_ports(self, machine_id: str, conn_id: str) -> APIResponse:
+    def get_ports(self, machine_id: str, conn_id: str, params: Dict[str, Any] = None) -> APIResponse:
         """Get the machine's port list and return a response."""
-        return self._get("port_list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id, "connection_id": conn_id})
+        return self._get("port_list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id, "connection_id": conn_id}, params)
 
-    def get_vlans(self, machine_id: str, conn_id: str) -> APIResponse:
+    def get_vlans(self, machine_id: str, conn_id: str, params: Dict[str, Any] = None) -> APIResponse:
         """Get the machine's vlan list and return a response."""
-        return self._get("vlan_list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id, "connection_id": conn_id})
+        return self._get("vlan_list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id, "connection_id": conn_id}, params)
 
     def create_vlan(self, machine_id: str, conn_id: str, data: Dict[str, Any]) -> APIResponse:
         """Create a machine vlan and return response."""
@@ -63,9 +63,9 @@ class InterfaceDriver(BaseMachine):
         """Delete machine's vlan and return response."""
         return self._delete("vlan_detail", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id, "connection_id": conn_id, "vlan_id": vlan_id})
 
-    def get_vlan_ports(self, machine_id: str, conn_id: str, vlan_id: int) -> APIResponse:
+    def get_vlan_ports(self, machine_id: str, conn_id: str, vlan_id: int, params: Dict[str, Any] = None) -> APIResponse:
         """Get machine's vlan port forwarders and return response."""
-        return self._get("vlan_port_list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id, "connection_id": conn_id, "vlan_id": vlan_id})
+        return self._get("vlan_port_list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id, "connection_id": conn_id, "vlan_id": vlan_id}, params)
 
     def create_vlan_port(self, machine_id: str, conn_id: str, vlan_id: int, data: Dict[str, Any]) -> APIResponse:
         """Create a vlan port forwarder and return response."""
@@ -39,9 +39,9 @@ class RoutingDriver(BaseMachine):
         """Modify managed router keychains and return response."""
         return self._put("keychains", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id}, data)
 
-    def get_router_interfaces(self, machine_id: str) -> APIResponse:
+    def get_router_interfaces(self, machine_id: str, params: Dict[str, Any] = None) -> APIResponse:
         """Get managed router interfaces and return response."""
-        return self._get("interface_list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id})
+        return self._get("interface_list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id}, params)
 
     def get_router_interface(self, machine_id: str, conn_id: str) -> APIResponse:
         """Get managed router interface detail and return response."""
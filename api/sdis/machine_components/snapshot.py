@@ -19,9 +19,9 @@ class SnapshotDriver(BaseMachine):
         """
         super().__init__(api_driver)
 
-    def get_snapshots(self, machine_id: str) -> APIResponse:
+    def get_snapshots(self, machine_id: str, params: Dict[str, Any] = None) -> APIResponse:
         """Get all machine snapshots and return response."""
-        return self._get("list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id})
+        return self._get("list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id}, params)
 
     def is_snapshot(self, machine_id: str, snap_tag: str) -> Optional[bool]:
         """Check if snapshot tag is saved on the machine and return boolean."""
@@ -42,3 +42,7 @@ class SnapshotDriver(BaseMachine):
     def apply_snapshot(self, machine_id: str, tag: str) -> APIResponse:
         """Apply machine snapshot and return response."""
         return self._put("detail", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id, "snap_tag": tag})
+
+    def delete_snapshot(self, machine_id: str, tag: str) -> APIResponse:
+        """Delete machine snapshot and return response."""
+        return self._delete("detail", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "machine_id": machine_id, "snap_tag": tag})
@@ -51,15 +51,15 @@ class NetworkDriver(BaseDriver):
         """Delete a network and return response."""
         return self._delete("detail", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "network_id": network_id})
 
-    def get_all_networks(self, user_pk: int = None, sdi_pk: str = None) -> APIResponse:
+    def get_all_networks(self, user_pk: int = None, sdi_pk: str = None, params: Dict[str, Any] = None) -> APIResponse:
         """Get all networks in a sdi and return response."""
         url_args = {"pk": self.user_pk if user_pk is None else user_pk,
                     "sdi_id": self.sdi_pk if sdi_pk is None else sdi_pk}
-        return self._get("list", url_args)
+        return self._get("list", url_args, params)
 
-    def get_all_services(self, network_id: str) -> APIResponse:
+    def get_all_services(self, network_id: str, params: Dict[str, Any] = None) -> APIResponse:
         """Get network's services and return response."""
-        return self._get("service_list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "network_id": network_id})
+        return self._get("service_list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "network_id": network_id}, params)
 
     def create_service(self, network_id: str, data: Dict[str, Any]) -> APIResponse:
         """Create service for network and return response."""
@@ -77,9 +77,9 @@ class NetworkDriver(BaseDriver):
         """Delete network's service and return response."""
         return self._delete("service_detail", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "network_id": network_id, "service_id": service_id})
 
-    def get_dhcp_pools(self, network_id: str, service_id: int) -> APIResponse:
+    def get_dhcp_pools(self, network_id: str, service_id: int, params: Dict[str, Any] = None) -> APIResponse:
         """Get all DHCP pools for network and return response."""
-        return self._get("pool_list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "network_id": network_id, "service_id": service_id})
+        return self._get("pool_list", {"pk": self.user_pk, "sdi_id": self.sdi_pk, "network_id": network_id, "service_id": service_id}, params)
 
     def create_dhcp_pool(self, network_id: str, service_id: int, data: Dict[str, Any]) -> APIResponse:
         """Create dhcp pool for network and return response."""
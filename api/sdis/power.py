@@ -0,0 +1,146 @@
+"""PowerOrchestrator class object"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import time
+
+import settings.general as g_settings
+from api import deadline
+from api.bulk import BulkExecutor, BulkResult
+from api.driver import APIDriver
+from api.driver import APIResponse
+
+# (user_pk, sdi_id) of an SDI, or (user_pk, sdi_id, machine_id) of a machine
+PowerTarget = Union[Tuple[int, str], Tuple[int, str, str]]
+
+
+class PowerError(RuntimeError):
+    """Raise exception when a power action does not apply or a target does not reach its state"""
+
+
+class PowerOrchestrator:
+    """Power many SDIs or machines at once, optionally in ordered waves.
+
+    The targets of a wave get their action concurrently, at most max_workers
+    at a time. The orchestrator then polls the status of every target of the
+    wave still changing in one concurrent round per poll_interval, and starts
+    the next wave once all of them reached the requested state. SDI targets
+    support start and stop; machine targets support start, kill, acpi,
+    suspend and resume. Suspended machines are not waited for.
+    """
+    _sdi_states = {"start": "2", "stop": "0"}
+    _machine_states = {"start": True, "resume": True, "kill": False, "acpi": False, "suspend": None}
+
+    def __init__(self, api_driver: APIDriver, max_workers: int = None, poll_interval: float = None, timeout: float = None) -> None:
+        """Initialize PowerOrchestrator class object
+
+        :param api_driver: Allows PowerOrchestrator to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        :param max_workers: Most actions or status polls at once. Default is settings BULK_WORKERS.
+        :type max_workers: int
+        :param poll_interval: Seconds between status polls. Default is settings POWER_POLL_INTERVAL.
+        :type poll_interval: float
+        :param timeout: Longest wait in seconds for a wave to reach its state. Default is settings POWER_TIMEOUT.
+        :type timeout: float
+        """
+        self.api_driver = api_driver
+        self.poll_interval = g_settings.POWER_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.timeout = g_settings.POWER_TIMEOUT if timeout is None else timeout
+        self.__executor = BulkExecutor(max_workers)
+
+    def start(self, waves: Sequence[Iterable[PowerTarget]], stop_on_failure: bool = True) -> List[BulkResult]:
+        """Start SDIs or machines wave by wave and return the results."""
+        return self.run("start", waves, stop_on_failure)
+
+    def stop(self, waves: Sequence[Iterable[PowerTarget]], stop_on_failure: bool = True) -> List[BulkResult]:
+        """Stop SDIs, or ACPI shutdown machines, wave by wave and return the results."""
+        return self.run("stop", waves, stop_on_failure)
+
+    def run(self, action: str, waves: Sequence[Iterable[PowerTarget]], stop_on_failure: bool = True) -> List[BulkResult]:
+        """Run action on each wave of targets in turn and return the results of all targets in order.
+
+        A result is ok when its action succeeded and the target reached the
+        requested state within timeout.
+
+        :param action: "start", "stop", "kill", "acpi", "suspend" or "resume". "stop" of a machine is "acpi".
+        :type action: str
+        :param waves: Lists of targets. A single list runs all targets at once.
+        :type waves: Sequence[Iterable[PowerTarget]]
+        :param stop_on_failure: Skip the remaining waves once a target of a wave fails.
+        :type stop_on_failure: bool
+        """
+        results = [] # type: List[BulkResult]
+        for wave in waves:
+            wave = list(wave)
+            if stop_on_failure and any(not result.ok for result in results):
+                error = PowerError("Skipped after a failure in an earlier wave")
+                results.extend(BulkResult(target, error=error) for target in wave)
+                continue
+
+            wave_results = self.__executor.map(lambda target: self.__act(action, target), wave)
+            waiting = {result.item: result for result in wave_results
+                       if result.ok and self.__get_desired(action, result.item) is not None}
+            for target in self.wait(action, list(waiting)):
+                waiting[target].error = PowerError("{} did not reach the {} state within {} seconds".format(
+                    target, action, self.timeout))
+            results.extend(wave_results)
+        return results
+
+    def wait(self, action: str, targets: List[PowerTarget]) -> Set[PowerTarget]:
+        """Poll targets until all reached the state of action and return those that did not within timeout."""
+        left = deadline.remaining()
+        expires = time.monotonic() + (self.timeout if left is None else min(self.timeout, left))
+        pending = list(targets)
+        while pending:
+            polled = self.__executor.map(self.__get_state, pending)
+            pending = [result.item for result in polled
+                       if result.error is not None or result.value != self.__get_desired(action, result.item)]
+            if not pending or time.monotonic() + self.poll_interval > expires:
+                break
+            time.sleep(self.poll_interval)
+        return set(pending)
+
+    @staticmethod
+    def get_waves(targets: Iterable[PowerTarget], role: Union[Callable[[PowerTarget], str], Dict[PowerTarget, str]],
+                  order: Sequence[str] = ("router", "server", "client")) -> List[List[PowerTarget]]:
+        """Return targets grouped into waves by role, in order. Targets with other roles form the last wave.
+
+        :param targets: SDIs or machines to group.
+        :type targets: Iterable[PowerTarget]
+        :param role: Role of each target, as a function or a dict.
+        :type role: Callable[[PowerTarget], str] or Dict[PowerTarget, str]
+        :param order: Roles of the waves, first wave first.
+        :type order: Sequence[str]
+        """
+        get_role = role.get if isinstance(role, dict) else role
+        waves = [[] for _ in range(len(order) + 1)] # type: List[List[PowerTarget]]
+        for target in targets:
+            target_role = get_role(target)
+            waves[order.index(target_role) if target_role in order else len(order)].append(target)
+        return [wave for wave in waves if wave]
+
+    def __get_desired(self, action: str, target: PowerTarget) -> Optional[Any]:
+        if len(target) == 2:
+            return self._sdi_states[action]
+        return self._machine_states["acpi" if action == "stop" else action]
+
+    def __act(self, action: str, target: PowerTarget) -> APIResponse:
+        if len(target) == 2:
+            if action not in self._sdi_states:
+                raise PowerError("SDIs cannot {}".format(action))
+            sdi = self.api_driver.sdi(target[0], target[1])
+            return sdi.start() if action == "start" else sdi.stop()
+
+        action = "acpi" if action == "stop" else action
+        if action not in self._machine_states:
+            raise PowerError("Machines cannot {}".format(action))
+        machine = self.api_driver.sdi(target[0], target[1]).machine(target[2])
+        return getattr(machine, action)()
+
+    def __get_state(self, target: PowerTarget) -> Any:
+        sdi = self.api_driver.sdi(target[0], target[1])
+        response = sdi.get_status() if len(target) == 2 else sdi.machine(target[2]).get_status()
+        if not response.ok:
+            raise PowerError("Failure to get status of {}: {}".format(target, response))
+        if len(target) == 2:
+            return str(response.detail["state"])
+        return False if response.reason == "No Content" else response.detail["running"]
@@ -0,0 +1,205 @@
+"""RoutingRollout class object"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import json
+import time
+
+from api.bulk import BulkExecutor, BulkResult
+from api.driver import APIDriver
+from api.driver import APIResponse
+
+# (user_pk, sdi_id, machine_id) of a router
+RouterTarget = Tuple[int, str, str]
+
+
+class RolloutError(RuntimeError):
+    """Raise exception when the routing of a router cannot be read or a wave is skipped after a failure"""
+
+
+class RouterPlan:
+    """Keychain and routing settings changes of one router"""
+
+    def __init__(self, target: RouterTarget, keychain: List[Dict[str, Any]] = None, settings: Dict[str, Any] = None,
+                 changes: Dict[str, Tuple[Any, Any]] = None) -> None:
+        """Initialize RouterPlan class object
+
+        :param target: Router the plan applies to.
+        :type target: RouterTarget
+        :param keychain: Full keychain list to push, None if unchanged.
+        :type keychain: List[Dict[str, Any]]
+        :param settings: Full routing settings to push, None if unchanged.
+        :type settings: Dict[str, Any]
+        :param changes: (current, desired) of each changed settings field, "keychain" included.
+        :type changes: Dict[str, Tuple[Any, Any]]
+        """
+        self.target = target
+        self.keychain = keychain
+        self.settings = settings
+        self.changes = changes or {}
+        self.latency = None # type: Optional[float]
+        self.responses = {} # type: Dict[str, APIResponse]
+
+    def __repr__(self) -> str:
+        return "<RouterPlan {} changes={} applied={}>".format(self.target, sorted(self.changes), sorted(self.applied))
+
+    @property
+    def changed(self) -> bool:
+        """True if the router has anything to push."""
+        return self.keychain is not None or self.settings is not None
+
+    @property
+    def applied(self) -> List[str]:
+        """Parts written successfully so far: "keychain" and/or "settings"."""
+        return [part for part, response in self.responses.items() if response.ok]
+
+    @property
+    def pending(self) -> List[str]:
+        """Parts still to write."""
+        parts = [("keychain", self.keychain), ("settings", self.settings)]
+        return [part for part, value in parts if value is not None and part not in self.applied]
+
+
+def get_canonical(keychain: Any, ignored: Sequence[str] = ()) -> List[str]:
+    """Return the entries of a keychain as sorted JSON strings without ignored fields, to compare keychains."""
+    entries = keychain if isinstance(keychain, list) else []
+    return sorted(json.dumps({field: value for field, value in entry.items() if field not in ignored}
+                             if isinstance(entry, dict) else entry, sort_keys=True, default=str) for entry in entries)
+
+
+class RoutingRollout:
+    """Roll router keychains and routing settings out to many routers across SDIs.
+
+    plan fetches the keychain and routing settings of every router
+    concurrently and compares them with the desired ones; only routers that
+    differ get a plan that pushes anything. run pushes the changed routers
+    concurrently, at most max_workers at a time, optionally in canary waves
+    of given sizes before the rest, and stops after a failing wave unless
+    told otherwise. Each plan records the seconds its router took to update.
+
+    A desired keychain or settings is either one value for every router or
+    a function of (target, current value) returning the router's value, e.g.
+    to append a new key to each existing keychain. Desired settings may be
+    partial; they are merged into the current settings before the full
+    settings are pushed.
+    """
+    _ignored_fields = ("id", "pk", "url")
+
+    def __init__(self, api_driver: APIDriver, max_workers: int = None) -> None:
+        """Initialize RoutingRollout class object
+
+        :param api_driver: Allows RoutingRollout to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        :param max_workers: Most routers fetched or updated at once. Default is settings BULK_WORKERS.
+        :type max_workers: int
+        """
+        self.api_driver = api_driver
+        self.__executor = BulkExecutor(max_workers)
+
+    def plan(self, targets: Iterable[RouterTarget], keychain: Union[List[Dict[str, Any]], Callable[..., Any]] = None,
+             settings: Union[Dict[str, Any], Callable[..., Any]] = None) -> Tuple[List[RouterPlan], List[BulkResult]]:
+        """Return a plan per router that could be read, and the failed reads.
+
+        :param targets: Routers to roll out to.
+        :type targets: Iterable[RouterTarget]
+        :param keychain: Desired keychain list, or function of (target, current keychain). None leaves keychains alone.
+        :type keychain: List[Dict[str, Any]] or Callable
+        :param settings: Desired settings fields, or function of (target, current settings). None leaves settings alone.
+        :type settings: Dict[str, Any] or Callable
+        """
+        fetched = self.__executor.map(lambda target: self.__fetch(target, keychain is not None, settings is not None),
+                                      list(targets))
+        plans = []
+        for result in fetched:
+            if not result.ok:
+                continue
+            target = result.item
+            current_keychain, current_settings = result.value
+            plan = RouterPlan(target)
+            if keychain is not None:
+                desired = keychain(target, current_keychain) if callable(keychain) else keychain
+                if get_canonical(desired, self._ignored_fields) != get_canonical(current_keychain, self._ignored_fields):
+                    plan.keychain = list(desired)
+                    plan.changes["keychain"] = (current_keychain, plan.keychain)
+            if settings is not None:
+                desired = settings(target, current_settings) if callable(settings) else settings
+                changes = {field: (current_settings.get(field), value) for field, value in desired.items()
+                           if current_settings.get(field) != value}
+                if changes:
+                    plan.settings = dict(current_settings, **desired)
+                    plan.changes.update(changes)
+            plans.append(plan)
+        return plans, [result for result in fetched if not result.ok]
+
+    def run(self, plans: Iterable[RouterPlan], waves: Sequence[int] = (), stop_on_failure: bool = True) -> List[BulkResult]:
+        """Push the changed plans, canary waves first, and return a result per changed plan in order.
+
+        The response of each part written is kept in the plan's responses, so
+        a router whose keychain was written but whose settings failed shows
+        "keychain" in applied. Running the same plans again only writes their
+        pending parts.
+
+        :param plans: Plans returned by plan. Unchanged plans are left out.
+        :type plans: Iterable[RouterPlan]
+        :param waves: Sizes of the waves pushed before all remaining plans, e.g. (1, 10).
+        :type waves: Sequence[int]
+        :param stop_on_failure: Skip the remaining waves once a router of a wave fails.
+        :type stop_on_failure: bool
+        """
+        changed = [plan for plan in plans if plan.pending]
+        results = [] # type: List[BulkResult]
+        start = 0
+        for size in list(waves) + [len(changed)]:
+            wave = changed[start:start + size]
+            start += len(wave)
+            if not wave:
+                continue
+            if stop_on_failure and any(not result.ok for result in results):
+                error = RolloutError("Skipped after a failure in an earlier wave")
+                results.extend(BulkResult(plan, error=error) for plan in wave)
+                continue
+            results.extend(self.__executor.map(self.__push, wave))
+        return results
+
+    def rollout(self, targets: Iterable[RouterTarget], keychain: Union[List[Dict[str, Any]], Callable[..., Any]] = None,
+                settings: Union[Dict[str, Any], Callable[..., Any]] = None, waves: Sequence[int] = (),
+                stop_on_failure: bool = True) -> List[BulkResult]:
+        """Plan and run a rollout. Return the failed reads and the result of each changed router."""
+        plans, failed = self.plan(targets, keychain, settings)
+        return failed + self.run(plans, waves, stop_on_failure)
+
+    @staticmethod
+    def get_latencies(results: Iterable[BulkResult]) -> Dict[RouterTarget, float]:
+        """Return the seconds each router of run results took to update, failed ones included."""
+        return {result.item.target: result.item.latency for result in results
+                if isinstance(result.item, RouterPlan) and result.item.latency is not None}
+
+    def __fetch(self, target: RouterTarget, keychain: bool, settings: bool) -> Tuple[Any, Dict[str, Any]]:
+        routing = self.api_driver.sdi(target[0], target[1]).machine(target[2]).routing
+        current_keychain, current_settings = None, {} # type: Any, Dict[str, Any]
+        if keychain:
+            current_keychain = self.__get_detail(routing.get_router_keychain())
+        if settings:
+            current_settings = self.__get_detail(routing.get_routing_settings()) or {}
+        return current_keychain, current_settings
+
+    def __push(self, plan: RouterPlan) -> APIResponse:
+        routing = self.api_driver.sdi(plan.target[0], plan.target[1]).machine(plan.target[2]).routing
+        begin = time.monotonic()
+        try:
+            response = None # type: Optional[APIResponse]
+            for part in plan.pending:
+                if part == "keychain":
+                    response = plan.responses[part] = routing.modify_router_keychain(plan.keychain)
+                else:
+                    response = plan.responses[part] = routing.modify_router_settings(plan.settings)
+                if not response.ok:
+                    break
+            return response
+        finally:
+            plan.latency = time.monotonic() - begin
+
+    @staticmethod
+    def __get_detail(response: APIResponse) -> Any:
+        if not response.ok:
+            raise RolloutError("Failure to read {}: {}".format(response.url, response))
+        return response.detail
@@ -29,14 +29,14 @@ class SDIDriver(BaseDriver):
         url_args = {"pk": self.user_pk if user_pk is None else user_pk}
         return self._post("user_list", url_args, data)
 
-    def get_all_sdis(self) -> APIResponse:
+    def get_all_sdis(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get all sdis in the deployment and return response."""
-        return self._get("list")
+        return self._get("list", params=params)
 
-    def get_users_sdis(self, user_pk: int = None) -> APIResponse:
+    def get_users_sdis(self, user_pk: int = None, params: Dict[str, Any] = None) -> APIResponse:
         """Get user's sdis and return response."""
         url_args = {"pk": self.user_pk if user_pk is None else user_pk}
-        return self._get("user_list", url_args)
+        return self._get("user_list", url_args, params)
 
     def get(self, sdi_id: str) -> APIResponse:
         """Get sdi's details and return response."""
@@ -121,9 +121,9 @@ class SDIDriver(BaseDriver):
         """Modify a sdi's settings and return response."""
         return self._put("settings", {"pk": self.user_pk, "sdi_id": sdi_id}, data)
 
-    def get_all_checkpoints(self, sdi_id: str) -> APIResponse:
+    def get_all_checkpoints(self, sdi_id: str, params: Dict[str, Any] = None) -> APIResponse:
         """Get all checkpoints and return response."""
-        return self._get("checkpoint", {"pk": self.user_pk, "sdi_id": sdi_id})
+        return self._get("checkpoint", {"pk": self.user_pk, "sdi_id": sdi_id}, params)
 
     def is_checkpoint(self, sdi_id: str, check_tag: str) -> Optional[bool]:
         """Check if checkpoint tag is in sdi and return boolean."""
@@ -149,17 +149,17 @@ class SDIDriver(BaseDriver):
         """Delete a checkpoint and return response."""
         return self._delete("checkpoint_detail", {"pk": self.user_pk, "sdi_id": sdi_id, "check_tag": check_tag})
 
-    def get_ports(self, sdi_id: str) -> APIResponse:
+    def get_ports(self, sdi_id: str, params: Dict[str, Any] = None) -> APIResponse:
         """Get a sdi's ports and return response."""
-        return self._get("port_list", {"pk": self.user_pk, "sdi_id": sdi_id})
+        return self._get("port_list", {"pk": self.user_pk, "sdi_id": sdi_id}, params)
 
     def create_port(self, sdi_id: str, data: Dict[str, Any]) -> APIResponse:
         """Create a port and return a response."""
         return self._post("port_list", {"pk": self.user_pk, "sdi_id": sdi_id}, data)
 
-    def get_history(self, sdi_id: str) -> APIResponse:
+    def get_history(self, sdi_id: str, params: Dict[str, Any] = None) -> APIResponse:
         """Get a sdi's history and return response."""
-        return self._get("history", {"pk": self.user_pk, "sdi_id": sdi_id})
+        return self._get("history", {"pk": self.user_pk, "sdi_id": sdi_id}, params)
 
     def get_status(self, sdi_id: str) -> APIResponse:
         """Get a sdi's status and return response."""
@@ -0,0 +1,351 @@
+"""TopologyGraph class object"""
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import functools
+import threading
+from array import array
+from collections import deque
+
+from api.bulk import BulkExecutor, BulkResult
+from api.driver import APIDriver
+from api.driver import APIResponse
+from api.pagination import PaginationError, Paginator, get_results
+from api.utils import get_key
+
+# (connection id, network id, VLAN ids, True if a router forwards through it)
+Link = Tuple[str, str, FrozenSet[int], bool]
+
+
+class TopologyError(RuntimeError):
+    """Raise exception when the networks, machines or interfaces of an SDI cannot be fetched"""
+
+
+def get_vlan_ids(entries: Any) -> FrozenSet[int]:
+    """Return the VLAN ids of an interface's "vlans" field or get_vlans response detail."""
+    ids = set()
+    for entry in get_results(entries):
+        vlan = get_key(entry, ("vlan", "vlan_id", "id")) if isinstance(entry, dict) else entry
+        try:
+            ids.add(int(vlan))
+        except (TypeError, ValueError):
+            continue
+    return frozenset(ids)
+
+
+class TopologyGraph:
+    """Network topology of an SDI as a compact graph, for reachability, impact and path queries.
+
+    Machines and networks are numbered nodes; interfaces are edges stored in
+    CSR form, an offsets array and a flat neighbor array. Traffic enters a
+    network from any attached machine and reaches every other attached
+    machine, and crosses from one network to another only through router
+    machines on their routed interfaces. Routers are machines with the
+    "router" role; a router interface whose routing is disabled only makes
+    the router reachable. An interface without VLANs carries every VLAN.
+
+    build fetches networks, machines, and every machine's interfaces, VLANs
+    and router interfaces concurrently. Connected components are computed
+    once per build, so get_reachable without a VLAN is a set lookup. replug,
+    modify_network and modify_interface make the SDK call and re-fetch only
+    what it changed.
+    """
+    _network, _machine, _router = 0, 1, 2
+    _routing_fields = ("enabled", "routing", "active")
+
+    def __init__(self, api_driver: APIDriver, user_pk: int, sdi_id: str, max_workers: int = None) -> None:
+        """Initialize TopologyGraph class object
+
+        :param api_driver: Allows TopologyGraph to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        :param user_pk: pk of the SDI's owner.
+        :type user_pk: int
+        :param sdi_id: SDI whose topology is built.
+        :type sdi_id: str
+        :param max_workers: Most calls at once. Default is settings BULK_WORKERS.
+        :type max_workers: int
+        """
+        self.sdi = api_driver.sdi(user_pk, sdi_id)
+        self.__executor = BulkExecutor(max_workers)
+        self.__lock = threading.RLock()
+        self.__networks = {} # type: Dict[str, Dict[str, Any]]
+        self.__machines = {} # type: Dict[str, Dict[str, Any]]
+        self.__links = {} # type: Dict[str, List[Link]]
+        self.__ids = [] # type: List[str]
+        self.__index = {} # type: Dict[str, int]
+        self.__kinds = bytearray()
+        self.__offsets = array("l", [0])
+        self.__neighbors = array("l")
+        self.__transit = bytearray()
+        self.__vlans = [] # type: List[FrozenSet[int]]
+        self.__labels = {} # type: Dict[int, FrozenSet[int]]
+        self.__members = {} # type: Dict[int, Set[int]]
+
+    def __len__(self) -> int:
+        return len(self.__ids)
+
+    @property
+    def networks(self) -> List[str]:
+        """Ids of the networks of the SDI."""
+        with self.__lock:
+            return list(self.__networks)
+
+    @property
+    def machines(self) -> List[str]:
+        """Ids of the machines of the SDI."""
+        with self.__lock:
+            return list(self.__machines)
+
+    def build(self) -> List[BulkResult]:
+        """Fetch the whole topology and rebuild the graph. Return the failed fetches."""
+        listed = self.__executor.map(lambda fetch: fetch(), [self.__get_networks, self.__get_machines])
+        failed = [result for result in listed if not result.ok]
+        if failed:
+            return failed
+        networks, machines = (result.value for result in listed)
+        with self.__lock:
+            self.__networks = networks
+            self.__machines = machines
+            self.__links = {}
+        return self.refresh_machines(list(machines))
+
+    def refresh_machines(self, machine_ids: Iterable[str]) -> List[BulkResult]:
+        """Re-fetch the interfaces of machines concurrently and rebuild the graph. Return the failed fetches."""
+        results = self.__executor.map(self.__get_links, list(machine_ids))
+        with self.__lock:
+            for result in results:
+                if result.ok:
+                    self.__links[result.item] = result.value
+            self.__rebuild()
+        return [result for result in results if not result.ok]
+
+    def refresh_network(self, network_id: str) -> List[BulkResult]:
+        """Re-fetch one network and the interfaces of the machines attached to it. Return the failed fetches."""
+        response = self.sdi.network(network_id).get_network()
+        with self.__lock:
+            if response.ok:
+                self.__networks[network_id] = response.detail
+            elif response.status_code == 404:
+                self.__networks.pop(network_id, None)
+            else:
+                return [BulkResult(network_id, response)]
+            attached = self.get_attached(network_id)
+        return self.refresh_machines(attached)
+
+    def replug(self, network_id: str, data: Dict[str, Any]) -> APIResponse:
+        """Replug a network, refresh it in the graph and return the replug response."""
+        response = self.sdi.network(network_id).replug(data)
+        if response.ok:
+            self.refresh_network(network_id)
+        return response
+
+    def modify_network(self, network_id: str, data: Dict[str, Any]) -> APIResponse:
+        """Modify a network, refresh it in the graph and return the modify response."""
+        response = self.sdi.network(network_id).modify(data)
+        if response.ok:
+            self.refresh_network(network_id)
+        return response
+
+    def modify_interface(self, machine_id: str, conn_id: str, data: Dict[str, Any]) -> APIResponse:
+        """Modify a machine interface, refresh the machine in the graph and return the modify response."""
+        response = self.sdi.machine(machine_id).interfaces.modify_interface(conn_id, data)
+        if response.ok:
+            self.refresh_machines([machine_id])
+        return response
+
+    def get_attached(self, network_id: str) -> List[str]:
+        """Return the ids of the machines with an interface on a network."""
+        with self.__lock:
+            node = self.__index.get(network_id)
+            if node is None:
+                return []
+            return sorted({self.__ids[other] for other in self.__get_neighbors(node)})
+
+    def get_reachable(self, machine_id: str, vlan: int = None) -> Set[str]:
+        """Return the ids of the machines a machine can reach, optionally only over one VLAN."""
+        with self.__lock:
+            node = self.__get_node(machine_id)
+            if vlan is None:
+                return {self.__ids[other] for other in self.__get_reach(node, self.__labels, self.__members)}
+            return {self.__ids[other] for other in self.__search(node, vlan)[0]
+                    if self.__kinds[other] != self._network and other != node}
+
+    def can_reach(self, source: str, target: str, vlan: int = None) -> bool:
+        """Return True if machine source can reach machine target."""
+        return target in self.get_reachable(source, vlan)
+
+    def get_path(self, source: str, target: str, vlan: int = None) -> Optional[List[str]]:
+        """Return a shortest path of alternating machine and network ids from source to target, or None."""
+        with self.__lock:
+            start = self.__get_node(source)
+            end = self.__get_node(target)
+            _, parents = self.__search(start, vlan, end)
+            if end not in parents:
+                return None
+            path = [end]
+            while path[-1] != start:
+                path.append(parents[path[-1]])
+            return [self.__ids[node] for node in reversed(path)]
+
+    def get_impact(self, network_id: str) -> Dict[str, Set[str]]:
+        """Return the machines that lose reachability if a network is removed, with the machines each loses."""
+        with self.__lock:
+            removed = self.__get_node(network_id)
+            labels, members = self.__get_components(removed)
+            impact = {}
+            for machine in (node for node, kind in enumerate(self.__kinds) if kind != self._network):
+                lost = self.__get_reach(machine, self.__labels, self.__members) - \
+                       self.__get_reach(machine, labels, members)
+                if lost:
+                    impact[self.__ids[machine]] = {self.__ids[other] for other in lost}
+            return impact
+
+    def __get_networks(self) -> Dict[str, Dict[str, Any]]:
+        return {str(network["id"]): network for network in self.__get_list(self.sdi.networks.get_all_networks, "networks")}
+
+    def __get_machines(self) -> Dict[str, Dict[str, Any]]:
+        return {str(machine["id"]): machine for machine in self.__get_list(self.sdi.machines.get_all, "machines")}
+
+    def __get_links(self, machine_id: str) -> List[Link]:
+        machine = self.sdi.machine(machine_id)
+        router = self.__machines.get(machine_id, {}).get("role") == "router"
+        interfaces = [interface for interface in self.__get_list(machine.interfaces.get_interfaces,
+                                                                 "interfaces of machine {}".format(machine_id))
+                      if get_key(interface, ("network",)) is not None]
+
+        missing = [interface for interface in interfaces if "vlans" not in interface]
+        vlans = {result.item["id"]: get_vlan_ids(result.value) for result in self.__executor.map(
+            lambda interface: self.__get_list(functools.partial(machine.interfaces.get_vlans, interface["id"]), "VLANs"),
+            missing) if result.ok}
+
+        routed = {} # type: Dict[str, bool]
+        if router:
+            try:
+                entries = self.__get_list(machine.routing.get_router_interfaces, "router interfaces")
+            except TopologyError:
+                entries = []
+            for entry in entries:
+                conn_id = get_key(entry, ("connection", "connection_id", "id"))
+                field = next((field for field in self._routing_fields if field in entry), None)
+                routed[str(conn_id)] = bool(entry[field]) if field is not None else True
+
+        links = []
+        for interface in interfaces:
+            conn_id = str(interface["id"])
+            interface_vlans = get_vlan_ids(interface["vlans"]) if "vlans" in interface else vlans.get(interface["id"], frozenset())
+            links.append((conn_id, str(get_key(interface, ("network",))), interface_vlans, router and routed.get(conn_id, True)))
+        return links
+
+    def __rebuild(self) -> None:
+        ids = list(self.__networks) + [machine for machine in self.__machines if machine not in self.__networks]
+        index = {node_id: node for node, node_id in enumerate(ids)}
+        kinds = bytearray(self._network if node < len(self.__networks) else
+                          self._router if self.__machines[node_id].get("role") == "router" else self._machine
+                          for node, node_id in enumerate(ids))
+        adjacency = [[] for _ in ids] # type: List[List[Tuple[int, FrozenSet[int], bool]]]
+        for machine_id, links in self.__links.items():
+            machine = index.get(machine_id)
+            if machine is None:
+                continue
+            for _, network_id, vlans, transit in links:
+                network = index.get(network_id)
+                if network is not None and kinds[network] == self._network:
+                    adjacency[machine].append((network, vlans, transit))
+                    adjacency[network].append((machine, vlans, transit))
+
+        offsets = array("l", [0])
+        neighbors = array("l")
+        transit_flags = bytearray()
+        edge_vlans = [] # type: List[FrozenSet[int]]
+        for edges in adjacency:
+            for other, vlans, transit in edges:
+                neighbors.append(other)
+                transit_flags.append(transit)
+                edge_vlans.append(vlans)
+            offsets.append(len(neighbors))
+
+        self.__ids, self.__index, self.__kinds = ids, index, kinds
+        self.__offsets, self.__neighbors, self.__transit, self.__vlans = offsets, neighbors, transit_flags, edge_vlans
+        self.__labels, self.__members = self.__get_components()
+
+    def __get_node(self, node_id: str) -> int:
+        node = self.__index.get(node_id)
+        if node is None:
+            raise TopologyError("{} is not in the topology of SDI {}".format(node_id, self.sdi.sdi_pk))
+        return node
+
+    def __get_neighbors(self, node: int) -> Iterable[int]:
+        return self.__neighbors[self.__offsets[node]:self.__offsets[node + 1]]
+
+    def __get_components(self, removed: int = None) -> Tuple[Dict[int, FrozenSet[int]], Dict[int, Set[int]]]:
+        """Label the components of networks joined by routed router interfaces.
+
+        Return the components each machine is attached to and the machines
+        attached to each component.
+        """
+        component = [-1] * len(self.__ids)
+        for start, kind in enumerate(self.__kinds):
+            if kind != self._network or start == removed or component[start] >= 0:
+                continue
+            component[start] = start
+            queue = deque([start])
+            while queue:
+                node = queue.popleft()
+                for edge in range(self.__offsets[node], self.__offsets[node + 1]):
+                    other = self.__neighbors[edge]
+                    if not self.__transit[edge] or other == removed or component[other] >= 0:
+                        continue
+                    component[other] = start
+                    queue.append(other)
+
+        labels = {} # type: Dict[int, FrozenSet[int]]
+        members = {} # type: Dict[int, Set[int]]
+        for machine, kind in enumerate(self.__kinds):
+            if kind == self._network:
+                continue
+            attached = {component[network] for network in self.__get_neighbors(machine)
+                        if network != removed and component[network] >= 0}
+            labels[machine] = frozenset(attached)
+            for label in attached:
+                members.setdefault(label, set()).add(machine)
+        return labels, members
+
+    @staticmethod
+    def __get_reach(machine: int, labels: Dict[int, FrozenSet[int]], members: Dict[int, Set[int]]) -> Set[int]:
+        reach = set() # type: Set[int]
+        for label in labels.get(machine, ()):
+            reach |= members[label]
+        reach.discard(machine)
+        return reach
+
+    def __search(self, start: int, vlan: Optional[int], target: int = None) -> Tuple[Set[int], Dict[int, int]]:
+        parents = {start: start}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if node == target:
+                break
+            for edge in range(self.__offsets[node], self.__offsets[node + 1]):
+                other = self.__neighbors[edge]
+                if other in parents or (vlan is not None and self.__vlans[edge] and vlan not in self.__vlans[edge]):
+                    continue
+                if self.__kinds[node] == self._router and node != start and not self.__transit[edge]:
+                    continue
+                parents[other] = node
+                if self.__kinds[other] == self._network or (self.__kinds[other] == self._router and self.__transit[edge]):
+                    queue.append(other)
+        return set(parents), parents
+
+    @staticmethod
+    def __get_list(list_method: Callable[..., APIResponse], name: str) -> List[Dict[str, Any]]:
+        # Lists already run concurrently, so pages are not prefetched in more threads
+        items = [] # type: List[Dict[str, Any]]
+        try:
+            for response in Paginator(list_method, prefetch=False).pages():
+                detail = response.detail
+                if isinstance(detail, dict) and ("user" in detail or "managed" in detail):
+                    items.extend((detail.get("user") or []) + (detail.get("managed") or []))
+                else:
+                    items.extend(get_results(detail))
+        except PaginationError as err:
+            raise TopologyError("Failure to list {}: {}".format(name, err))
+        return items
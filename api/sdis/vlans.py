@@ -0,0 +1,221 @@
+"""VLANConfigurator class object"""
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+import functools
+
+from api.bulk import BulkExecutor, BulkResult
+from api.driver import APIDriver
+from api.driver import APIResponse
+from api.pagination import Paginator
+from api.utils import get_key
+
+# {machine id: {connection id: {VLAN: [ports]}}}
+VLANMap = Dict[str, Dict[str, Dict[int, Iterable[Any]]]]
+
+DELETE_PORT = "delete_port"
+DELETE_VLAN = "delete_vlan"
+CREATE_VLAN = "create_vlan"
+CREATE_PORT = "create_port"
+
+# Order in which changes of an interface are pushed
+PHASES = (DELETE_PORT, DELETE_VLAN, CREATE_VLAN, CREATE_PORT)
+
+
+class VLANError(RuntimeError):
+    """Raise exception when the VLAN a port change depends on was not created"""
+
+
+class VLANChange:
+    """One VLAN or VLAN port to create or delete on a machine interface"""
+
+    def __init__(self, action: str, machine_id: str, conn_id: str, vlan: int, port: Any = None,
+                 vlan_pk: Any = None, port_pk: Any = None) -> None:
+        """Initialize VLANChange class object
+
+        :param action: DELETE_PORT, DELETE_VLAN, CREATE_VLAN or CREATE_PORT.
+        :type action: str
+        :param machine_id: Machine of the interface.
+        :type machine_id: str
+        :param conn_id: Connection id of the interface.
+        :type conn_id: str
+        :param vlan: VLAN number.
+        :type vlan: int
+        :param port: Port, for port changes.
+        :type port: Any
+        :param vlan_pk: Id of the existing VLAN in API urls.
+        :type vlan_pk: Any
+        :param port_pk: Id of the existing port in API urls.
+        :type port_pk: Any
+        """
+        self.action = action
+        self.machine_id = machine_id
+        self.conn_id = conn_id
+        self.vlan = vlan
+        self.port = port
+        self.vlan_pk = vlan_pk
+        self.port_pk = port_pk
+
+    def __repr__(self) -> str:
+        port = " port {}".format(self.port) if self.port is not None else ""
+        return "<VLANChange {} {}/{} vlan {}{}>".format(self.action, self.machine_id, self.conn_id, self.vlan, port)
+
+
+class VLANConfigurator:
+    """Bring the VLANs and VLAN ports of many machine interfaces to a desired map.
+
+    plan fetches the VLANs of every interface of the map concurrently, then
+    the ports of every VLAN kept, and returns the changes needed. apply
+    pushes them concurrently, one phase after the other: port deletes, VLAN
+    deletes, VLAN creates and port creates, so the changes of an interface
+    keep their order while all interfaces progress at once. Ports of a VLAN
+    whose creation failed are not pushed.
+
+    With prune, VLANs and ports of the listed interfaces missing from the
+    map are deleted; interfaces not listed are never touched.
+    """
+    _vlan_fields = ("vlan", "vlan_id", "tag")
+    _port_fields = ("port", "name", "number")
+    _vlan_field = "vlan"
+    _port_field = "port"
+
+    def __init__(self, api_driver: APIDriver, user_pk: int, sdi_id: str, max_workers: int = None) -> None:
+        """Initialize VLANConfigurator class object
+
+        :param api_driver: Allows VLANConfigurator to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        :param user_pk: pk of the SDI's owner.
+        :type user_pk: int
+        :param sdi_id: SDI of the machines.
+        :type sdi_id: str
+        :param max_workers: Most calls at once. Default is settings BULK_WORKERS.
+        :type max_workers: int
+        """
+        self.sdi = api_driver.sdi(user_pk, sdi_id)
+        self.__executor = BulkExecutor(max_workers)
+
+    def get_current(self, interfaces: Iterable[Tuple[str, str]],
+                    vlans: Dict[Tuple[str, str], Iterable[int]] = None) -> Tuple[Dict[Tuple[str, str], Dict[int, Any]], List[BulkResult]]:
+        """Fetch the VLANs of (machine id, connection id) interfaces concurrently, and the ports of their VLANs.
+
+        Return {interface: {VLAN: (VLAN pk, {str(port): port pk})}}, without
+        the interfaces any fetch failed for, and the failed fetches. Entries
+        without a VLAN number or port are left out. When vlans is given, only
+        the ports of the VLANs it lists for an interface are fetched; the
+        others get an empty port dict.
+        """
+        interfaces = list(interfaces)
+        listed = self.__executor.map(lambda interface: self.__get_list(functools.partial(
+            self.sdi.machine(interface[0]).interfaces.get_vlans, interface[1])), interfaces)
+
+        current = {} # type: Dict[Tuple[str, str], Dict[int, Any]]
+        to_fetch = [] # type: List[Tuple[Tuple[str, str], int, Any]]
+        for result in listed:
+            if not result.ok:
+                continue
+            current[result.item] = {}
+            wanted = None if vlans is None else set(vlans.get(result.item, ()))
+            for entry in result.value:
+                try:
+                    vlan = int(get_key(entry, self._vlan_fields))
+                except (TypeError, ValueError):
+                    continue
+                pk = get_key(entry, ("id", "pk")) if isinstance(entry, dict) else entry
+                current[result.item][vlan] = (vlan if pk is None else pk, {})
+                if wanted is None or vlan in wanted:
+                    to_fetch.append((result.item, vlan, current[result.item][vlan][0]))
+
+        ported = self.__executor.map(lambda fetch: self.__get_list(functools.partial(
+            self.sdi.machine(fetch[0][0]).interfaces.get_vlan_ports, fetch[0][1], fetch[2])), to_fetch)
+        for result in ported:
+            interface, vlan, _ = result.item
+            if not result.ok:
+                current.pop(interface, None)
+            elif interface in current:
+                current[interface][vlan][1].update(self.__get_ports(result.value))
+        return current, [result for result in listed + ported if not result.ok]
+
+    def plan(self, desired: VLANMap, prune: bool = True) -> Tuple[List[VLANChange], List[BulkResult]]:
+        """Return the changes bringing the interfaces of a desired map to it, and the failed fetches.
+
+        Ports are compared as strings, so port 80 matches an existing "80".
+        Interfaces whose state could not be fetched get no changes.
+        """
+        interfaces = [(machine_id, conn_id) for machine_id, connections in desired.items() for conn_id in connections]
+        wanted = {(machine_id, conn_id): {int(vlan): {str(port): port for port in ports} for vlan, ports in vlans.items()}
+                  for machine_id, connections in desired.items() for conn_id, vlans in connections.items()}
+        current, failed = self.get_current(interfaces, wanted)
+
+        changes = [] # type: List[VLANChange]
+        for (machine_id, conn_id), vlans in wanted.items():
+            existing = current.get((machine_id, conn_id))
+            if existing is None:
+                continue
+            for vlan, (vlan_pk, ports) in sorted(existing.items()):
+                if vlan not in vlans:
+                    if prune:
+                        changes.append(VLANChange(DELETE_VLAN, machine_id, conn_id, vlan, vlan_pk=vlan_pk))
+                    continue
+                if prune:
+                    changes.extend(VLANChange(DELETE_PORT, machine_id, conn_id, vlan, port, vlan_pk, port_pk)
+                                   for port, port_pk in ports.items() if port not in vlans[vlan])
+            for vlan, ports in sorted(vlans.items()):
+                vlan_pk, present = existing.get(vlan, (None, {}))
+                if vlan_pk is None:
+                    changes.append(VLANChange(CREATE_VLAN, machine_id, conn_id, vlan))
+                changes.extend(VLANChange(CREATE_PORT, machine_id, conn_id, vlan, port, vlan_pk)
+                               for name, port in sorted(ports.items()) if name not in present)
+        return changes, failed
+
+    def apply(self, desired: VLANMap, prune: bool = True) -> List[BulkResult]:
+        """Plan and push the changes of a desired map. Return the failed fetches and the result of each change."""
+        changes, failed = self.plan(desired, prune)
+        return failed + self.push(changes)
+
+    def push(self, changes: Iterable[VLANChange]) -> List[BulkResult]:
+        """Push changes concurrently, phase by phase, and return a result per change in phase order."""
+        changes = list(changes)
+        created = {} # type: Dict[Tuple[str, str, int], Any]
+        results = [] # type: List[BulkResult]
+        for phase in PHASES:
+            batch = [change for change in changes if change.action == phase]
+            if phase == CREATE_PORT:
+                for change in batch:
+                    if change.vlan_pk is None:
+                        change.vlan_pk = created.get((change.machine_id, change.conn_id, change.vlan))
+            phase_results = self.__executor.map(self.__push, batch)
+            if phase == CREATE_VLAN:
+                for result in phase_results:
+                    if result.ok:
+                        change = result.item
+                        detail = result.value.detail
+                        pk = get_key(detail, ("id", "pk")) if isinstance(detail, dict) else None
+                        created[(change.machine_id, change.conn_id, change.vlan)] = change.vlan if pk is None else pk
+            results.extend(phase_results)
+        return results
+
+    def __push(self, change: VLANChange) -> APIResponse:
+        interfaces = self.sdi.machine(change.machine_id).interfaces
+        if change.action == DELETE_PORT:
+            return interfaces.delete_vlan_port(change.conn_id, change.vlan_pk, change.port_pk)
+        if change.action == DELETE_VLAN:
+            return interfaces.delete_vlan(change.conn_id, change.vlan_pk)
+        if change.action == CREATE_VLAN:
+            return interfaces.create_vlan(change.conn_id, {self._vlan_field: change.vlan})
+        if change.vlan_pk is None:
+            raise VLANError("VLAN {} of {}/{} was not created".format(change.vlan, change.machine_id, change.conn_id))
+        return interfaces.create_vlan_port(change.conn_id, change.vlan_pk, {self._port_field: change.port})
+
+    def __get_ports(self, entries: List[Any]) -> Dict[Any, Any]:
+        ports = {}
+        for entry in entries:
+            port = get_key(entry, self._port_fields)
+            if port is None:
+                continue
+            pk = get_key(entry, ("id", "pk")) if isinstance(entry, dict) else entry
+            ports[str(port)] = port if pk is None else pk
+        return ports
+
+    @staticmethod
+    def __get_list(list_method: Callable[..., APIResponse]) -> List[Any]:
+        # Lists already run concurrently, so pages are not prefetched in more threads
+        return list(Paginator(list_method, prefetch=False))
@@ -0,0 +1 @@
+from api.sharing.index import PermissionIndex
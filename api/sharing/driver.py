@@ -1,5 +1,5 @@
 """SharingDriver class object"""
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from api.base_driver import BaseDriver
 from api.driver import APIDriver
@@ -24,27 +24,27 @@ class SharingDriver(BaseDriver):
         """Clear pks."""
         self.user_pk = None # type: Optional[int]
 
-    def get_all_shared(self) -> APIResponse:
+    def get_all_shared(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get users/groups shared networks and return response."""
-        return self._get("network_list")
+        return self._get("network_list", params=params)
 
-    def get_all_users_shared(self) -> APIResponse:
+    def get_all_users_shared(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get all user's shared networks and return response."""
-        return self._get("user_list")
+        return self._get("user_list", params=params)
 
-    def get_user_shared(self, user_pk: int = None) -> APIResponse:
+    def get_user_shared(self, user_pk: int = None, params: Dict[str, Any] = None) -> APIResponse:
         """Get a user's shared networks and return response.
 
         :param user_pk: Pk of user to look up shared networks. Default is self.user_pk.
         :type user_pk: int
         """
         url_args = {"pk": self.user_pk if user_pk is None else user_pk}
-        return self._get("user_detail", url_args)
+        return self._get("user_detail", url_args, params)
 
-    def get_all_groups_shared(self) -> APIResponse:
+    def get_all_groups_shared(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get all group's shared networks and return response."""
-        return self._get("group_list")
+        return self._get("group_list", params=params)
 
-    def get_group_shared(self, group_pk: int) -> APIResponse:
+    def get_group_shared(self, group_pk: int, params: Dict[str, Any] = None) -> APIResponse:
         """Get group's shared networks and return response."""
-        return self._get("group_detail", {"group_pk": group_pk})
+        return self._get("group_detail", {"group_pk": group_pk}, params)
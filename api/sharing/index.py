@@ -0,0 +1,279 @@
+"""PermissionIndex class object"""
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+import functools
+import threading
+
+from api.accounts.group import GroupDriver
+from api.accounts.user import UserDriver
+from api.bulk import BulkExecutor, BulkResult
+from api.driver import APIDriver
+from api.pagination import Paginator, get_results
+from api.sdis.sdi import SDIDriver
+from api.sharing.driver import SharingDriver
+from api.storage.disk import DiskDriver
+from api.utils import get_key
+
+# ("user", pk) or ("group", pk)
+Principal = Tuple[str, int]
+# ("sdi", sdi_id), ("disk", image_id) or ("network", network_id)
+Resource = Tuple[str, str]
+
+
+class PermissionIndexError(RuntimeError):
+    """Raise exception when the permissions of a resource or principal cannot be fetched"""
+
+
+def get_permissions(entry: Any) -> Set[str]:
+    """Return the permission names of a grant, or {"access"} when the grant has none."""
+    if isinstance(entry, dict):
+        for field in ("permissions", "permission", "level"):
+            value = entry.get(field)
+            if isinstance(value, (list, tuple, set)):
+                return {str(name) for name in value}
+            if value is not None:
+                return {str(value)}
+    return {"access"}
+
+
+def get_grants(detail: Any) -> List[Tuple[Principal, Set[str]]]:
+    """Return the (principal, permissions) grants of a get_permissions response detail.
+
+    Accepts {"users": [...], "groups": [...]}, or a list of entries with a
+    "user" or "group" field, paginated or not. Entries are pks or objects
+    holding a pk.
+    """
+    grants = []
+    if isinstance(detail, dict) and "results" not in detail:
+        for kind in ("user", "group"):
+            for entry in detail.get(kind + "s") or []:
+                key = get_key(entry, ("pk", "id", kind))
+                if key is not None:
+                    grants.append(((kind, key), get_permissions(entry)))
+    else:
+        for entry in get_results(detail):
+            for kind in ("user", "group"):
+                if isinstance(entry, dict) and entry.get(kind) is not None:
+                    grants.append(((kind, get_key(entry[kind])), get_permissions(entry)))
+    return grants
+
+
+class PermissionIndex:
+    """In-memory inverted index of who can access which SDIs, disks and networks.
+
+    build fetches users, groups and their members, the permissions of every
+    SDI and disk, and the networks shared with every user and group, all
+    concurrently. The index keeps the direct grants of each resource and
+    principal, and the effective permissions of every user with group grants
+    expanded, so can_access and get_user_resources are dict lookups. The
+    owner of an SDI or disk has the "owner" permission on it. The refresh
+    methods re-fetch one resource, group or principal and only update the
+    users it affects.
+    """
+
+    def __init__(self, api_driver: APIDriver, max_workers: int = None) -> None:
+        """Initialize PermissionIndex class object
+
+        :param api_driver: Allows PermissionIndex to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        :param max_workers: Most calls at once. Default is settings BULK_WORKERS.
+        :type max_workers: int
+        """
+        self.api_driver = api_driver
+        self.__executor = BulkExecutor(max_workers)
+        self.__lock = threading.RLock()
+        self.__owners = {} # type: Dict[Resource, Any]
+        self.__grants = {} # type: Dict[Resource, Dict[Principal, Set[str]]]
+        self.__principal_grants = {} # type: Dict[Principal, Dict[Resource, Set[str]]]
+        self.__members = {} # type: Dict[int, Set[int]]
+        self.__groups_of = {} # type: Dict[int, Set[int]]
+        self.__effective = {} # type: Dict[int, Dict[Resource, Set[str]]]
+
+    def build(self) -> List[BulkResult]:
+        """Fetch everything and rebuild the index. Return the failed fetches."""
+        listed = self.__executor.map(lambda fetch: fetch(), [self.__get_users, self.__get_groups, self.__get_sdis,
+                                                             self.__get_disks])
+        failed = [result for result in listed if not result.ok]
+        if failed:
+            return failed
+        users, groups, sdis, disks = (result.value for result in listed)
+
+        with self.__lock:
+            self.__owners = dict(sdis)
+            self.__owners.update(disks)
+            self.__grants = {}
+            self.__principal_grants = {}
+            self.__members = {}
+            self.__groups_of = {user: set() for user in users}
+            self.__effective = {}
+            for resource, owner in self.__owners.items():
+                if owner is not None:
+                    self.__update_effective(owner, resource)
+
+        fetches = [("group", group) for group in groups] + list(sdis) + list(disks) + \
+                  [("shared", ("user", user)) for user in users] + [("shared", ("group", group)) for group in groups]
+        return self.refresh(fetches)
+
+    def refresh(self, items: Iterable[Tuple[str, Any]]) -> List[BulkResult]:
+        """Re-fetch items concurrently and update the index. Return the failed fetches.
+
+        Items are ("sdi", sdi_id) or ("disk", image_id) for the permissions
+        of a resource, ("group", group_pk) for the members of a group, and
+        ("shared", principal) for the networks shared with a principal.
+        """
+        results = self.__executor.map(self.__fetch, items)
+        with self.__lock:
+            for result in results:
+                if result.ok:
+                    self.__apply(result.item, result.value)
+        return [result for result in results if not result.ok]
+
+    def refresh_resource(self, kind: str, key: str, owner: Any = None) -> List[BulkResult]:
+        """Re-fetch the permissions of one SDI or disk. owner is its user pk, needed for resources new to the index."""
+        if owner is not None:
+            with self.__lock:
+                previous = self.__owners.get((kind, key))
+                self.__owners[(kind, key)] = owner
+                for user in {previous, owner} - {None}:
+                    self.__update_effective(user, (kind, key))
+        return self.refresh([(kind, key)])
+
+    def refresh_group(self, group_pk: int) -> List[BulkResult]:
+        """Re-fetch the members of one group."""
+        return self.refresh([("group", group_pk)])
+
+    def refresh_shared(self, principal: Principal) -> List[BulkResult]:
+        """Re-fetch the networks shared with one user or group."""
+        return self.refresh([("shared", principal)])
+
+    def can_access(self, user_pk: int, kind: str, key: str, permission: str = None) -> bool:
+        """Return True if the user owns a resource or, directly or through a group, has permission, or any access, on it."""
+        with self.__lock:
+            permissions = self.__effective.get(user_pk, {}).get((kind, key))
+            return bool(permissions) and (permission is None or permission in permissions or "owner" in permissions)
+
+    def get_user_resources(self, user_pk: int, kind: str = None) -> Dict[Resource, Set[str]]:
+        """Return the resources a user can access, directly or through groups, with their permissions."""
+        with self.__lock:
+            return {resource: set(permissions) for resource, permissions in self.__effective.get(user_pk, {}).items()
+                    if kind is None or resource[0] == kind}
+
+    def get_principals(self, kind: str, key: str) -> Dict[Principal, Set[str]]:
+        """Return the users and groups granted access to a resource, with their permissions."""
+        with self.__lock:
+            return {principal: set(permissions) for principal, permissions in self.__grants.get((kind, key), {}).items()}
+
+    def get_users(self, kind: str, key: str) -> Set[int]:
+        """Return the pks of all users that can access a resource, with groups expanded."""
+        with self.__lock:
+            return self.__get_affected((kind, key))
+
+    def get_members(self, group_pk: int) -> Set[int]:
+        """Return the pks of the members of a group."""
+        with self.__lock:
+            return set(self.__members.get(group_pk, ()))
+
+    def __fetch(self, item: Tuple[str, Any]) -> Any:
+        kind, key = item
+        if kind == "group":
+            return {get_key(member) for member in Paginator(functools.partial(GroupDriver(self.api_driver).get_members, key))}
+        if kind == "shared":
+            sharing_driver = SharingDriver(self.api_driver)
+            if key[0] == "user":
+                response = sharing_driver.get_user_shared(key[1])
+            else:
+                response = sharing_driver.get_group_shared(key[1])
+        else:
+            with self.__lock:
+                owner = self.__owners.get(item)
+            if kind == "sdi":
+                response = self.api_driver.sdi(owner, key).get_permissions()
+            else:
+                disk_driver = DiskDriver(self.api_driver)
+                disk_driver.user_pk = owner
+                response = disk_driver.get_permissions(key)
+        if not response.ok:
+            raise PermissionIndexError("Failure to fetch {}: {}".format(item, response))
+        return response.detail
+
+    def __apply(self, item: Tuple[str, Any], value: Any) -> None:
+        kind, key = item
+        if kind == "group":
+            self.__set_members(key, value)
+        elif kind == "shared":
+            networks = {("network", str(get_key(network))) for network in get_results(value)}
+            self.__set_principal_grants(key, "network", {network: {"shared"} for network in networks})
+        else:
+            self.__set_grants((kind, key), dict(get_grants(value)))
+
+    def __set_members(self, group_pk: int, members: Set[int]) -> None:
+        old = self.__members.get(group_pk, set())
+        self.__members[group_pk] = set(members)
+        for user in old - members:
+            self.__groups_of.get(user, set()).discard(group_pk)
+        for user in members - old:
+            self.__groups_of.setdefault(user, set()).add(group_pk)
+        group_resources = self.__principal_grants.get(("group", group_pk), {})
+        for user in old ^ members:
+            for resource in group_resources:
+                self.__update_effective(user, resource)
+
+    def __set_grants(self, resource: Resource, grants: Dict[Principal, Set[str]]) -> None:
+        affected = self.__get_affected(resource)
+        for principal in self.__grants.get(resource, {}):
+            self.__principal_grants.get(principal, {}).pop(resource, None)
+        self.__grants[resource] = grants
+        for principal, permissions in grants.items():
+            self.__principal_grants.setdefault(principal, {})[resource] = permissions
+        for user in affected | self.__get_affected(resource):
+            self.__update_effective(user, resource)
+
+    def __set_principal_grants(self, principal: Principal, kind: str, grants: Dict[Resource, Set[str]]) -> None:
+        current = self.__principal_grants.setdefault(principal, {})
+        changed = {resource for resource in current if resource[0] == kind} | set(grants)
+        for resource in changed:
+            resource_grants = self.__grants.setdefault(resource, {})
+            affected = self.__get_affected(resource)
+            if resource in grants:
+                current[resource] = grants[resource]
+                resource_grants[principal] = grants[resource]
+            else:
+                current.pop(resource, None)
+                resource_grants.pop(principal, None)
+            for user in affected | self.__get_affected(resource):
+                self.__update_effective(user, resource)
+
+    def __get_affected(self, resource: Resource) -> Set[int]:
+        users = {self.__owners[resource]} if self.__owners.get(resource) is not None else set()
+        for kind, key in self.__grants.get(resource, {}):
+            if kind == "user":
+                users.add(key)
+            else:
+                users.update(self.__members.get(key, ()))
+        return users
+
+    def __update_effective(self, user_pk: int, resource: Resource) -> None:
+        permissions = set(self.__principal_grants.get(("user", user_pk), {}).get(resource, ()))
+        if self.__owners.get(resource) == user_pk:
+            permissions.add("owner")
+        for group_pk in self.__groups_of.get(user_pk, ()):
+            permissions.update(self.__principal_grants.get(("group", group_pk), {}).get(resource, ()))
+        user_resources = self.__effective.setdefault(user_pk, {})
+        if permissions:
+            user_resources[resource] = permissions
+        else:
+            user_resources.pop(resource, None)
+
+    def __get_users(self) -> List[int]:
+        return [get_key(user) for user in Paginator(UserDriver(self.api_driver).get_all_users)]
+
+    def __get_groups(self) -> List[int]:
+        return [get_key(group) for group in Paginator(GroupDriver(self.api_driver).get_all_groups)]
+
+    def __get_sdis(self) -> Dict[Resource, Any]:
+        return {("sdi", str(get_key(sdi, ("sdi_id", "id", "pk")))): get_key(sdi.get("owner") or sdi.get("user"))
+                for sdi in Paginator(SDIDriver(self.api_driver).get_all_sdis)}
+
+    def __get_disks(self) -> Dict[Resource, Any]:
+        return {("disk", str(disk["image_id"])): get_key(disk.get("owner") or disk.get("user"))
+                for disk in Paginator(DiskDriver(self.api_driver).get_all)}
@@ -1,3 +1,6 @@
 from api.storage.disk import DiskDriver
 from api.storage.general import GeneralDriver
 from api.storage.sdi_file import SDIFileDriver
+from api.storage.download import Downloader
+from api.storage.upload import Uploader
+from api.storage.dedup import DedupUploader, UploadManifest
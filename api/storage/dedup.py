@@ -0,0 +1,184 @@
+"""DedupUploader class object"""
+from typing import Any, Dict, Optional, Union
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import settings.general as g_settings
+from api.driver import APIResponse
+from api.storage.disk import DiskDriver
+from api.storage.sdi_file import SDIFileDriver
+from api.storage.upload import Uploader
+
+
+def hash_file(path: str, block_size: int = None, workers: int = None) -> str:
+    """Return the content hash of a local file.
+
+    The file is mapped with mmap and split into blocks that are hashed with
+    sha256 in parallel threads. The content hash is the sha256 of the file
+    size, the block size and all block digests in order, so it only matches
+    files with identical content.
+
+    :param path: Local file to hash.
+    :type path: str
+    :param block_size: Size in bytes of each block. Default is settings HASH_BLOCK_SIZE.
+    :type block_size: int
+    :param workers: Number of hashing threads. Default is settings HASH_WORKERS.
+    :type workers: int
+    """
+    block_size = block_size or g_settings.HASH_BLOCK_SIZE
+    size = os.path.getsize(path)
+    content_hash = hashlib.sha256("{}:{}:".format(size, block_size).encode())
+    if size == 0:
+        return content_hash.hexdigest()
+
+    with open(path, "rb") as file_obj, mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            blocks = [view[offset:offset + block_size] for offset in range(0, size, block_size)]
+            with ThreadPoolExecutor(max_workers=workers or g_settings.HASH_WORKERS) as executor:
+                for digest in executor.map(lambda block: hashlib.sha256(block).digest(), blocks):
+                    content_hash.update(digest)
+            for block in blocks:
+                block.release()
+        finally:
+            view.release()
+    return content_hash.hexdigest()
+
+
+class UploadManifest:
+    """Local record of content hashes already uploaded by each user of each SDI OS domain.
+
+    Stored as JSON: {domain: {user pk: {kind: {content hash: image_id or file_key}}}}.
+    Entries are per user because disks and SDI files are read and copied
+    under the pk of their owner.
+    """
+
+    def __init__(self, path: str = None) -> None:
+        """Initialize UploadManifest class object
+
+        :param path: JSON file holding the manifest. Default is settings UPLOAD_MANIFEST.
+        :type path: str
+        """
+        self.path = path or g_settings.UPLOAD_MANIFEST
+        self.__lock = threading.Lock()
+        self.__entries = self.__load() # type: Dict[str, Dict[str, Dict[str, Dict[str, str]]]]
+
+    def get(self, domain: str, user_pk: int, kind: str, content_hash: str) -> Optional[str]:
+        """Return the id recorded for content_hash of a user, or None."""
+        with self.__lock:
+            return self.__entries.get(domain, {}).get(str(user_pk), {}).get(kind, {}).get(content_hash)
+
+    def add(self, domain: str, user_pk: int, kind: str, content_hash: str, value: str) -> None:
+        """Record the id of content uploaded by a user and save the manifest."""
+        with self.__lock:
+            self.__entries.setdefault(domain, {}).setdefault(str(user_pk), {}).setdefault(kind, {})[content_hash] = value
+            self.__save()
+
+    def remove(self, domain: str, user_pk: int, kind: str, content_hash: str) -> None:
+        """Forget content of a user that no longer exists on the domain and save the manifest."""
+        with self.__lock:
+            if self.__entries.get(domain, {}).get(str(user_pk), {}).get(kind, {}).pop(content_hash, None) is not None:
+                self.__save()
+
+    def __load(self) -> Dict[str, Dict[str, Dict[str, Dict[str, str]]]]:
+        try:
+            with open(self.path) as manifest_file:
+                return json.load(manifest_file)
+        except (OSError, ValueError):
+            return {}
+
+    def __save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path + ".tmp", "w") as manifest_file:
+            json.dump(self.__entries, manifest_file, indent=g_settings.JSON_FORMAT_INDENT)
+        os.replace(self.path + ".tmp", self.path)
+
+
+class DedupUploader:
+    """Skip uploads of disk images and SDI files already on SDI OS.
+
+    The file is hashed before uploading. When the manifest has an existing
+    disk of the driver's user for the content hash, DiskDriver.copy is used
+    instead of uploading. When it has an existing SDI file, its key is reused.
+    Otherwise the file is uploaded and the new image_id or file_key is
+    recorded. Entries are only forgotten once SDI OS answers 404 for them.
+    """
+
+    def __init__(self, storage_driver: Union[DiskDriver, SDIFileDriver], manifest: UploadManifest = None,
+                 chunk_size: int = None, workers: int = None, adaptive: bool = False) -> None:
+        """Initialize DedupUploader class object
+
+        :param storage_driver: Driver the file is uploaded through
+        :type storage_driver: DiskDriver or SDIFileDriver class object
+        :param manifest: Record of uploaded content. Default is UploadManifest().
+        :type manifest: UploadManifest class object
+        :param chunk_size: Size in bytes of each upload chunk.
+        :type chunk_size: int
+        :param workers: Number of hashing threads.
+        :type workers: int
+        :param adaptive: Tune the upload chunk size from the measured throughput.
+        :type adaptive: bool
+        """
+        self.storage_driver = storage_driver
+        self.manifest = manifest or UploadManifest()
+        self.workers = workers
+        self.was_reused = False
+        self.__uploader = Uploader(storage_driver, chunk_size, adaptive)
+        self.__kind = "disk" if isinstance(storage_driver, DiskDriver) else "sdi_file"
+
+    def upload(self, path: str, data: Dict[str, Any] = None) -> APIResponse:
+        """Upload the file at path unless its content is already on SDI OS and return response.
+
+        The response depends on what was done: the finish_upload response
+        after an upload, the DiskDriver.copy response when a disk was copied,
+        or the SDIFileDriver.get_sdi_file response of the existing file when
+        an SDI file was reused. Use was_reused to tell them apart. For disks,
+        data is also passed to DiskDriver.copy when the upload is skipped.
+        """
+        domain = self.storage_driver.api_driver.domain
+        user_pk = self.storage_driver.user_pk
+        content_hash = hash_file(path, workers=self.workers)
+        name = (data or {}).get("name", os.path.basename(path))
+
+        self.was_reused = False
+        existing = self.manifest.get(domain, user_pk, self.__kind, content_hash)
+        if existing is not None:
+            response = self.__reuse(existing, name, data)
+            if response.ok:
+                self.was_reused = True
+                return response
+            if response.status_code == 404:
+                self.manifest.remove(domain, user_pk, self.__kind, content_hash)
+
+        response = self.__uploader.upload(path, data)
+        if response.ok:
+            uploaded = self.__find_uploaded(response.detail, name)
+            if uploaded is not None:
+                self.manifest.add(domain, user_pk, self.__kind, content_hash, uploaded)
+        return response
+
+    def __reuse(self, existing: str, name: str, data: Optional[Dict[str, Any]]) -> APIResponse:
+        if isinstance(self.storage_driver, DiskDriver):
+            response = self.storage_driver.get_disk(existing)
+            if not response.ok:
+                return response
+            copy_data = {"name": name}
+            copy_data.update(data or {})
+            return self.storage_driver.copy(existing, copy_data)
+        return self.storage_driver.get_sdi_file(existing)
+
+    def __find_uploaded(self, detail: Any, name: str) -> Optional[str]:
+        if isinstance(self.storage_driver, DiskDriver):
+            if isinstance(detail, dict) and detail.get("image_id"):
+                return detail["image_id"]
+            return self.storage_driver.get_users_disk_id(name)
+        if isinstance(detail, dict) and detail.get("key"):
+            return detail["key"]
+        return self.storage_driver.find_file_key(name)
@@ -2,6 +2,7 @@
 from typing import Any, Dict, List, Optional
 
 from api.base_driver import BaseDriver
+from api.deadline import Deadline
 from api.driver import APIDriver
 from api.driver import APIResponse
 from settings.urls import APICategory
@@ -32,9 +33,9 @@ class DiskDriver(BaseDriver):
         """Create blank disk in user's disk store and return response."""
         return self._post("user_list", {"pk": self.user_pk}, data)
 
-    def get_uploads(self) -> APIResponse:
+    def get_uploads(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get user's disk uploads."""
-        return self._get("upload_list", {"pk": self.user_pk})
+        return self._get("upload_list", {"pk": self.user_pk}, params)
 
     def start_upload(self, data: Dict[str, Any]) -> APIResponse:
         """Start a disk upload and return response."""
@@ -57,28 +58,30 @@ class DiskDriver(BaseDriver):
         """Delete an ongoing upload and return response."""
         return self._delete("upload_detail", {"pk": self.user_pk, "disk_upload_key": key})
 
-    def get_all(self) -> APIResponse:
+    def get_all(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get all disks in SDI OS and return response."""
-        return self._get("list")
+        return self._get("list", params=params)
 
-    def get_disks(self) -> APIResponse:
+    def get_disks(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get users disks and return response."""
-        return self._get("user_list", {"pk": self.user_pk})
+        return self._get("user_list", {"pk": self.user_pk}, params)
 
     def get_disk(self, image_id: str) -> APIResponse:
         """Get a user's disk information and return response."""
         return self._get("user_detail", {"pk": self.user_pk, "image_id": image_id})
 
-    def get_users_disk_id(self, disk_name: str) -> Optional[str]:
-        """Search through user's disk store and return uuid of matching disk name."""
-        response = self.get_disks()
+    def get_users_disk_id(self, disk_name: str, timeout: float = None) -> Optional[str]:
+        """Search through user's disk store within timeout seconds and return uuid of matching disk name."""
+        with Deadline(timeout):
+            response = self.get_disks({"name": disk_name})
         if response.ok:
             return self.__search_disks(disk_name, response.detail)
         return None
 
-    def get_disk_id(self, disk_name: str) -> Optional[str]:
-        """Search all disks on deployment and return uuid of matching disk name."""
-        response = self.get_all()
+    def get_disk_id(self, disk_name: str, timeout: float = None) -> Optional[str]:
+        """Search all disks on deployment within timeout seconds and return uuid of matching disk name."""
+        with Deadline(timeout):
+            response = self.get_all({"name": disk_name})
         if response.ok:
             return self.__search_disks(disk_name, response.detail)
         return None
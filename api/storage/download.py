@@ -0,0 +1,230 @@
+"""Downloader class object"""
+from typing import Any, Dict, Optional, Tuple
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import settings.general as g_settings
+from api import deadline
+from api.driver import APIDriver
+from api.driver import HTTPMethod
+from api.storage.general import GeneralDriver
+from api.storage.sdi_file import SDIFileDriver
+
+
+class DownloadError(RuntimeError):
+    """Raise exception when a download fails or does not pass its integrity check"""
+
+
+class Downloader:
+    """Download file content from SDI OS in parallel ranged parts.
+
+    Files are written into a preallocated "<path>.part" file at their final
+    offsets. Finished parts are recorded in a "<path>.part.json" state file,
+    so an interrupted download resumes where it stopped, as long as the
+    server sent an ETag and it still matches. The part file is renamed to
+    path once every part is written and the integrity checks pass.
+    """
+    _url_fields = ("download_url", "download", "url")
+    _read_size = 1024 * 1024
+
+    def __init__(self, api_driver: APIDriver, part_size: int = None, workers: int = None) -> None:
+        """Initialize Downloader class object
+
+        :param api_driver: Allows Downloader to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        :param part_size: Size in bytes of each ranged request. Default is settings DOWNLOAD_PART_SIZE.
+        :type part_size: int
+        :param workers: Number of parts downloaded at once. Default is settings DOWNLOAD_WORKERS.
+        :type workers: int
+        """
+        self.__api_driver = api_driver
+        self.part_size = part_size or g_settings.DOWNLOAD_PART_SIZE
+        self.workers = workers or g_settings.DOWNLOAD_WORKERS
+        self.__lock = threading.Lock()
+
+    def download(self, url: str, path: str, checksum: str = None, algorithm: str = "sha256") -> int:
+        """Download url into path and return the number of bytes in the file.
+
+        :param url: Absolute URL, or URL relative to the API root.
+        :type url: str
+        :param path: Local file path to write.
+        :type path: str
+        :param checksum: Expected hex digest of the file. Skips the hash check if None.
+        :type checksum: str
+        :param algorithm: hashlib algorithm name of checksum.
+        :type algorithm: str
+        """
+        size, etag, ranges = self.__probe(url)
+        part_path = path + ".part"
+        if size is None or not ranges:
+            self.__download_stream(url, part_path)
+            written = os.path.getsize(part_path)
+            if size is not None and written != size:
+                raise DownloadError("Downloaded {} bytes of {} from {}".format(written, size, url))
+        else:
+            self.__download_parts(url, part_path, size, etag)
+            written = size
+
+        if checksum is not None:
+            digest = self.hash_file(part_path, algorithm)
+            if digest.lower() != checksum.lower():
+                self.__remove(part_path, part_path + ".json")
+                raise DownloadError("Checksum mismatch for {}: expected {}, got {}".format(url, checksum, digest))
+
+        os.replace(part_path, path)
+        self.__remove(part_path + ".json")
+        return written
+
+    def download_general_file(self, file_key: str, path: str, user_pk: int, checksum: str = None) -> int:
+        """Download a file from a user's general storage and return the number of bytes in the file."""
+        general_driver = GeneralDriver(self.__api_driver)
+        general_driver.user_pk = user_pk
+        return self.download(self.__get_url(general_driver.get_file(file_key).detail), path, checksum)
+
+    def download_sdi_file(self, file_key: str, path: str, user_pk: int, checksum: str = None) -> int:
+        """Download an exported SDI file and return the number of bytes in the file."""
+        sdi_file_driver = SDIFileDriver(self.__api_driver)
+        sdi_file_driver.user_pk = user_pk
+        return self.download(self.__get_url(sdi_file_driver.get_sdi_file(file_key).detail), path, checksum)
+
+    @classmethod
+    def hash_file(cls, path: str, algorithm: str = "sha256") -> str:
+        """Return the hex digest of a local file, read through mmap."""
+        digest = hashlib.new(algorithm)
+        if os.path.getsize(path) == 0:
+            return digest.hexdigest()
+        with open(path, "rb") as file_obj, mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, len(view), cls._read_size):
+                    digest.update(view[offset:offset + cls._read_size])
+            finally:
+                view.release()
+        return digest.hexdigest()
+
+    def __get_url(self, detail: Any) -> str:
+        if isinstance(detail, dict):
+            for field in self._url_fields:
+                if detail.get(field):
+                    return detail[field]
+        raise DownloadError("No download URL found in file details: {}".format(detail))
+
+    def __probe(self, url: str) -> Tuple[Optional[int], Optional[str], bool]:
+        response = self.__api_driver.fetch(url, HTTPMethod.HEAD, {"Accept-Encoding": "identity"})
+        if not response.ok:
+            raise DownloadError("Failure to get file details of {}: {} {}".format(url, response.status_code, response.reason))
+        length = response.headers.get("Content-Length")
+        size = int(length) if length is not None and "Content-Encoding" not in response.headers else None
+        ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+        return size, response.headers.get("ETag"), ranges
+
+    def __download_stream(self, url: str, part_path: str) -> None:
+        with self.__api_driver.fetch(url) as response:
+            if not response.ok:
+                raise DownloadError("Failure to download {}: {} {}".format(url, response.status_code, response.reason))
+            with open(part_path, "wb") as file_obj:
+                for block in response.iter_content(self._read_size):
+                    file_obj.write(block)
+
+    def __download_parts(self, url: str, part_path: str, size: int, etag: Optional[str]) -> None:
+        state_path = part_path + ".json"
+        state = self.__load_state(state_path, size, etag) if os.path.exists(part_path) else None
+        if state is None:
+            state = {"size": size, "etag": etag, "part_size": self.part_size, "done": []}
+        part_size = state["part_size"]
+        done = set(state["done"])
+        todo = [start for start in range(0, size, part_size) if start not in done]
+
+        flags = os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0)
+        fd = os.open(part_path, flags, 0o644)
+        try:
+            self.__preallocate(fd, size)
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {executor.submit(deadline.bind(self.__download_part), url, fd, start, min(start + part_size, size) - 1, etag): start
+                           for start in todo}
+                try:
+                    for future in as_completed(futures):
+                        future.result()
+                        state["done"].append(futures[future])
+                        self.__save_state(state_path, state)
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        missing = set(range(0, size, part_size)) - set(state["done"])
+        if missing:
+            raise DownloadError("Parts at offsets {} of {} were not downloaded".format(sorted(missing), url))
+
+    def __download_part(self, url: str, fd: int, start: int, end: int, etag: Optional[str]) -> None:
+        # Ranges are byte offsets of the stored file, so parts must not be content encoded
+        headers = {"Range": "bytes={}-{}".format(start, end), "Accept-Encoding": "identity"}
+        if etag is not None:
+            headers["If-Range"] = etag
+        offset = start
+        with self.__api_driver.fetch(url, headers=headers) as response:
+            if response.status_code != 206:
+                raise DownloadError("Failure to download bytes {}-{} of {}: {} {}".format(start, end, url, response.status_code, response.reason))
+            if response.headers.get("Content-Encoding", "identity").lower() != "identity":
+                raise DownloadError("Bytes {}-{} of {} were sent {} encoded".format(start, end, url, response.headers["Content-Encoding"]))
+            for block in response.iter_content(self._read_size):
+                self.__write(fd, block, offset)
+                offset += len(block)
+        if offset != end + 1:
+            raise DownloadError("Short read on bytes {}-{} of {}: got {} bytes".format(start, end, url, offset - start))
+
+    def __write(self, fd: int, block: bytes, offset: int) -> None:
+        if hasattr(os, "pwrite"):
+            view = memoryview(block)
+            while view:
+                written = os.pwrite(fd, view, offset)
+                view = view[written:]
+                offset += written
+        else:
+            with self.__lock:
+                os.lseek(fd, offset, os.SEEK_SET)
+                os.write(fd, block)
+
+    @staticmethod
+    def __preallocate(fd: int, size: int) -> None:
+        if os.fstat(fd).st_size == size:
+            return
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fd, 0, size)
+            except OSError:
+                pass
+        os.ftruncate(fd, size)
+
+    @staticmethod
+    def __load_state(state_path: str, size: int, etag: Optional[str]) -> Optional[Dict[str, Any]]:
+        try:
+            with open(state_path) as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            return None
+        # Without an ETag a changed remote file cannot be told apart from the parts already written
+        if etag is None or state.get("size") != size or state.get("etag") != etag:
+            return None
+        return state
+
+    @staticmethod
+    def __save_state(state_path: str, state: Dict[str, Any]) -> None:
+        with open(state_path + ".tmp", "w") as state_file:
+            json.dump(state, state_file)
+        os.replace(state_path + ".tmp", state_path)
+
+    @staticmethod
+    def __remove(*paths: str) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
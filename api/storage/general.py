@@ -24,21 +24,21 @@ class GeneralDriver(BaseDriver):
         """Clear pks."""
         self.user_pk = None # type: Optional[int]
 
-    def get_all(self) -> APIResponse:
+    def get_all(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get general storage for all users on SDI OS and return response."""
-        return self._get("list")
+        return self._get("list", params=params)
 
-    def get_storage(self) -> APIResponse:
+    def get_storage(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get user's general storage and return response."""
-        return self._get("user_list", {"pk": self.user_pk})
+        return self._get("user_list", {"pk": self.user_pk}, params)
 
     def create_in_root(self, data: Dict[str, Any]) -> APIResponse:
         """Create a directory in root and return response."""
         return self._post("user_list", {"pk": self.user_pk}, data)
 
-    def get_in_dir(self, dir_key: str) -> APIResponse:
+    def get_in_dir(self, dir_key: str, params: Dict[str, Any] = None) -> APIResponse:
         """Get contents from a specific directory and return response."""
-        return self._get("directory_list", {"pk": self.user_pk, "directory_key": dir_key})
+        return self._get("directory_list", {"pk": self.user_pk, "directory_key": dir_key}, params)
 
     def get_dir_path(self, dir_key: str) -> Optional[str]:
         """Return the full directory path with a given directory key."""
@@ -67,9 +67,9 @@ class GeneralDriver(BaseDriver):
         """Move a file to a different directory and return response."""
         return self._put("file_move", {"pk": self.user_pk, "file_key": file_key}, data)
 
-    def get_uploads(self) -> APIResponse:
+    def get_uploads(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get general storage uploads and return response."""
-        return self._get("upload_list", {"pk": self.user_pk})
+        return self._get("upload_list", {"pk": self.user_pk}, params)
 
     def start_upload(self, data: Dict[str, Any]) -> APIResponse:
         """Start a general storage upload and return response."""
@@ -24,13 +24,13 @@ class SDIFileDriver(BaseDriver):
         """Clear pks."""
         self.user_pk = None # type: Optional[int]
 
-    def get_all(self) -> APIResponse:
+    def get_all(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get all SDI files on SDI OS and return response."""
-        return self._get("list")
+        return self._get("list", params=params)
 
-    def get_sdi_files(self) -> APIResponse:
+    def get_sdi_files(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get user's SDI files and return response."""
-        return self._get("user_list", {"pk": self.user_pk})
+        return self._get("user_list", {"pk": self.user_pk}, params)
 
     def get_sdi_file(self, file_key: str) -> APIResponse:
         """Get SDI files details and return response."""
@@ -41,7 +41,7 @@ class SDIFileDriver(BaseDriver):
 
         If key is not found, return None.
         """
-        response = self.get_sdi_files()
+        response = self.get_sdi_files({"name": sdi_file_name})
         if response.ok:
             for sdi_file in response.detail["files"]:
                 if sdi_file_name == sdi_file["name"]:
@@ -59,9 +59,9 @@ class SDIFileDriver(BaseDriver):
         """Import SDI files and return response."""
         return self._put("import", {"pk": self.user_pk, "file_key": file_key}, data)
 
-    def get_uploads(self) -> APIResponse:
+    def get_uploads(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get user's SDI files uploads."""
-        return self._get("upload_list", {"pk": self.user_pk})
+        return self._get("upload_list", {"pk": self.user_pk}, params)
 
     def start_upload(self, data: Dict[str, Any]) -> APIResponse:
         """Start a SDI files upload and return response."""
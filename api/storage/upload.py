@@ -0,0 +1,265 @@
+"""Uploader class object"""
+from typing import Any, Dict, Optional, Union
+
+import email.utils
+import os
+import time
+from collections import deque
+
+import settings.general as g_settings
+from api import deadline
+from api.deadline import Deadline, shielded
+from api.driver import APIResponse
+from api.storage.disk import DiskDriver
+from api.storage.general import GeneralDriver
+from api.storage.sdi_file import SDIFileDriver
+
+StorageDriver = Union[DiskDriver, GeneralDriver, SDIFileDriver]
+
+
+class UploadError(RuntimeError):
+    """Raise exception when an upload cannot be started or a chunk is rejected"""
+
+
+class ChunkRejectedError(UploadError):
+    """Raise exception when the server refused a chunk without storing it, so it can be resent"""
+
+    def __init__(self, message: str, retry_after: float = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UploadStats:
+    """Throughput measured during an upload"""
+
+    def __init__(self) -> None:
+        self.bytes_sent = 0
+        self.seconds = 0.0
+        self.chunks = 0
+        self.retries = 0
+        self.rtt = None # type: Optional[float]
+        self.chunk_size = 0
+        self.__samples = deque(maxlen=16) # type: deque
+
+    def __str__(self) -> str:
+        padding = 10
+        return "\n {:>{pad}}: {}\n".format("Bytes Sent", self.bytes_sent, pad=padding) + \
+               " {:>{pad}}: {:.3f}\n".format("Seconds", self.seconds, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Chunks", self.chunks, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Retries", self.retries, pad=padding) + \
+               " {:>{pad}}: {}\n".format("RTT", self.rtt, pad=padding) + \
+               " {:>{pad}}: {}\n".format("Chunk Size", self.chunk_size, pad=padding) + \
+               " {:>{pad}}: {:.0f}\n".format("Bandwidth", self.bandwidth, pad=padding)
+
+    @property
+    def bandwidth(self) -> float:
+        """Effective upload bandwidth in bytes per second."""
+        return self.bytes_sent / self.seconds if self.seconds > 0 else 0.0
+
+    def record_rtt(self, seconds: float) -> None:
+        """Add a round trip time sample to the smoothed RTT."""
+        self.rtt = seconds if self.rtt is None else 0.875 * self.rtt + 0.125 * seconds
+
+    def record_chunk(self, nbytes: int, seconds: float) -> None:
+        """Count a chunk of nbytes sent in seconds and take an RTT sample from it.
+
+        A chunk takes one round trip plus nbytes / bandwidth, so the RTT
+        sample is the intercept of a least squares line through the size and
+        time of the last chunks. It needs chunks of at least two sizes;
+        until then the RTT of start_upload is kept.
+        """
+        self.bytes_sent += nbytes
+        self.seconds += seconds
+        self.chunks += 1
+        self.__samples.append((nbytes, seconds))
+        count = len(self.__samples)
+        mean_bytes = sum(sample[0] for sample in self.__samples) / count
+        mean_seconds = sum(sample[1] for sample in self.__samples) / count
+        variance = sum((sample[0] - mean_bytes) ** 2 for sample in self.__samples)
+        if variance > 0:
+            slope = sum((sample[0] - mean_bytes) * (sample[1] - mean_seconds) for sample in self.__samples) / variance
+            fastest = min(sample[1] for sample in self.__samples)
+            self.record_rtt(min(max(mean_seconds - slope * mean_bytes, 0.0), fastest))
+
+
+class ChunkSizer:
+    """AIMD chunk size controller.
+
+    The chunk size doubles after each fast chunk until the first slow or
+    failed chunk, then grows by min_size per fast chunk. It is halved when a
+    chunk fails or takes longer than target_seconds. A chunk is fast when it
+    takes under half of target_seconds, or when the RTT is more than a fifth
+    of its time, so the round trip stays a small part of each chunk on high
+    latency links.
+    """
+
+    def __init__(self, size: int = None, min_size: int = None, max_size: int = None, target_seconds: float = None) -> None:
+        self.min_size = min_size or g_settings.UPLOAD_CHUNK_MIN
+        self.max_size = max_size or g_settings.UPLOAD_CHUNK_MAX
+        self.target_seconds = target_seconds or g_settings.UPLOAD_CHUNK_TARGET_SECONDS
+        self.size = self.__clamp(size or g_settings.UPLOAD_CHUNK_SIZE)
+        self.__slow_start = True
+
+    def record(self, nbytes: int, seconds: float, rtt: Optional[float]) -> None:
+        """Adjust the chunk size after a chunk of nbytes was sent in seconds."""
+        if seconds > self.target_seconds:
+            self.backoff()
+        elif nbytes >= self.size and (seconds < self.target_seconds / 2 or (rtt is not None and seconds < 5 * rtt)):
+            self.size = self.__clamp(self.size * 2 if self.__slow_start else self.size + self.min_size)
+
+    def backoff(self) -> None:
+        """Halve the chunk size after a slow or failed chunk."""
+        self.__slow_start = False
+        self.size = self.__clamp(self.size // 2)
+
+    def __clamp(self, size: int) -> int:
+        return max(self.min_size, min(self.max_size, size))
+
+
+class Uploader:
+    """Upload a local file in chunks through a storage driver.
+
+    Works with any driver that has start_upload, upload_chunk, finish_upload
+    and delete_upload: DiskDriver, GeneralDriver and SDIFileDriver. The
+    driver's user_pk must be set before uploading.
+
+    With adaptive set, each chunk is timed and the chunk size is tuned with a
+    ChunkSizer between settings UPLOAD_CHUNK_MIN and UPLOAD_CHUNK_MAX. The
+    chunk protocol has no offset, so a failed chunk is only resent, as is, if
+    the server answered with one of _rejected_statuses and so did not store
+    it, up to retries times. Each resend waits for the Retry-After of the
+    refusal, or else settings UPLOAD_RETRY_DELAY doubled per retry, never
+    past the deadline; when adaptive, the smaller size applies from the next
+    chunk. Any other failure aborts the upload. The throughput of the last
+    upload is kept in stats.
+    """
+    _key_fields = ("key", "pk", "id")
+    # Statuses of a chunk the server refused before storing it
+    _rejected_statuses = (408, 429, 503)
+
+    def __init__(self, storage_driver: StorageDriver, chunk_size: int = None, adaptive: bool = False, retries: int = None) -> None:
+        """Initialize Uploader class object
+
+        :param storage_driver: Driver the file is uploaded through
+        :type storage_driver: DiskDriver, GeneralDriver or SDIFileDriver class object
+        :param chunk_size: Size in bytes of each chunk, or first chunk if adaptive. Default is settings UPLOAD_CHUNK_SIZE.
+        :type chunk_size: int
+        :param adaptive: Tune the chunk size from the measured throughput and RTT.
+        :type adaptive: bool
+        :param retries: Times a refused chunk is resent. Default is settings UPLOAD_RETRIES.
+        :type retries: int
+        """
+        self.storage_driver = storage_driver
+        self.chunk_size = chunk_size or g_settings.UPLOAD_CHUNK_SIZE
+        self.adaptive = adaptive
+        self.retries = g_settings.UPLOAD_RETRIES if retries is None else retries
+        self.stats = UploadStats()
+
+    def upload(self, path: str, data: Dict[str, Any] = None, timeout: float = None) -> APIResponse:
+        """Upload the file at path and return the finish_upload response.
+
+        :param path: Local file to upload.
+        :type path: str
+        :param data: Extra fields for start_upload. "name" and "size" default to the file's.
+        :type data: Dict[str, Any]
+        :param timeout: Seconds the whole upload may take, or None for no limit.
+        :type timeout: float
+        """
+        name = os.path.basename(path)
+        size = os.path.getsize(path)
+        start_data = {"name": name, "size": size}
+        start_data.update(data or {})
+
+        self.stats = UploadStats()
+        with Deadline(timeout):
+            key = self.start(start_data)
+            try:
+                with open(path, "rb") as file_obj:
+                    self.send(key, file_obj, name, size)
+            except BaseException:
+                shielded(self.storage_driver.delete_upload, key)
+                raise
+            return self.storage_driver.finish_upload(key)
+
+    def start(self, data: Dict[str, Any]) -> Any:
+        """Start an upload and return its key."""
+        begin = time.monotonic()
+        response = self.storage_driver.start_upload(data)
+        self.stats.record_rtt(time.monotonic() - begin)
+        if not response.ok:
+            raise UploadError("Failure to start upload: {}".format(response))
+        key = self.get_key(response.detail)
+        if key is None:
+            raise UploadError("No upload key found in response: {}".format(response))
+        return key
+
+    def send(self, key: Any, file_obj: Any, name: str, size: int) -> None:
+        """Send the content of file_obj as chunks of the started upload key."""
+        sizer = ChunkSizer(self.chunk_size) if self.adaptive else None
+        sent = 0
+        while sent < size:
+            chunk_size = sizer.size if sizer is not None else self.chunk_size
+            self.stats.chunk_size = chunk_size
+            file_obj.seek(sent)
+            chunk = file_obj.read(chunk_size)
+            if not chunk:
+                break
+
+            failures = 0
+            while True:
+                begin = time.monotonic()
+                try:
+                    self.send_chunk(key, name, chunk)
+                    break
+                except ChunkRejectedError as err:
+                    if failures >= self.retries:
+                        raise
+                    failures += 1
+                    self.stats.retries += 1
+                    if sizer is not None:
+                        sizer.backoff()
+                    delay = err.retry_after if err.retry_after is not None else g_settings.UPLOAD_RETRY_DELAY * 2 ** (failures - 1)
+                    left = deadline.remaining()
+                    time.sleep(delay if left is None else min(delay, left))
+            seconds = time.monotonic() - begin
+
+            sent += len(chunk)
+            self.stats.record_chunk(len(chunk), seconds)
+            if sizer is not None:
+                sizer.record(len(chunk), seconds, self.stats.rtt)
+
+    def send_chunk(self, key: Any, name: str, chunk: bytes) -> APIResponse:
+        """Send one chunk and return the response."""
+        try:
+            response = self.storage_driver.upload_chunk(key, {"file": (name, chunk)})
+        except IOError as err:
+            raise UploadError("Failure to upload chunk: {}".format(err))
+        if response.status_code in self._rejected_statuses:
+            raise ChunkRejectedError("Chunk refused: {}".format(response), self.get_retry_after(response))
+        if not response.ok:
+            raise UploadError("Failure to upload chunk: {}".format(response))
+        return response
+
+    @staticmethod
+    def get_retry_after(response: APIResponse) -> Optional[float]:
+        """Return the seconds to wait from the Retry-After header of a response, in seconds or as a date."""
+        value = response.response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError, IndexError):
+            return None
+
+    @classmethod
+    def get_key(cls, detail: Any) -> Optional[Any]:
+        """Return the upload key from a start_upload response detail."""
+        if isinstance(detail, dict):
+            for field in cls._key_fields:
+                if detail.get(field) is not None:
+                    return detail[field]
+        return None
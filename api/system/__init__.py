@@ -1,3 +1,5 @@
 from api.system.settings import SettingsDriver
 from api.system.status import StatusDriver
 from api.system.task import TaskDriver
+from api.system.scheduler import TaskScheduler
+from api.system.telemetry import TelemetrySampler
@@ -0,0 +1,162 @@
+"""TaskScheduler class object"""
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import threading
+import time
+
+from api.driver import APIDriver
+from api.driver import APIResponse
+from api.pagination import PaginationError, Paginator
+from api.system.task import TaskDriver
+
+
+class TaskScheduler:
+    """Client side priority scheduler for SDI OS long running process tasks.
+
+    Long running operations (exports, copies, uploads...) are tagged with a
+    priority and an optional deadline. The scheduler reads the pending task
+    queue with TaskDriver.get_all_tasks, computes the smallest reorder payload
+    that brings the queue to priority order, and submits it with
+    TaskDriver.reorder_tasks. Nothing is ever cancelled.
+    """
+    _id_field = "lrpid"
+    _state_field = "status"
+    _pending_states = ("pending", "queued", "0")
+
+    def __init__(self, api_driver: APIDriver) -> None:
+        """Initialize TaskScheduler class object
+
+        :param api_driver: Allows TaskScheduler to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        """
+        self.__task_driver = TaskDriver(api_driver)
+        self.__tags = {} # type: Dict[str, Tuple[int, float]]
+        self.__seen = set() # type: Set[str]
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread = None # type: Optional[threading.Thread]
+
+    def tag(self, lrpid: str, priority: int = 0, deadline: float = None) -> None:
+        """Tag a task with a priority and an optional deadline.
+
+        :param lrpid: Long running process id of the task.
+        :type lrpid: str
+        :param priority: Higher priorities are moved to the front of the queue.
+        :type priority: int
+        :param deadline: Seconds from now the task should be finished by. Earlier deadlines win ties.
+        :type deadline: float
+        """
+        expires = time.monotonic() + deadline if deadline is not None else float("inf")
+        with self.__lock:
+            self.__tags[lrpid] = (priority, expires)
+
+    def untag(self, lrpid: str) -> None:
+        """Stop tracking a task."""
+        with self.__lock:
+            self.__tags.pop(lrpid, None)
+            self.__seen.discard(lrpid)
+
+    @property
+    def tagged(self) -> List[str]:
+        """List of task ids currently tracked by the scheduler."""
+        with self.__lock:
+            return list(self.__tags)
+
+    def get_pending(self) -> Optional[List[str]]:
+        """Return ids of pending tasks in current queue order, or None on failure."""
+        tasks = self.__get_tasks()
+        if tasks is None:
+            return None
+        return [lrpid for lrpid, pending in tasks if pending]
+
+    def get_order(self, pending: List[str]) -> List[str]:
+        """Return the pending task ids sorted by priority, then deadline, then current position."""
+        with self.__lock:
+            tags = dict(self.__tags)
+
+        def sort_key(index: int) -> Tuple[int, float, int]:
+            priority, expires = tags.get(pending[index], (0, float("inf")))
+            return -priority, expires, index
+        return [pending[index] for index in sorted(range(len(pending)), key=sort_key)]
+
+    @staticmethod
+    def get_reorder(pending: List[str], order: List[str]) -> List[str]:
+        """Return the minimal reorder payload that turns pending into order.
+
+        The tasks submitted to reorder_tasks take the queue slots they already
+        occupy, so only tasks that are not in their desired slot are sent.
+        """
+        return [task for current, task in zip(pending, order) if current != task]
+
+    def apply(self) -> Optional[APIResponse]:
+        """Reorder the pending queue once and return the response.
+
+        Tagged tasks are forgotten once they are listed in a state other than
+        pending, or were seen pending and are not listed anymore. Tasks tagged
+        before the controller lists them keep their tag. None is returned when
+        the queue is already in order or could not be read.
+        """
+        tasks = self.__get_tasks()
+        if tasks is None:
+            return None
+        pending = [lrpid for lrpid, is_pending in tasks if is_pending]
+        listed = dict(tasks)
+
+        with self.__lock:
+            self.__seen.update(lrpid for lrpid in pending if lrpid in self.__tags)
+            # Unlisted tasks count as pending until they have been seen pending once
+            for lrpid in list(self.__tags):
+                if not listed.get(lrpid, lrpid not in self.__seen):
+                    del self.__tags[lrpid]
+                    self.__seen.discard(lrpid)
+
+        reorder = self.get_reorder(pending, self.get_order(pending))
+        if not reorder:
+            return None
+        return self.__task_driver.reorder_tasks({"order": reorder})
+
+    def run(self, interval: float = 5.0, until_idle: bool = True) -> None:
+        """Reapply the queue order every interval seconds.
+
+        :param interval: Seconds to wait between queue checks.
+        :type interval: float
+        :param until_idle: Return once no tagged task is pending anymore.
+        :type until_idle: bool
+        """
+        self.__stop.clear()
+        self.__loop(interval, until_idle)
+
+    def start(self, interval: float = 5.0) -> None:
+        """Run the scheduler in a background thread until stop is called."""
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__loop, args=(interval, False), daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Stop a scheduler started with start and wait for it to exit."""
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __loop(self, interval: float, until_idle: bool) -> None:
+        while not self.__stop.is_set():
+            self.apply()
+            if until_idle and not self.tagged:
+                break
+            self.__stop.wait(interval)
+
+    def __get_tasks(self) -> Optional[List[Tuple[str, bool]]]:
+        try:
+            tasks = list(Paginator(self.__task_driver.get_all_tasks))
+        except PaginationError:
+            return None
+        return [(str(task[self._id_field]), self.__is_pending(task)) for task in tasks
+                if isinstance(task, dict) and task.get(self._id_field) is not None]
+
+    def __is_pending(self, task: Dict[str, Any]) -> bool:
+        if self._state_field not in task:
+            return True
+        return str(task[self._state_field]).lower() in self._pending_states
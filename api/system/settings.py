@@ -27,9 +27,9 @@ class SettingsDriver(BaseDriver):
         """Modify system settings and return response."""
         return self._put("detail", data=data)
 
-    def get_physical_networks(self) -> APIResponse:
+    def get_physical_networks(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get physical networks on SDI OS and return response."""
-        return self._get("physical_networks")
+        return self._get("physical_networks", params=params)
 
     def modify_physical_networks(self, data: Dict[str, Any]) -> APIResponse:
         """Modify physical network settings and return response."""
@@ -1,4 +1,6 @@
 """StatusDriver class object"""
+from typing import Any, Dict
+
 from api.base_driver import BaseDriver
 from api.driver import APIDriver
 from api.driver import APIResponse
@@ -21,6 +23,6 @@ class StatusDriver(BaseDriver):
         """Get status of SDI OS and return response."""
         return self._get("detail")
 
-    def get_nodes(self) -> APIResponse:
+    def get_nodes(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get node information and return response."""
-        return self._get("nodes")
+        return self._get("nodes", params=params)
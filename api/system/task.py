@@ -1,5 +1,5 @@
 """TaskDriver class object"""
-from typing import Dict, List
+from typing import Any, Dict, List
 
 from api.base_driver import BaseDriver
 from api.driver import APIDriver
@@ -19,14 +19,14 @@ class TaskDriver(BaseDriver):
         """
         super().__init__(api_driver)
 
-    def get_all_tasks(self) -> APIResponse:
+    def get_all_tasks(self, params: Dict[str, Any] = None) -> APIResponse:
         """Get all long running processes running and return response."""
-        return self._get("system_list")
+        return self._get("system_list", params=params)
 
-    def get_user_tasks(self, user_pk: int) -> APIResponse:
+    def get_user_tasks(self, user_pk: int, params: Dict[str, Any] = None) -> APIResponse:
         """Get long running processes for given user and return response."""
         user_args = {"pk": user_pk}
-        return self._get("user_list", user_args)
+        return self._get("user_list", user_args, params)
 
     def get_task(self, lrpid: str, user_pk: int = None) -> APIResponse:
         """Get details on a user's long running process task and return response."""
@@ -0,0 +1,240 @@
+"""TelemetrySampler class object"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import math
+import threading
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import settings.general as g_settings
+from api.bulk import BulkExecutor
+from api.driver import APIDriver
+from api.pagination import get_results
+from api.system.status import StatusDriver
+from api.utils import get_key
+
+# Node name of the metrics of StatusDriver.get_status, which are not per node
+SYSTEM = ""
+
+
+class TelemetryError(RuntimeError):
+    """Raise exception when numpy is not installed or a metric has not been sampled"""
+
+
+def get_numbers(detail: Any, prefix: str = "") -> Dict[str, float]:
+    """Return the numeric fields of a response detail by dotted name, booleans as 0 and 1, lists left out."""
+    numbers = {}
+    if isinstance(detail, dict):
+        for field, value in detail.items():
+            name = "{}.{}".format(prefix, field) if prefix else str(field)
+            if isinstance(value, dict):
+                numbers.update(get_numbers(value, name))
+            elif isinstance(value, (bool, int, float)) and not (isinstance(value, float) and math.isnan(value)):
+                numbers[name] = float(value)
+    return numbers
+
+
+class RingBuffer:
+    """Fixed size series of the min, max, sum and count of the values of each time bucket.
+
+    Values are folded into the bucket of resolution seconds they fall in as
+    they arrive. Once capacity buckets are used, the oldest bucket is
+    overwritten, so the memory used never grows.
+    """
+    dtype = [("time", "f8"), ("min", "f8"), ("max", "f8"), ("avg", "f8"), ("count", "i8")]
+
+    def __init__(self, resolution: float, capacity: int) -> None:
+        """Initialize RingBuffer class object
+
+        :param resolution: Seconds per bucket.
+        :type resolution: float
+        :param capacity: Number of buckets kept.
+        :type capacity: int
+        """
+        self.resolution = resolution
+        self.capacity = capacity
+        self.__times = numpy.full(capacity, numpy.nan)
+        self.__mins = numpy.full(capacity, numpy.nan)
+        self.__maxs = numpy.full(capacity, numpy.nan)
+        self.__sums = numpy.zeros(capacity)
+        self.__counts = numpy.zeros(capacity, dtype="i8")
+        self.__head = -1
+        self.__size = 0
+
+    def __len__(self) -> int:
+        return self.__size
+
+    @property
+    def span(self) -> float:
+        """Seconds covered when full."""
+        return self.resolution * self.capacity
+
+    def add(self, timestamp: float, value: float) -> None:
+        """Fold a value sampled at timestamp into its bucket."""
+        bucket = math.floor(timestamp / self.resolution) * self.resolution
+        head = self.__head
+        if head < 0 or bucket > self.__times[head]:
+            head = self.__head = (head + 1) % self.capacity
+            self.__size = min(self.__size + 1, self.capacity)
+            self.__times[head] = bucket
+            self.__mins[head] = self.__maxs[head] = value
+            self.__sums[head] = value
+            self.__counts[head] = 1
+        elif bucket == self.__times[head]:
+            self.__mins[head] = min(self.__mins[head], value)
+            self.__maxs[head] = max(self.__maxs[head], value)
+            self.__sums[head] += value
+            self.__counts[head] += 1
+
+    def get(self, since: float = None) -> Any:
+        """Return the buckets, oldest first, as a structured array of time, min, max, avg and count."""
+        order = (numpy.arange(self.__size) + self.__head - self.__size + 1) % self.capacity
+        series = numpy.empty(self.__size, dtype=self.dtype)
+        series["time"] = self.__times[order]
+        series["min"] = self.__mins[order]
+        series["max"] = self.__maxs[order]
+        series["count"] = self.__counts[order]
+        series["avg"] = self.__sums[order] / series["count"]
+        if since is not None:
+            series = series[series["time"] >= math.floor(since / self.resolution) * self.resolution]
+        return series
+
+
+class TelemetrySampler:
+    """Sample SDI OS status and node metrics into fixed size time series.
+
+    Every interval, StatusDriver.get_status and get_nodes are called at once
+    and each numeric field becomes a metric of its node, SYSTEM for the
+    status. Each metric keeps one RingBuffer per (resolution, capacity) tier,
+    e.g. 10 second buckets for the last hour and 5 minute buckets for the
+    last week, all preallocated, so memory is fixed by the number of metrics.
+    Queries use the finest tier covering the requested window and are
+    vectorized over its buckets.
+    """
+
+    def __init__(self, api_driver: APIDriver, interval: float = None, tiers: Sequence[Tuple[float, int]] = None) -> None:
+        """Initialize TelemetrySampler class object
+
+        :param api_driver: Allows TelemetrySampler to communicate with SDI OS
+        :type api_driver: APIDriver class object
+        :param interval: Seconds between samples. Default is settings TELEMETRY_INTERVAL.
+        :type interval: float
+        :param tiers: (seconds per bucket, buckets) of each series, finest first. Default is settings TELEMETRY_TIERS.
+        :type tiers: Sequence[Tuple[float, int]]
+        """
+        if numpy is None:
+            raise TelemetryError("numpy is not installed")
+        self.interval = g_settings.TELEMETRY_INTERVAL if interval is None else interval
+        self.tiers = sorted(g_settings.TELEMETRY_TIERS if tiers is None else tiers)
+        self.failures = 0
+        self.__status_driver = StatusDriver(api_driver)
+        self.__executor = BulkExecutor(2)
+        self.__series = {} # type: Dict[Tuple[str, str], List[RingBuffer]]
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread = None # type: Optional[threading.Thread]
+
+    @property
+    def nodes(self) -> List[str]:
+        """Names of the sampled nodes, SYSTEM included."""
+        with self.__lock:
+            return sorted({node for node, _ in self.__series})
+
+    def get_metrics(self, node: str = SYSTEM) -> List[str]:
+        """Return the names of the sampled metrics of a node."""
+        with self.__lock:
+            return sorted(metric for series_node, metric in self.__series if series_node == node)
+
+    def sample(self) -> int:
+        """Poll status and nodes once, record their metrics, and return the number of values recorded."""
+        now = time.time()
+        status, nodes = self.__executor.map(lambda call: call(), [self.__status_driver.get_status,
+                                                                  self.__status_driver.get_nodes])
+        values = [] # type: List[Tuple[str, str, float]]
+        for result in (status, nodes):
+            if not result.ok:
+                self.failures += 1
+        if status.ok:
+            values.extend((SYSTEM, metric, value) for metric, value in get_numbers(status.value.detail).items())
+        if nodes.ok:
+            detail = nodes.value.detail
+            items = detail["nodes"] if isinstance(detail, dict) and isinstance(detail.get("nodes"), list) else get_results(detail)
+            for item in items:
+                node = str(get_key(item, ("name", "hostname", "id", "pk")))
+                values.extend((node, metric, value) for metric, value in get_numbers(item).items())
+
+        with self.__lock:
+            for node, metric, value in values:
+                series = self.__series.get((node, metric))
+                if series is None:
+                    series = self.__series[(node, metric)] = [RingBuffer(resolution, capacity)
+                                                              for resolution, capacity in self.tiers]
+                for buffer in series:
+                    buffer.add(now, value)
+        return len(values)
+
+    def start(self) -> None:
+        """Sample every interval in a background thread until stop is called."""
+        if self.__thread is not None and self.__thread.is_alive():
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__loop, daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """Stop a sampler started with start and wait for it to exit."""
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def get_series(self, metric: str, node: str = SYSTEM, window: float = None) -> Any:
+        """Return the buckets of a metric over the last window seconds, or all kept, as a structured array.
+
+        The fields are time, the bucket start in POSIX seconds, and the min,
+        max, avg and count of the samples of the bucket.
+        """
+        with self.__lock:
+            series = self.__series.get((node, metric))
+            if series is None:
+                raise TelemetryError("Metric {} of node {!r} has not been sampled".format(metric, node))
+            if window is None:
+                return series[-1].get()
+            buffer = next((buffer for buffer in series if buffer.span >= window), series[-1])
+            return buffer.get(time.time() - window)
+
+    def get_percentile(self, metric: str, percentile: float, node: str = SYSTEM, window: float = None) -> float:
+        """Return a percentile of the bucket averages of a metric over the last window seconds."""
+        series = self.get_series(metric, node, window)
+        return float(numpy.percentile(series["avg"], percentile)) if len(series) else float("nan")
+
+    def get_rolling_percentile(self, metric: str, percentile: float, buckets: int, node: str = SYSTEM,
+                               window: float = None) -> Any:
+        """Return (times, values) of a percentile of the bucket maxima of a metric over each run of buckets."""
+        series = self.get_series(metric, node, window)
+        if len(series) < buckets:
+            return numpy.empty(0), numpy.empty(0)
+        maxima = numpy.ascontiguousarray(series["max"])
+        windows = numpy.lib.stride_tricks.as_strided(
+            maxima, shape=(len(maxima) - buckets + 1, buckets), strides=maxima.strides * 2, writeable=False)
+        return series["time"][buckets - 1:], numpy.percentile(windows, percentile, axis=1)
+
+    def get_rate(self, metric: str, node: str = SYSTEM, window: float = None) -> Any:
+        """Return (times, values) of the change per second of a metric between consecutive buckets, e.g. for counters."""
+        series = self.get_series(metric, node, window)
+        if len(series) < 2:
+            return numpy.empty(0), numpy.empty(0)
+        return series["time"][1:], numpy.diff(series["avg"]) / numpy.diff(series["time"])
+
+    def __loop(self) -> None:
+        while not self.__stop.is_set():
+            begin = time.monotonic()
+            try:
+                self.sample()
+            except Exception:  # pylint: disable=broad-except
+                self.failures += 1
+            self.__stop.wait(max(self.interval - (time.monotonic() - begin), 0.0))
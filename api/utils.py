@@ -0,0 +1,48 @@
+"""Helper functions shared by drivers and orchestrators"""
+from typing import Any, Optional, Tuple
+
+import calendar
+import re
+import time
+
+# Date and time of an ISO 8601 string, with optional fraction and UTC offset
+_ISO_8601 = re.compile(r"(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2})(\.\d+)?\s*(Z|[+-]\d{2}:?\d{2})?$", re.IGNORECASE)
+
+
+def get_key(item: Any, fields: Tuple[str, ...] = ("pk", "id")) -> Any:
+    """Return the key of a list item: the item itself, or its first field found.
+
+    A field holding a nested object gives the key of that object, read from
+    the same fields or else its pk or id, e.g. {"network": {"id": 3}}.
+    """
+    if not isinstance(item, dict):
+        return item
+    for field in fields:
+        if item.get(field) is not None:
+            return get_key(item[field], fields + tuple(name for name in ("pk", "id") if name not in fields))
+    return None
+
+
+def get_timestamp(value: Any) -> Optional[float]:
+    """Return the POSIX time of an epoch number or an ISO 8601 string, or None.
+
+    Strings may end with Z or a +hh:mm offset; strings without one are UTC.
+    Parsed by hand since datetime.fromisoformat is not in Python 3.6.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = _ISO_8601.match(value.strip())
+    if match is None:
+        return None
+    date, clock, fraction, offset = match.groups()
+    try:
+        timestamp = calendar.timegm(time.strptime("{} {}".format(date, clock), "%Y-%m-%d %H:%M:%S"))
+    except ValueError:
+        return None
+    if offset is not None and offset.upper() != "Z":
+        digits = offset[1:].replace(":", "")
+        seconds = int(digits[:2]) * 3600 + int(digits[2:]) * 60
+        timestamp -= seconds if offset[0] == "+" else -seconds
+    return timestamp + (float(fraction) if fraction else 0.0)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Import time regression guard for the sdios command line.
+
+Runs "sdios --help" under "python -X importtime" and fails if a heavy module
+is imported, or if the imports or the whole command take longer than the
+budget. Run from the root of the project:
+
+    python3 benchmarks/importtime.py
+    python3 benchmarks/importtime.py --budget-ms 150 --runs 20
+"""
+from typing import Dict, List, Tuple
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+SDIOS = os.path.join(ROOT, "sdios")
+# Modules "sdios --help" must not import.
+FORBIDDEN = ("requests", "urllib3", "semantic_version", "api.driver", "multiprocessing")
+
+
+def get_import_times(command: List[str]) -> Dict[str, Tuple[int, int]]:
+    """Return (self, cumulative) microseconds of each module imported by command."""
+    result = subprocess.run([sys.executable, "-X", "importtime"] + command, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nested imports are indented below the module importing them.
+        times[name[1:].rstrip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def get_wall_times(command: List[str], runs: int) -> List[float]:
+    """Return the wall clock milliseconds of running command runs times."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + command, stdout=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main() -> int:
+    """Run the benchmark and return the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="maximum median wall time of sdios --help")
+    parser.add_argument("--import-budget-ms", type=float, default=50.0, help="maximum import time on top of startup")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to print")
+    args = parser.parse_args()
+
+    command = [SDIOS, "--help"]
+    imports = get_import_times(command)
+    # Leave out what the interpreter imports at startup anyway.
+    startup = {name.strip() for name in get_import_times(["-c", "pass"])}
+    top_level = {name: times for name, times in imports.items() if not name.startswith(" ") and name not in startup}
+    total_ms = sum(cumulative for _, cumulative in top_level.values()) / 1000
+    wall_ms = statistics.median(get_wall_times(command, args.runs))
+
+    print("Slowest imports (cumulative ms):")
+    for name, (_, cumulative) in sorted(top_level.items(), key=lambda item: -item[1][1])[:args.top]:
+        print("  {:>8.2f}  {}".format(cumulative / 1000, name))
+    print("Total import time: {:.2f} ms (budget {:.0f} ms)".format(total_ms, args.import_budget_ms))
+    print("Median sdios --help: {:.2f} ms (budget {:.0f} ms)".format(wall_ms, args.budget_ms))
+
+    imported = {name.strip() for name in imports}
+    failures = ["imports {}".format(name) for name in FORBIDDEN if name in imported]
+    if total_ms > args.import_budget_ms:
+        failures.append("import time over budget")
+    if wall_ms > args.budget_ms:
+        failures.append("wall time over budget")
+    for failure in failures:
+        print("FAIL: sdios --help " + failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
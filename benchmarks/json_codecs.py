@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Benchmark of the JSON codecs installed for request and response bodies.
+
+Encodes and decodes payloads shaped like SDI OS traffic: a router keychain
+list, a bulk permissions body and a disk list response of several MB. The
+"json (text)" row decodes through a str like requests' Response.json() does.
+Run from the root of the project:
+
+    python3 benchmarks/json_codecs.py
+    python3 benchmarks/json_codecs.py --disks 50000 --runs 5
+"""
+from typing import Any, Callable, Dict, List
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from api.driver import JSON_CODECS, JSONCodec # pylint: disable=wrong-import-position
+
+
+def get_keychains(count: int) -> List[Dict[str, Any]]:
+    """Return a modify_router_keychain body."""
+    return [{"name": "keychain-{}".format(i),
+             "keys": [{"key_id": k, "key_string": "s3cr3t-{}-{}".format(i, k), "cryptographic_algorithm": "hmac-sha-256",
+                       "accept_lifetime": {"start": "2020-01-01T00:00:00Z", "end": None},
+                       "send_lifetime": {"start": "2020-01-01T00:00:00Z", "end": None}} for k in range(8)]}
+            for i in range(count)]
+
+
+def get_permissions(count: int) -> Dict[str, Any]:
+    """Return a modify_permissions body."""
+    return {"users": [{"pk": i, "permissions": ["view", "change", "power", "console"]} for i in range(count)],
+            "groups": [{"pk": i, "permissions": ["view"]} for i in range(count // 10)]}
+
+
+def get_disks(count: int) -> Dict[str, Any]:
+    """Return a disk list response detail."""
+    return {"count": count, "next": None, "previous": None,
+            "results": [{"image_id": "{:08x}-1ac1-47d6-9381-5d6b6505ff78".format(i), "name": "disk-{}".format(i),
+                         "description": "Ubuntu 18.04 server with ünïcödé notes", "size": 10737418240 + i,
+                         "format": "qcow2", "owner": {"pk": i % 500, "username": "user{}".format(i % 500)},
+                         "is_public": i % 3 == 0, "created": "2020-05-01T12:00:00.000000Z",
+                         "tags": ["base", "linux"], "used_by": [{"sdi": "sdi-{}".format(i % 40), "machine": i % 12}]}
+                        for i in range(count)]}
+
+
+def best_of(function: Callable[[], Any], runs: int) -> float:
+    """Return the fastest of runs calls of function in seconds."""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    """Run the benchmark and print a table per payload."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--disks", type=int, default=20000, help="number of disks in the list response")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    codecs = list(JSON_CODECS.values())
+    codecs.append(JSONCodec("json (text)", lambda data: json.dumps(data).encode("utf-8"),
+                            lambda body: json.loads(body.decode("utf-8"))))
+    payloads = [("keychains", get_keychains(500)), ("permissions", get_permissions(5000)),
+                ("disk list", get_disks(args.disks))]
+
+    for name, payload in payloads:
+        body = json.dumps(payload).encode("utf-8")
+        print("\n{} ({:.2f} MB)".format(name, len(body) / 1e6))
+        print("  {:<12} {:>10} {:>10} {:>10}".format("codec", "dumps ms", "loads ms", "loads MB/s"))
+        for codec in codecs:
+            assert codec.loads(codec.dumps(payload)) == payload
+            dumps = best_of(lambda: codec.dumps(payload), args.runs)
+            loads = best_of(lambda: codec.loads(body), args.runs)
+            print("  {:<12} {:>10.2f} {:>10.2f} {:>10.0f}".format(codec.name, dumps * 1000, loads * 1000,
+                                                                 len(body) / loads / 1e6))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
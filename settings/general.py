@@ -1,4 +1,109 @@
 """General settings file"""
+import os
+
 # Change to false to not format SDK json to stdout
 JSON_FORMATTING = True
 JSON_FORMAT_INDENT = 4
+
+# JSON codec of request and response bodies: "orjson", "simdjson", "ujson" or
+# "json". None uses the fastest one installed.
+JSON_CODEC = None
+
+# Pooled HTTP connections kept open to SDI OS by each APIDriver
+CONNECTION_POOLS = 4
+CONNECTION_POOL_SIZE = 16
+
+# Timeouts in seconds to connect to SDI OS and between bytes of a response,
+# for every API call. An api.deadline.Deadline cuts them to the time it has left.
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 300.0
+
+# Compression: response bodies are always negotiated (gzip, deflate, and zstd
+# when the zstandard package is installed). JSON request bodies of at least
+# COMPRESS_MIN_SIZE bytes are gzipped only if COMPRESS_REQUESTS is set, as the
+# server must accept "Content-Encoding: gzip" requests.
+COMPRESS_REQUESTS = False
+COMPRESS_MIN_SIZE = 16 * 1024
+COMPRESS_LEVEL = 6
+
+# Conditional GET: remember ETag/Last-Modified of GET responses and send
+# If-None-Match/If-Modified-Since, reusing the stored body on 304 Not Modified
+CONDITIONAL_GET = True
+VALIDATOR_CACHE_SIZE = 1024
+
+# Request coalescing: when COALESCE_GETS is set, concurrent identical GETs
+# (same URL, query and API version) share one request. A GET sent right after
+# a PUT, POST or DELETE may join a GET that started before the write and so
+# not read its own write; only enable it for read-mostly data.
+# COALESCE_CATEGORIES limits it to some settings.urls.APICategory values,
+# e.g. ["SDIs", "disks"]; None coalesces all.
+COALESCE_GETS = False
+COALESCE_CATEGORIES = None
+
+# Hedged requests: when HEDGE_REQUESTS is set, a GET, HEAD or OPTIONS request
+# still unanswered after the HEDGE_PERCENTILE latency of the last HEDGE_WINDOW
+# calls to its endpoint is sent a second time and the first answer is used.
+# Endpoints are hedged after HEDGE_MIN_SAMPLES calls, and hedges stay under
+# HEDGE_BUDGET of those requests. The requests that may be hedged and their
+# hedges run on two pools of HEDGE_WORKERS threads; when a pool is busy,
+# requests are sent from the calling thread or slow requests are not hedged.
+HEDGE_REQUESTS = False
+HEDGE_PERCENTILE = 95.0
+HEDGE_BUDGET = 0.05
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WORKERS = 8
+
+# Pagination: query parameter names and page size used by api.pagination.Paginator
+PAGE_PARAM = "page"
+PAGE_SIZE_PARAM = "page_size"
+PAGE_SIZE = 100
+
+# Parallel downloads: size of each ranged part and number of parts fetched at once
+DOWNLOAD_PART_SIZE = 16 * 1024 * 1024
+DOWNLOAD_WORKERS = 8
+
+# Chunked uploads: size of each chunk sent to the upload endpoints, and for
+# adaptive uploads the chunk size limits and the slowest acceptable chunk;
+# how many times a refused chunk is resent and the first wait before resending
+# it when the server sends no Retry-After, doubled after every retry
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+UPLOAD_CHUNK_MIN = 256 * 1024
+UPLOAD_CHUNK_MAX = 64 * 1024 * 1024
+UPLOAD_CHUNK_TARGET_SECONDS = 5.0
+UPLOAD_RETRIES = 3
+UPLOAD_RETRY_DELAY = 1.0
+
+# Upload deduplication: content hash block size, hashing threads and manifest location
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+HASH_WORKERS = os.cpu_count() or 4
+UPLOAD_MANIFEST = os.path.join(os.path.expanduser("~"), ".sdios", "upload_manifest.json")
+
+# SDK daemon: Unix domain socket served by "python3 -m api.daemon"
+DAEMON_SOCKET = os.path.join(os.path.expanduser("~"), ".sdios", "daemon.sock")
+
+# Bulk operations: most API calls run at once by api.bulk.BulkExecutor
+BULK_WORKERS = 8
+
+# Power orchestration: seconds between status polls and the longest wait for
+# a wave of SDIs or machines to reach the requested state
+POWER_POLL_INTERVAL = 5.0
+POWER_TIMEOUT = 600.0
+
+# Checkpoints and snapshots: seconds between the starts of consecutive
+# creations by api.sdis.checkpoints.CheckpointManager
+CHECKPOINT_STAGGER = 0.5
+
+# Inventory mirror: SQLite database api.inventory.InventoryMirror copies
+# tenancies, users, SDIs, disks, machines and networks into
+INVENTORY_DATABASE = os.path.join(os.path.expanduser("~"), ".sdios", "inventory.db")
+
+# Columnar export: rows per Arrow record batch, NumPy array and Parquet row
+# group written by api.inventory.ColumnarExporter
+EXPORT_BATCH_SIZE = 50000
+
+# Telemetry: seconds between samples of api.system.TelemetrySampler, and the
+# (seconds per bucket, buckets kept) of each series, here 10 second buckets
+# for an hour and 5 minute buckets for a week
+TELEMETRY_INTERVAL = 10.0
+TELEMETRY_TIERS = [(10.0, 360), (300.0, 2016)]
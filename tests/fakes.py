@@ -0,0 +1,104 @@
+"""Stub responses and APIDriver used by the tests instead of SDI OS"""
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+import threading
+
+import settings.general as g_settings
+import settings.urls as urls
+from settings.urls import APICategory
+
+# One call made through a StubAPIDriver. body is the query params of a GET
+# and the data of any other method.
+Call = NamedTuple("Call", [("method", str), ("category", APICategory), ("name", str),
+                           ("url_args", Dict[str, Any]), ("body", Any)])
+
+
+class StubResponse:
+    """APIResponse look-alike holding a detail"""
+
+    def __init__(self, detail: Any = None, status_code: int = 200, headers: Dict[str, str] = None) -> None:
+        self.detail = detail
+        self.status_code = status_code
+        self.reason = "Stub"
+        self.headers = headers or {}
+        self.url = "stub"
+        self.from_cache = False
+        # Stands in for the requests Response too, e.g. for its headers
+        self.response = self
+
+    def __repr__(self) -> str:
+        return "<StubResponse {} {!r}>".format(self.status_code, self.detail)
+
+    @property
+    def ok(self) -> bool:
+        """True if status_code is less than 400."""
+        return self.status_code < 400
+
+
+def get_page(items: List[Any], params: Dict[str, Any] = None) -> StubResponse:
+    """Return the page of items that the pagination params of a Paginator ask for."""
+    params = params or {}
+    page = int(params.get(g_settings.PAGE_PARAM, 1))
+    size = int(params.get(g_settings.PAGE_SIZE_PARAM, len(items) or 1))
+    start = (page - 1) * size
+    return StubResponse({"count": len(items), "next": "page {}".format(page + 1) if start + size < len(items) else None,
+                         "previous": None, "results": items[start:start + size]})
+
+
+def get_url_name(url_dict: Dict[Tuple[str, str], str]) -> Tuple[APICategory, str]:
+    """Return the category and URL name of a settings.urls.API_URLS url dict."""
+    for category, endpoints in urls.API_URLS.items():
+        for name, endpoint in endpoints.items():
+            if endpoint["url"] is url_dict:
+                return category, name
+    raise KeyError("Unknown url dict {}".format(url_dict))
+
+
+class StubAPIDriver:
+    """APIDriver look-alike answering calls with a handler instead of SDI OS.
+
+    handler takes the Call and returns a StubResponse, or a detail answered
+    with status 200. Every call is recorded in calls, in order.
+    """
+
+    def __init__(self, handler: Callable[[Call], Any]) -> None:
+        self.handler = handler
+        self.calls = [] # type: List[Call]
+        self.__lock = threading.Lock()
+
+    def get(self, url_dict: Dict[Tuple[str, str], str], url_args: Dict[str, Any] = None, params: Dict[str, Any] = None) -> StubResponse:
+        return self.__call("GET", url_dict, url_args, params)
+
+    def post(self, url_dict: Dict[Tuple[str, str], str], url_args: Dict[str, Any] = None, data: Any = None) -> StubResponse:
+        return self.__call("POST", url_dict, url_args, data)
+
+    def put(self, url_dict: Dict[Tuple[str, str], str], url_args: Dict[str, Any] = None, data: Any = None,
+            files: Dict[str, Any] = None) -> StubResponse:
+        return self.__call("PUT", url_dict, url_args, data if files is None else files)
+
+    def delete(self, url_dict: Dict[Tuple[str, str], str], url_args: Dict[str, Any] = None) -> StubResponse:
+        return self.__call("DELETE", url_dict, url_args, None)
+
+    def options(self, url_dict: Dict[Tuple[str, str], str], url_args: Dict[str, Any] = None) -> StubResponse:
+        return self.__call("OPTIONS", url_dict, url_args, None)
+
+    def head(self, url_dict: Dict[Tuple[str, str], str], url_args: Dict[str, Any] = None) -> StubResponse:
+        return self.__call("HEAD", url_dict, url_args, None)
+
+    def sdi(self, user_pk: int, sdi_id: str) -> Any:
+        """Return an SDIContext of one SDI whose calls go through the stub."""
+        from api.sdis.context import SDIContext
+        return SDIContext(self, user_pk, sdi_id)
+
+    def get_calls(self, method: str = None, name: str = None) -> List[Call]:
+        """Return the calls made, optionally only those of one method and URL name."""
+        with self.__lock:
+            return [call for call in self.calls if method in (None, call.method) and name in (None, call.name)]
+
+    def __call(self, method: str, url_dict: Dict[Tuple[str, str], str], url_args: Dict[str, Any], body: Any) -> StubResponse:
+        category, name = get_url_name(url_dict)
+        call = Call(method, category, name, dict(url_args or {}), body)
+        with self.__lock:
+            self.calls.append(call)
+        response = self.handler(call)
+        return response if isinstance(response, StubResponse) else StubResponse(response)
@@ -0,0 +1,85 @@
+"""Tests of api.sdis.checkpoints"""
+from typing import Any
+
+import unittest
+
+from api.sdis.checkpoints import CheckpointError, CheckpointManager, RetentionPolicy
+from api.utils import get_timestamp
+from tests.fakes import Call, StubAPIDriver, StubResponse
+
+
+class GetTimestampTest(unittest.TestCase):
+
+    def test_reads_epochs_and_iso_8601_strings(self) -> None:
+        self.assertEqual(get_timestamp(60), 60.0)
+        self.assertEqual(get_timestamp("1970-01-01T00:01:00"), 60.0)
+        self.assertEqual(get_timestamp("1970-01-01 00:01:00.5Z"), 60.5)
+        self.assertEqual(get_timestamp("1970-01-01T01:01:00+01:00"), 60.0)
+        self.assertEqual(get_timestamp("1969-12-31T23:01:00-0100"), 60.0)
+
+    def test_returns_none_for_anything_else(self) -> None:
+        for value in (None, True, "yesterday", "1970-13-01T00:00:00", ["1970-01-01T00:00:00"]):
+            with self.subTest(value=value):
+                self.assertIsNone(get_timestamp(value))
+
+
+class RetentionPolicyTest(unittest.TestCase):
+
+    items = [{"tag": "nightly-1", "created": 100}, {"tag": "nightly-3", "created": 300},
+             {"tag": "nightly-2", "created": 200}, {"tag": "manual", "created": 0},
+             {"tag": "nightly-undated"}, {"created": 50}]
+
+    def test_keeps_the_newest_managed_items(self) -> None:
+        self.assertEqual(RetentionPolicy(keep=1, prefix="nightly-").get_expired(self.items), ["nightly-2", "nightly-1"])
+
+    def test_expires_old_items(self) -> None:
+        self.assertEqual(RetentionPolicy(max_age=250).get_expired(self.items, now=400), ["nightly-1", "manual"])
+
+    def test_keeps_everything_without_limits(self) -> None:
+        self.assertEqual(RetentionPolicy().get_expired(self.items), [])
+
+
+class CheckpointManagerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.checkpoints = {"a": [{"tag": "old", "created": 0}, {"tag": "new", "created": "2100-01-01T00:00:00Z"}]}
+        self.snapshots = [{"tag": "old", "created": 0}]
+        self.api_driver = StubAPIDriver(self.handle)
+        self.manager = CheckpointManager(self.api_driver, stagger=0)
+
+    def handle(self, call: Call) -> Any:
+        if call.method != "GET":
+            return None
+        if "machine_id" in call.url_args:
+            return self.snapshots
+        sdi_id = call.url_args["sdi_id"]
+        return self.checkpoints[sdi_id] if sdi_id in self.checkpoints else StubResponse(None, 404)
+
+    def get_deleted(self) -> list:
+        return sorted((call.url_args["sdi_id"], call.url_args.get("machine_id", ""), call.url_args.get("check_tag", call.url_args.get("snap_tag")))
+                      for call in self.api_driver.get_calls("DELETE"))
+
+    def test_create_sends_the_tag_to_every_target(self) -> None:
+        results = self.manager.create([(1, "a"), (1, "a", "m")], "nightly", {"description": "gc"})
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual([call.body for call in self.api_driver.get_calls("POST")],
+                         [{"description": "gc", "tag": "nightly"}] * 2)
+
+    def test_get_tags_marks_targets_that_cannot_be_listed(self) -> None:
+        self.assertEqual(self.manager.get_tags([(1, "a"), (1, "b")]), {(1, "a"): ["old", "new"], (1, "b"): None})
+
+    def test_collect_deletes_expired_checkpoints_and_snapshots(self) -> None:
+        results = self.manager.collect([(1, "a"), (1, "a", "m"), (1, "b")], RetentionPolicy(max_age=3600))
+        self.assertEqual(self.get_deleted(), [("a", "", "old"), ("a", "m", "old")])
+        failed = [result for result in results if not result.ok]
+        self.assertEqual([result.item for result in failed], [((1, "b"), None)])
+        self.assertIsInstance(failed[0].error, CheckpointError)
+
+    def test_collect_dry_run_deletes_nothing(self) -> None:
+        results = self.manager.collect([(1, "a")], RetentionPolicy(max_age=3600), dry_run=True)
+        self.assertEqual([result.item for result in results], [((1, "a"), "old")])
+        self.assertEqual(self.get_deleted(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""Tests of api.cli"""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from api import cli
+from settings.urls import APICategory
+from tests.fakes import StubAPIDriver
+
+CREDENTIALS = {"SDIOS_USERNAME": "user", "SDIOS_PASSWORD": "secret", "SDIOS_CLIENT_ID": "id", "SDIOS_CLIENT_SECRET": "key"}
+
+
+class HelpersTest(unittest.TestCase):
+
+    def test_get_command_name_and_url_args(self) -> None:
+        self.assertEqual(cli.get_command_name("user_detail"), "user-detail")
+        self.assertEqual(cli.get_url_args({("1.0.0",): "clouds/{pk}/{sdi_id}/", ("2.0.0",): "sdis/{sdi_id}/"}), ["pk", "sdi_id"])
+
+    def test_get_flag(self) -> None:
+        for value, expected in (("", False), ("0", False), ("off", False), ("1", True), (" Yes ", True)):
+            with mock.patch.dict(os.environ, {"SDIOS_DAEMON": value}):
+                self.assertIs(cli.get_flag("DAEMON"), expected)
+        with mock.patch.dict(os.environ, {"SDIOS_DAEMON": "maybe"}), self.assertRaises(SystemExit):
+            cli.get_flag("DAEMON")
+
+    def test_split_pairs(self) -> None:
+        self.assertEqual(cli.split_pairs(["name=a=b", "empty="]), {"name": "a=b", "empty": ""})
+        with self.assertRaises(SystemExit):
+            cli.split_pairs(["name"])
+
+    def test_get_data_reads_json_or_a_file(self) -> None:
+        self.assertEqual(cli.get_data('{"tag": "x"}'), {"tag": "x"})
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as data_file:
+            json.dump([1], data_file)
+            data_file.flush()
+            self.assertEqual(cli.get_data("@" + data_file.name), [1])
+        self.assertIsNone(cli.get_data(None))
+
+
+@mock.patch.dict(os.environ, CREDENTIALS)
+class CallTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.api_driver = StubAPIDriver(lambda call: {"ok": True})
+        patcher = mock.patch("api.driver.APIDriver", return_value=self.api_driver)
+        self.driver_class = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_cli(self, *argv: str) -> None:
+        with mock.patch("sys.stdout"):
+            self.assertEqual(cli.main(["--domain", "sdios"] + list(argv)), 0)
+
+    def test_get_with_url_args_and_params(self) -> None:
+        self.run_cli("sdis", "status", "--pk", "2", "--sdi-id", "s1", "--param", "name=x")
+        call = self.api_driver.calls[0]
+        self.assertEqual((call.method, call.category, call.name), ("GET", APICategory.SDIS, "status"))
+        self.assertEqual((call.url_args, call.body), ({"pk": "2", "sdi_id": "s1"}, {"name": "x"}))
+        self.assertEqual(self.driver_class.call_args[0][1]["password"], "secret")
+
+    def test_put_files_are_closed(self) -> None:
+        with tempfile.NamedTemporaryFile(suffix=".iso") as upload:
+            self.run_cli("disks", "upload-detail", "-X", "put", "--pk", "1", "--disk-upload-key", "k", "--file", "file=" + upload.name)
+        file_obj = self.api_driver.calls[0].body["file"]
+        self.assertTrue(file_obj.closed)
+
+    def test_missing_domain_exits(self) -> None:
+        with mock.patch.dict(os.environ, clear=True), self.assertRaises(SystemExit):
+            cli.main(["sdis", "status"])
+
+
+if __name__ == "__main__":
+    unittest.main()
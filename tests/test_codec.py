@@ -0,0 +1,40 @@
+"""Tests of the JSON codecs of api.driver"""
+import unittest
+
+from api.driver import APIResponse, InvalidCodecError, JSONCodec, get_json_codec, get_json_codecs
+
+
+class RawResponse:
+    """requests Response look-alike holding a body"""
+
+    def __init__(self, content: bytes) -> None:
+        self.content = content
+
+
+class JSONCodecTest(unittest.TestCase):
+
+    def test_every_installed_codec_round_trips(self) -> None:
+        data = {"name": "sdi-é", "machines": [1, 2.5, None, True], "nested": {"empty": []}}
+        for name, codec in get_json_codecs().items():
+            with self.subTest(codec=name):
+                encoded = codec.dumps(data)
+                self.assertIsInstance(encoded, bytes)
+                self.assertEqual(codec.loads(encoded), data)
+
+    def test_json_is_always_installed_and_last(self) -> None:
+        self.assertEqual(list(get_json_codecs())[-1], "json")
+        self.assertEqual(get_json_codec().name, list(get_json_codecs())[0])
+        self.assertEqual(get_json_codec("json").name, "json")
+
+    def test_unknown_codec_raises(self) -> None:
+        with self.assertRaises(InvalidCodecError):
+            get_json_codec("yaml")
+
+    def test_response_detail_is_decoded_with_the_codec(self) -> None:
+        codec = JSONCodec("upper", lambda data: b"", lambda content: content.decode("utf-8").upper())
+        self.assertEqual(APIResponse(RawResponse(b"ok"), codec=codec).detail, "OK")
+        self.assertIsNone(APIResponse(RawResponse(b"<html>"), codec=get_json_codec("json")).detail)
+
+
+if __name__ == "__main__":
+    unittest.main()
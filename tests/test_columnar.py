@@ -0,0 +1,78 @@
+"""Tests of api.inventory.columnar"""
+from typing import Any
+
+import math
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from api.inventory import columnar
+from api.inventory.columnar import Column, ColumnarError, ColumnarExporter
+from tests.fakes import Call, StubAPIDriver, get_page
+
+
+class ColumnTest(unittest.TestCase):
+
+    def test_get_reads_the_first_field_present(self) -> None:
+        column = Column("owner", "int", ("user", "owner"))
+        self.assertEqual(column.get({"owner": "7"}), 7)
+        self.assertEqual(column.get({"user": {"pk": 3}, "owner": 7}), 3)
+        self.assertIsNone(column.get({}))
+
+    def test_get_reads_dotted_fields(self) -> None:
+        self.assertEqual(Column("cpu", "float", ("stats.cpu",)).get({"stats": {"cpu": "0.5"}}), 0.5)
+        self.assertIsNone(Column("cpu", "float", ("stats.cpu",)).get({"stats": 1}))
+
+    def test_convert_by_kind(self) -> None:
+        self.assertIs(Column("pending", "bool").convert("True"), True)
+        self.assertEqual(Column("created", "time").convert("1970-01-01T00:01:00Z"), 60.0)
+        self.assertIsNone(Column("size", "int").convert("big"))
+        self.assertEqual(Column("name", "str").convert(5), "5")
+
+    def test_unknown_kind_raises(self) -> None:
+        with self.assertRaises(ColumnarError):
+            Column("name", "text")
+
+
+class ColumnarExporterTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.disks = [{"image_id": "d{}".format(index), "name": "disk", "user": {"pk": index % 2}, "size": index * 10}
+                      for index in range(5)]
+        self.disks[4].pop("size")
+        self.api_driver = StubAPIDriver(self.handle)
+        self.exporter = ColumnarExporter(self.api_driver, batch_size=2)
+
+    def handle(self, call: Call) -> Any:
+        return get_page(self.disks, call.body)
+
+    @mock.patch("settings.general.PAGE_SIZE", 3)
+    def test_get_columns_yields_fixed_size_batches_across_pages(self) -> None:
+        batches = list(self.exporter.get_columns("disks"))
+        self.assertEqual([len(columns["image_id"]) for _, columns in batches], [2, 2, 1])
+        self.assertEqual([columns["size"] for _, columns in batches], [[0, 10], [20, 30], [None]])
+        self.assertEqual(len(self.api_driver.calls), 2)
+
+    def test_unknown_kind_raises(self) -> None:
+        with self.assertRaises(ColumnarError):
+            list(self.exporter.get_columns("routers"))
+
+    @unittest.skipIf(columnar.numpy is None, "numpy is not installed")
+    def test_to_numpy_fills_missing_values(self) -> None:
+        array = self.exporter.to_numpy("disks")
+        self.assertEqual(list(array["size"]), [0, 10, 20, 30, -1])
+        self.assertTrue(math.isnan(array["created"][0]))
+        self.assertEqual(columnar.get_totals(array, "owner"), {0: 3.0, 1: 2.0})
+
+    @unittest.skipIf(columnar.pyarrow is None, "pyarrow is not installed")
+    def test_to_parquet_writes_every_row(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "disks.parquet")
+            self.assertEqual(self.exporter.to_parquet("disks", path, compression="none"), 5)
+            table = columnar.pyarrow.parquet.read_table(path)
+            self.assertEqual(table.column("size").to_pylist(), [0, 10, 20, 30, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
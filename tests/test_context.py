@@ -0,0 +1,67 @@
+"""Tests of api.sdis.context"""
+import threading
+import unittest
+
+from api.sdis.context import DriverContext, SDIContext, get_methods
+from api.sdis.machine import MachineDriver
+from tests.fakes import StubAPIDriver
+
+
+class GetMethodsTest(unittest.TestCase):
+
+    def test_splits_methods_by_their_first_argument(self) -> None:
+        bound = get_methods(MachineDriver, "machine_id")
+        unbound = get_methods(MachineDriver, None)
+        self.assertIn("get_machine", bound)
+        self.assertIn("get_all", unbound)
+        self.assertFalse(set(bound) & set(unbound))
+        self.assertNotIn("clear", bound + unbound)
+
+
+class SDIContextTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.api_driver = StubAPIDriver(lambda call: None)
+        self.sdi = SDIContext(self.api_driver, 1, "s1")
+
+    def test_calls_are_sent_with_the_bound_ids(self) -> None:
+        self.sdi.get_status()
+        self.sdi.machines.get_all()
+        self.sdi.machine("m1").interfaces.get_vlans("c1")
+        self.sdi.network("n1").get_all_services()
+        url_args = [call.url_args for call in self.api_driver.calls]
+        self.assertEqual(url_args[0], {"pk": 1, "sdi_id": "s1"})
+        self.assertEqual(url_args[1]["sdi_id"], "s1")
+        self.assertEqual((url_args[2]["machine_id"], url_args[2]["connection_id"]), ("m1", "c1"))
+        self.assertEqual(url_args[3]["network_id"], "n1")
+
+    def test_only_methods_of_the_bound_id_are_available(self) -> None:
+        with self.assertRaises(AttributeError):
+            self.sdi.machines.get_machine
+        with self.assertRaises(AttributeError):
+            self.sdi.machine("m1").get_all
+        self.assertIn("get_status", dir(self.sdi))
+        self.assertEqual(repr(self.sdi.machines), "<DriverContext MachineDriver>")
+
+    def test_contexts_are_immutable(self) -> None:
+        machine = self.sdi.machine("m1")
+        with self.assertRaises(AttributeError):
+            machine.machine_id = "m2"
+        with self.assertRaises(AttributeError):
+            machine.user_pk = 2
+        self.assertEqual((machine.user_pk, machine.sdi_pk, machine.machine_id), (1, "s1", "m1"))
+        self.assertIsInstance(machine.routing, DriverContext)
+
+    def test_contexts_are_shared_across_threads(self) -> None:
+        machines = [self.sdi.machine("m{}".format(index)) for index in range(20)]
+        threads = [threading.Thread(target=machine.get_status) for machine in machines]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(call.url_args["machine_id"] for call in self.api_driver.calls),
+                         sorted(machine.machine_id for machine in machines))
+
+
+if __name__ == "__main__":
+    unittest.main()
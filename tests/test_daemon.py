@@ -0,0 +1,85 @@
+"""Tests of api.daemon"""
+from typing import Any
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from api.daemon import DaemonClient, DaemonError, SDKDaemon, get_key_path
+from tests.fakes import Call, StubAPIDriver, StubResponse
+
+CREDENTIALS = {"username": "user", "password": "secret", "client_id": "id", "client_secret": "key"}
+
+
+class SDKDaemonTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.socket_path = os.path.join(directory.name, "sdk.sock")
+        self.api_driver = StubAPIDriver(self.handle)
+        self.api_driver.session = mock.Mock()
+        patcher = mock.patch("api.driver.APIDriver", return_value=self.api_driver)
+        self.driver_class = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.daemon = SDKDaemon(self.socket_path)
+        self.thread = threading.Thread(target=self.daemon.serve_forever, daemon=True)
+        self.thread.start()
+        self.addCleanup(self.thread.join, 5)
+        self.addCleanup(self.daemon.stop)
+        self.client = DaemonClient(self.socket_path)
+        self.addCleanup(self.client.close)
+        for _ in range(500):
+            if os.path.exists(self.socket_path) and self.client.ping():
+                break
+            time.sleep(0.01)
+
+    def handle(self, call: Call) -> Any:
+        if call.url_args.get("sdi_id") == "locked":
+            return StubResponse(threading.Lock())
+        return {"status": "running", "sdi_id": call.url_args.get("sdi_id")}
+
+    def test_drivers_are_called_with_the_client_state(self) -> None:
+        api_driver = self.client.api_driver("sdios", CREDENTIALS, None)
+        sdi_driver = api_driver.driver("SDIDriver")
+        sdi_driver.user_pk = 2
+        response = sdi_driver.get_status("s1")
+        self.assertEqual(response.detail, {"status": "running", "sdi_id": "s1"})
+        self.assertEqual(self.api_driver.calls[0].url_args, {"pk": 2, "sdi_id": "s1"})
+
+    def test_logins_are_shared_by_credentials(self) -> None:
+        first = self.client.api_driver("sdios", CREDENTIALS, None)
+        self.assertEqual(self.client.api_driver("sdios", CREDENTIALS, None).driver_id, first.driver_id)
+        self.assertEqual(self.driver_class.call_count, 1)
+        with self.assertRaises(DaemonError):
+            self.client.api_driver("sdios", dict(CREDENTIALS, password="other"), None)
+
+    def test_private_and_unknown_members_are_refused(self) -> None:
+        api_driver = self.client.api_driver("sdios", CREDENTIALS, None)
+        with self.assertRaises(DaemonError):
+            api_driver.request("call", "SDIDriver", {}, "_get", ("status",), {})
+        with self.assertRaises(DaemonError):
+            api_driver.driver("Unknown").get()
+        self.assertTrue(self.client.ping())
+
+    def test_unpicklable_results_are_answered_with_an_error(self) -> None:
+        sdi_driver = self.client.api_driver("sdios", CREDENTIALS, None).driver("SDIDriver")
+        with self.assertRaises(DaemonError):
+            sdi_driver.get_status("locked")
+        self.assertTrue(self.client.ping())
+        self.assertEqual(sdi_driver.get_status("s1").detail["sdi_id"], "s1")
+
+    def test_stop_removes_the_socket_and_key(self) -> None:
+        self.client.stop()
+        self.thread.join(5)
+        self.assertFalse(os.path.exists(self.socket_path))
+        self.assertFalse(os.path.exists(get_key_path(self.socket_path)))
+        self.assertFalse(self.client.ping())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+"""Tests of api.deadline"""
+import io
+import threading
+import unittest
+from unittest import mock
+
+from api import deadline
+from api.bulk import BulkExecutor
+from api.deadline import Deadline, DeadlineExceededError
+from api.storage.upload import Uploader
+from tests.test_upload import StubStorageDriver
+
+
+class DeadlineTest(unittest.TestCase):
+
+    def test_nested_deadlines_only_shorten_the_budget(self) -> None:
+        with Deadline(10, read_timeout=30) as outer:
+            with Deadline(100) as inner:
+                self.assertEqual(inner.expires, outer.expires)
+                self.assertEqual(inner.read_timeout, 30)
+            with Deadline(1) as inner:
+                self.assertLess(inner.expires, outer.expires)
+            self.assertIs(deadline.get_deadline(), outer)
+        self.assertIsNone(deadline.get_deadline())
+        self.assertIsNone(deadline.remaining())
+
+    @mock.patch("settings.general.READ_TIMEOUT", 300.0)
+    @mock.patch("settings.general.CONNECT_TIMEOUT", 10.0)
+    def test_get_timeout_cuts_timeouts_to_the_time_left(self) -> None:
+        self.assertEqual(deadline.get_timeout(), (10.0, 300.0))
+        with Deadline(5, connect_timeout=1):
+            connect, read = deadline.get_timeout()
+            self.assertEqual(connect, 1)
+            self.assertLessEqual(read, 5)
+        with Deadline(0):
+            with self.assertRaises(DeadlineExceededError):
+                deadline.get_timeout()
+
+    def test_bind_and_shielded(self) -> None:
+        seen = []
+        with Deadline(5) as current:
+            thread = threading.Thread(target=deadline.bind(lambda: seen.append(deadline.get_deadline())))
+            thread.start()
+            thread.join()
+            self.assertIsNone(deadline.shielded(deadline.get_deadline))
+            self.assertIs(deadline.get_deadline(), current)
+        self.assertEqual(seen, [current])
+
+    def test_bulk_items_do_not_start_past_the_deadline(self) -> None:
+        with Deadline(0):
+            results = BulkExecutor(2).map(lambda item: item, [1, 2])
+        self.assertTrue(all(isinstance(result.error, DeadlineExceededError) for result in results))
+        self.assertEqual([result.value for result in BulkExecutor(2).map(lambda item: item, [1, 2])], [1, 2])
+
+    @mock.patch("api.storage.upload.time.sleep")
+    def test_upload_retries_never_wait_past_the_deadline(self, sleep: mock.Mock) -> None:
+        storage_driver = StubStorageDriver(429, headers={"Retry-After": "60"})
+        with Deadline(1):
+            Uploader(storage_driver, 4).send("upload-1", io.BytesIO(b"0123"), "file", 4)
+        self.assertLessEqual(sleep.call_args[0][0], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
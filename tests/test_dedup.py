@@ -0,0 +1,124 @@
+"""Tests of api.storage.dedup"""
+from typing import Any
+
+import hashlib
+import os
+import tempfile
+import unittest
+
+from api.storage.dedup import DedupUploader, UploadManifest, hash_file
+from api.storage.disk import DiskDriver
+from api.storage.sdi_file import SDIFileDriver
+from tests.fakes import Call, StubAPIDriver, StubResponse
+
+
+class HashFileTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name: str, content: bytes) -> str:
+        path = os.path.join(self.directory, name)
+        with open(path, "wb") as file_obj:
+            file_obj.write(content)
+        return path
+
+    def test_hash_is_the_digest_of_size_block_size_and_block_digests(self) -> None:
+        content = bytes(range(10))
+        expected = hashlib.sha256(b"10:4:")
+        for offset in (0, 4, 8):
+            expected.update(hashlib.sha256(content[offset:offset + 4]).digest())
+        self.assertEqual(hash_file(self.write("a", content), block_size=4, workers=3), expected.hexdigest())
+
+    def test_only_identical_content_matches(self) -> None:
+        first = hash_file(self.write("a", b"x" * 100), block_size=16)
+        self.assertEqual(hash_file(self.write("b", b"x" * 100), block_size=16, workers=1), first)
+        self.assertNotEqual(hash_file(self.write("c", b"x" * 99 + b"y"), block_size=16), first)
+        self.assertEqual(hash_file(self.write("d", b""), block_size=16), hashlib.sha256(b"0:16:").hexdigest())
+
+
+class UploadManifestTest(unittest.TestCase):
+
+    def test_entries_are_per_user_and_saved(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "manifests", "uploads.json")
+            manifest = UploadManifest(path)
+            manifest.add("sdios", 1, "disk", "hash", "d1")
+            self.assertIsNone(manifest.get("sdios", 2, "disk", "hash"))
+            self.assertEqual(UploadManifest(path).get("sdios", 1, "disk", "hash"), "d1")
+            manifest.remove("sdios", 1, "disk", "hash")
+            self.assertIsNone(UploadManifest(path).get("sdios", 1, "disk", "hash"))
+
+    def test_unreadable_manifest_is_empty(self) -> None:
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as manifest_file:
+            manifest_file.write("{")
+            manifest_file.flush()
+            self.assertIsNone(UploadManifest(manifest_file.name).get("sdios", 1, "disk", "hash"))
+
+
+class DedupUploaderTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "image.qcow2")
+        with open(self.path, "wb") as file_obj:
+            file_obj.write(b"disk" * 100)
+        self.manifest = UploadManifest(os.path.join(directory.name, "uploads.json"))
+        self.disks = set()
+        self.api_driver = StubAPIDriver(self.handle)
+        self.api_driver.domain = "sdios"
+
+    def handle(self, call: Call) -> Any:
+        if call.name == "upload_list":
+            return {"key": "upload-1"}
+        if call.name == "upload_detail" and call.body == {"eof": True}:
+            self.disks.add("d1")
+            return {"image_id": "d1", "key": "f1"}
+        if call.name in ("user_detail", "file_detail"):
+            image_id = call.url_args.get("image_id", call.url_args.get("file_key"))
+            return {"name": "image"} if image_id in self.disks | {"f1"} else StubResponse(None, 404)
+        if call.name == "copy":
+            return StubResponse({"image_id": "d2"}, 201)
+        return None
+
+    def get_uploader(self, driver_class: type, user_pk: int = 1) -> DedupUploader:
+        storage_driver = driver_class(self.api_driver)
+        storage_driver.user_pk = user_pk
+        return DedupUploader(storage_driver, self.manifest, chunk_size=64)
+
+    def test_second_disk_upload_is_a_copy(self) -> None:
+        uploader = self.get_uploader(DiskDriver)
+        self.assertEqual(uploader.upload(self.path).detail["image_id"], "d1")
+        self.assertFalse(uploader.was_reused)
+        response = uploader.upload(self.path, {"name": "copy"})
+        self.assertTrue(uploader.was_reused)
+        self.assertEqual(response.detail["image_id"], "d2")
+        self.assertEqual(self.api_driver.get_calls("POST", "copy")[0].body, {"name": "copy"})
+
+    def test_uploads_of_other_users_are_not_reused(self) -> None:
+        self.get_uploader(DiskDriver).upload(self.path)
+        uploader = self.get_uploader(DiskDriver, user_pk=2)
+        uploader.upload(self.path)
+        self.assertFalse(uploader.was_reused)
+
+    def test_removed_disks_are_uploaded_again(self) -> None:
+        uploader = self.get_uploader(DiskDriver)
+        uploader.upload(self.path)
+        self.disks.clear()
+        uploader.upload(self.path)
+        self.assertFalse(uploader.was_reused)
+        self.assertEqual(len(self.api_driver.get_calls("PUT", "upload_list")), 2)
+
+    def test_sdi_files_reuse_their_key(self) -> None:
+        uploader = self.get_uploader(SDIFileDriver)
+        uploader.upload(self.path)
+        self.assertEqual(uploader.upload(self.path).detail, {"name": "image"})
+        self.assertTrue(uploader.was_reused)
+        self.assertEqual(self.api_driver.get_calls("GET", "file_detail")[0].url_args["file_key"], "f1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""Tests of api.storage.download"""
+from typing import Any, Dict, Iterator, List, Tuple
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from api.driver import HTTPMethod
+from api.storage.download import DownloadError, Downloader
+from tests.fakes import StubResponse
+
+CONTENT = bytes(range(256)) * 40
+
+
+class StubFileResponse(StubResponse):
+    """Streamed StubResponse of file content"""
+
+    def __init__(self, content: bytes = b"", status_code: int = 200, headers: Dict[str, str] = None) -> None:
+        super().__init__(None, status_code, headers)
+        self.content = content
+
+    def __enter__(self) -> "StubFileResponse":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        for offset in range(0, len(self.content), chunk_size):
+            yield self.content[offset:offset + chunk_size]
+
+
+class StubFileServer:
+    """APIDriver look-alike serving CONTENT through fetch, with or without ranges"""
+
+    def __init__(self, ranges: bool = True, etag: str = "v1") -> None:
+        self.ranges = ranges
+        self.etag = etag
+        self.failing = set() # type: set
+        self.requests = [] # type: List[Tuple[HTTPMethod, Dict[str, str]]]
+        self.__lock = threading.Lock()
+
+    def fetch(self, url: str, method: HTTPMethod = HTTPMethod.GET, headers: Dict[str, str] = None) -> StubFileResponse:
+        headers = headers or {}
+        with self.__lock:
+            self.requests.append((method, headers))
+        if method is HTTPMethod.HEAD:
+            head = {"Content-Length": str(len(CONTENT))}
+            if self.ranges:
+                head["Accept-Ranges"] = "bytes"
+            if self.etag is not None:
+                head["ETag"] = self.etag
+            return StubFileResponse(headers=head)
+        if "Range" not in headers:
+            return StubFileResponse(CONTENT)
+        start, end = (int(bound) for bound in headers["Range"][len("bytes="):].split("-"))
+        if start in self.failing:
+            return StubFileResponse(status_code=500)
+        return StubFileResponse(CONTENT[start:end + 1], 206)
+
+    def get_ranges(self) -> List[str]:
+        return sorted((headers["Range"] for _, headers in self.requests if "Range" in headers),
+                      key=lambda bounds: int(bounds[len("bytes="):].split("-")[0]))
+
+
+class DownloaderTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "file")
+        self.checksum = hashlib.sha256(CONTENT).hexdigest()
+
+    def test_download_writes_every_part(self) -> None:
+        server = StubFileServer()
+        self.assertEqual(Downloader(server, part_size=1000, workers=3).download("files/1", self.path, self.checksum), len(CONTENT))
+        with open(self.path, "rb") as file_obj:
+            self.assertEqual(file_obj.read(), CONTENT)
+        self.assertEqual(len(server.get_ranges()), 11)
+        self.assertEqual(server.get_ranges()[-1], "bytes=10000-10239")
+        self.assertFalse(os.path.exists(self.path + ".part.json"))
+
+    def test_download_streams_without_ranges(self) -> None:
+        server = StubFileServer(ranges=False)
+        Downloader(server, part_size=1000).download("files/1", self.path, self.checksum)
+        self.assertEqual(server.get_ranges(), [])
+        self.assertEqual(Downloader.hash_file(self.path), self.checksum)
+
+    def test_download_resumes_from_the_state_file(self) -> None:
+        server = StubFileServer()
+        server.failing.add(3000)
+        with self.assertRaises(DownloadError):
+            Downloader(server, part_size=1000, workers=1).download("files/1", self.path)
+        with open(self.path + ".part.json") as state_file:
+            self.assertNotIn(3000, json.load(state_file)["done"])
+        server.failing.clear()
+        server.requests.clear()
+        Downloader(server, part_size=1000).download("files/1", self.path, self.checksum)
+        self.assertNotIn("bytes=0-999", server.get_ranges())
+        self.assertIn("bytes=3000-3999", server.get_ranges())
+
+    def test_download_without_etag_starts_over(self) -> None:
+        server = StubFileServer(etag=None)
+        server.failing.add(3000)
+        with self.assertRaises(DownloadError):
+            Downloader(server, part_size=1000, workers=1).download("files/1", self.path)
+        server.failing.clear()
+        server.requests.clear()
+        Downloader(server, part_size=1000).download("files/1", self.path, self.checksum)
+        self.assertEqual(len(server.get_ranges()), 11)
+        self.assertTrue(all("If-Range" not in headers for _, headers in server.requests))
+
+    def test_checksum_mismatch_removes_the_part_file(self) -> None:
+        with self.assertRaises(DownloadError):
+            Downloader(StubFileServer(), part_size=4096).download("files/1", self.path, "0" * 64)
+        self.assertFalse(os.path.exists(self.path + ".part"))
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
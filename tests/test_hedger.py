@@ -0,0 +1,33 @@
+"""Tests of the Hedger of api.driver"""
+import unittest
+
+from api.driver import Hedger
+
+
+class HedgerTest(unittest.TestCase):
+
+    def test_delay_is_the_percentile_of_recent_latencies(self) -> None:
+        hedger = Hedger(percentile=90, budget=0.1, window=10, min_samples=5)
+        for seconds in range(4):
+            hedger.record("disks", seconds / 10)
+        self.assertIsNone(hedger.get_delay("disks"))
+        hedger.record("disks", 0.4)
+        self.assertEqual(hedger.get_delay("disks"), 0.4)
+        for seconds in range(10, 20):
+            hedger.record("disks", seconds / 10)
+        self.assertEqual(hedger.get_delay("disks"), 1.9)
+        self.assertIsNone(hedger.get_delay("users"))
+
+    def test_hedges_stay_within_the_budget(self) -> None:
+        hedger = Hedger(percentile=95, budget=0.25, window=10, min_samples=1, burst=2)
+        self.assertFalse(hedger.acquire())
+        for _ in range(100):
+            hedger.add_request()
+        self.assertEqual([hedger.acquire() for _ in range(3)], [True, True, False])
+        for _ in range(4):
+            hedger.add_request()
+        self.assertTrue(hedger.acquire())
+
+
+if __name__ == "__main__":
+    unittest.main()
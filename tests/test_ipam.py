@@ -0,0 +1,133 @@
+"""Tests of api.sdis.ipam"""
+from typing import Any
+
+import ipaddress
+import random
+import unittest
+from unittest import mock
+
+from api.sdis.ipam import IPAM, Allocation, AddressIndex, IPAMError, get_address, get_subnet
+from tests.fakes import Call, StubAPIDriver, StubResponse, get_page
+
+
+def get_allocation(first: int, last: int) -> Allocation:
+    return Allocation(ipaddress.ip_address(first), ipaddress.ip_address(last), "net")
+
+
+class AddressIndexTest(unittest.TestCase):
+
+    def test_get_overlaps_matches_a_linear_scan(self) -> None:
+        rng = random.Random(4)
+        allocations = []
+        for _ in range(200):
+            first = rng.randrange(0, 10000)
+            allocations.append(get_allocation(first, first + rng.randrange(0, 300)))
+        index = AddressIndex(allocations[:150])
+        for allocation in allocations[150:]:
+            index.add(allocation)
+        index.remove(allocations[0])
+        kept = allocations[1:]
+        for _ in range(200):
+            first = rng.randrange(0, 10500)
+            last = first + rng.randrange(0, 50)
+            expected = sorted((allocation for allocation in kept if int(allocation.first) <= last and int(allocation.last) >= first),
+                              key=lambda allocation: int(allocation.first))
+            found = index.get_overlaps(first, last)
+            self.assertEqual(sorted(map(id, found)), sorted(map(id, expected)))
+            self.assertEqual([int(allocation.first) for allocation in found], [int(allocation.first) for allocation in expected])
+
+    def test_get_overlaps_of_an_empty_index(self) -> None:
+        self.assertEqual(AddressIndex().get_overlaps(0, 10), [])
+
+    def test_ranges_touching_the_query_overlap(self) -> None:
+        index = AddressIndex([get_allocation(10, 20), get_allocation(30, 40)])
+        self.assertEqual(len(index.get_overlaps(20, 30)), 2)
+        self.assertEqual(index.get_overlaps(21, 29), [])
+
+
+class AddressFieldsTest(unittest.TestCase):
+
+    def test_get_address_and_subnet(self) -> None:
+        self.assertEqual(get_address({"start": "bad", "first": "10.0.0.5/24"}, ("start", "first")), ipaddress.ip_address("10.0.0.5"))
+        self.assertIsNone(get_address({}, ("start",)))
+        self.assertEqual(get_subnet({"subnet": "10.0.0.1", "netmask": "255.255.255.0"}, ("subnet",)),
+                         ipaddress.ip_network("10.0.0.0/24"))
+        self.assertEqual(get_subnet({"cidr": "fd00::/64"}, ("subnet", "cidr")), ipaddress.ip_network("fd00::/64"))
+
+
+class IPAMTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.networks = [{"id": "lan"}, {"id": "dmz"}, {"id": "v6"}]
+        self.services = {
+            "lan": [{"id": 1, "type": "DHCP", "subnet": "10.0.0.0/24"}, {"id": 2, "type": "dns"}],
+            "dmz": [{"id": 3, "subnet": "10.0.1.0", "prefix": 28}],
+            "v6": [{"id": 4, "type": "dhcpv6", "subnet": "fd00::/120"}],
+        }
+        self.pools = {1: [{"id": 11, "start": "10.0.0.1", "end": "10.0.0.99"}, {"id": 12, "start": "10.0.0.150", "end": "10.0.0.160"}],
+                      3: [], 4: []}
+        self.refused = set()
+        self.api_driver = StubAPIDriver(self.handle)
+        self.ipam = IPAM(self.api_driver, 1, "sdi")
+
+    def handle(self, call: Call) -> Any:
+        if call.name == "service_list":
+            return get_page(self.services[call.url_args["network_id"]], call.body)
+        if call.name == "pool_list":
+            service_id = call.url_args["service_id"]
+            if service_id in self.refused:
+                return StubResponse(None, 500)
+            if call.method == "POST":
+                return StubResponse({"id": 100 + len(self.api_driver.get_calls("POST"))}, 201)
+            return get_page(self.pools[service_id], call.body)
+        return get_page(self.networks, call.body)
+
+    @mock.patch("settings.general.PAGE_SIZE", 1)
+    def test_load_indexes_dhcp_subnets_and_pools(self) -> None:
+        self.assertEqual(self.ipam.load(), [])
+        self.assertEqual(sorted(str(allocation.subnet) for allocation in self.ipam.get_subnets()),
+                         ["10.0.0.0/24", "10.0.1.0/28", "fd00::/120"])
+        self.assertEqual([allocation.pool_id for allocation in self.ipam.get_pools("lan")], [11, 12])
+        self.assertEqual(self.api_driver.get_calls("GET", "pool_list")[0].url_args["service_id"], 1)
+
+    def test_load_leaves_out_subnets_whose_pools_failed(self) -> None:
+        self.refused.add(1)
+        self.assertEqual(len(self.ipam.load()), 1)
+        self.assertEqual(self.ipam.get_subnets("lan"), [])
+        self.assertIsInstance(self.ipam.allocate([("lan", 4)])[0].error, IPAMError)
+
+    def test_get_free_skips_pools_and_the_broadcast_address(self) -> None:
+        self.ipam.load()
+        self.assertEqual([(str(first), str(last)) for first, last in self.ipam.get_free("10.0.0.0/24")],
+                         [("10.0.0.100", "10.0.0.149"), ("10.0.0.161", "10.0.0.254")])
+        self.assertEqual(len(self.ipam.get_free("10.0.0.0/24", size=60)), 1)
+
+    def test_get_overlaps_and_conflicts(self) -> None:
+        self.ipam.load()
+        self.assertEqual([allocation.pool_id for allocation in self.ipam.get_overlaps("10.0.0.90", "10.0.0.155")], [11, 12])
+        self.assertEqual(len(self.ipam.get_overlaps("10.0.0.0/24", pools_only=False)), 3)
+        self.assertEqual(self.ipam.get_conflicts(), [])
+        self.pools[3] = [{"id": 31, "start": "10.0.1.2", "end": "10.0.1.8"}, {"id": 32, "start": "10.0.1.5", "end": "10.0.1.6"}]
+        self.ipam.load()
+        self.assertEqual([(first.pool_id, second.pool_id) for first, second in self.ipam.get_conflicts()], [(31, 32)])
+
+    def test_allocate_reserves_distinct_ranges(self) -> None:
+        self.ipam.load()
+        results = self.ipam.allocate([("lan", 50), ("lan", 50), ("v6", 16), ("dmz", 20)], {"lease": 60})
+        self.assertEqual([result.ok for result in results], [True, True, True, False])
+        self.assertEqual([result.item for result in results], [("lan", 50), ("lan", 50), ("v6", 16), ("dmz", 20)])
+        bodies = sorted((call.url_args["service_id"], call.body["start"], call.body["end"], call.body["lease"])
+                        for call in self.api_driver.get_calls("POST"))
+        self.assertEqual(bodies, [(1, "10.0.0.100", "10.0.0.149", 60), (1, "10.0.0.161", "10.0.0.210", 60),
+                                  (4, "fd00::", "fd00::f", 60)])
+        self.assertEqual(len(self.ipam.get_pools("lan")), 4)
+
+    def test_allocate_releases_ranges_of_failed_pools(self) -> None:
+        self.ipam.load()
+        self.refused.add(1)
+        self.assertFalse(self.ipam.allocate([("lan", 10)])[0].ok)
+        self.assertEqual(len(self.ipam.get_pools("lan")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""Tests of api.inventory.mirror"""
+from typing import Any
+
+import unittest
+from unittest import mock
+
+from api.inventory.mirror import InventoryError, InventoryMirror, get_machines
+from settings.urls import APICategory
+from tests.fakes import Call, StubAPIDriver, get_page
+
+
+class InventoryMirrorTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.lists = {
+            APICategory.TENANCIES: [{"pk": 5, "name": "red"}],
+            APICategory.USERS: [{"pk": 1, "username": "ann", "tenancy": {"pk": 5}}, {"pk": 2, "username": "bob", "tenancy": 6}],
+            APICategory.SDIS: [{"sdi_id": "s1", "user": {"pk": 1}, "name": "lab", "state": 2},
+                               {"sdi_id": "s2", "user": 2, "name": "test", "state": 0}],
+            APICategory.DISKS: [{"image_id": "d1", "user": 1, "name": "ubuntu"}],
+        }
+        self.machines = {
+            "s1": [{"id": "m1", "name": "router", "role": "router", "drives": [{"master_id": "d1"}],
+                    "interfaces": [{"network": "n1"}]},
+                   {"id": "m2", "name": "web", "interfaces": [{"network": {"id": "n1"}}]},
+                   {"id": "m3", "name": "db", "drives": [{"image_id": "d1"}]}],
+            "s2": [],
+        }
+        self.networks = {"s1": [{"id": "n1", "name": "lan"}], "s2": [{"id": "n2", "name": "wan"}]}
+        self.api_driver = StubAPIDriver(self.handle)
+        self.mirror = InventoryMirror(self.api_driver, ":memory:")
+        self.addCleanup(self.mirror.close)
+
+    def handle(self, call: Call) -> Any:
+        if call.category == APICategory.MACHINES:
+            return get_page(self.machines[call.url_args["sdi_id"]], call.body)
+        if call.category == APICategory.NETWORKS:
+            return get_page(self.networks[call.url_args["sdi_id"]], call.body)
+        return get_page(self.lists[call.category], call.body)
+
+    def get_ids(self, items: list, field: str = "id") -> list:
+        return sorted(item[field] for item in items)
+
+    @mock.patch("settings.general.PAGE_SIZE", 2)
+    def test_refresh_mirrors_every_page_of_every_list(self) -> None:
+        results = self.mirror.refresh()
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual({result.item: result.value for result in results}[("machines", "s1")], 3)
+        self.assertEqual(self.get_ids(self.mirror.get_machines("s1")), ["m1", "m2", "m3"])
+        self.assertEqual(self.get_ids(self.mirror.get_networks()), ["n1", "n2"])
+        self.assertIsNotNone(self.mirror.get_staleness()["machines"])
+
+    def test_queries_filter_on_indexed_columns(self) -> None:
+        self.mirror.refresh()
+        self.assertEqual(self.get_ids(self.mirror.get_users(tenancy="red"), "username"), ["ann"])
+        self.assertEqual(self.get_ids(self.mirror.get_sdis(state=0), "sdi_id"), ["s2"])
+        self.assertEqual(self.get_ids(self.mirror.get_sdis(tenancy=5, disk="d1"), "sdi_id"), ["s1"])
+        self.assertEqual(self.get_ids(self.mirror.get_machines(disk="d1")), ["m1", "m3"])
+        self.assertEqual(self.get_ids(self.mirror.get_machines(network="n1", role="router")), ["m1"])
+        self.assertEqual(self.get_ids(self.mirror.get_disks(owner=1), "image_id"), ["d1"])
+
+    def test_max_age_skips_fresh_lists(self) -> None:
+        self.mirror.refresh()
+        calls = len(self.api_driver.calls)
+        self.assertEqual(self.mirror.refresh(max_age=3600), [])
+        self.assertEqual(len(self.api_driver.calls), calls)
+
+    def test_removed_sdis_take_their_machines_and_networks_along(self) -> None:
+        self.mirror.refresh()
+        self.lists[APICategory.SDIS].pop()
+        self.mirror.refresh(["sdis"])
+        self.assertEqual(self.get_ids(self.mirror.get_networks()), ["n1"])
+        self.assertIsNone(self.mirror.get_age("networks", "s2"))
+
+    def test_refresh_of_an_unknown_kind_raises(self) -> None:
+        with self.assertRaises(InventoryError):
+            self.mirror.refresh(["routers"])
+
+    def test_get_machines_reads_user_and_managed_machines(self) -> None:
+        self.assertEqual(get_machines({"user": [{"id": "m1"}], "managed": [{"id": "m2"}]}), [{"id": "m1"}, {"id": "m2"}])
+        self.assertEqual(get_machines({"results": [{"id": "m1"}]}), [{"id": "m1"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""Tests of api.pagination"""
+from typing import Any
+
+import unittest
+
+from api.pagination import PaginationError, Paginator, get_results
+from api.storage.disk import DiskDriver
+from tests.fakes import Call, StubAPIDriver, StubResponse, get_page
+
+
+class GetResultsTest(unittest.TestCase):
+
+    def test_reads_paginated_and_plain_details(self) -> None:
+        self.assertEqual(get_results({"count": 1, "results": [1]}), [1])
+        self.assertEqual(get_results({"results": None}), [])
+        self.assertEqual(get_results([1, 2]), [1, 2])
+        self.assertEqual(get_results({"detail": "Not found."}), [])
+
+
+class PaginatorTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.items = list(range(7))
+        self.api_driver = StubAPIDriver(self.handle)
+        self.disk_driver = DiskDriver(self.api_driver)
+
+    def handle(self, call: Call) -> Any:
+        return get_page(self.items, call.body)
+
+    def test_yields_every_item_of_every_page(self) -> None:
+        for prefetch in (True, False):
+            self.api_driver.calls = []
+            paginator = Paginator(self.disk_driver.get_all, page_size=3, prefetch=prefetch)
+            self.assertEqual(list(paginator), self.items)
+            self.assertEqual(paginator.count, 7)
+            self.assertEqual([call.body["page"] for call in self.api_driver.calls], [1, 2, 3])
+
+    def test_sends_params_with_every_page(self) -> None:
+        list(Paginator(self.disk_driver.get_all, {"owner": 1}, page_size=5))
+        self.assertEqual([call.body for call in self.api_driver.calls],
+                         [{"owner": 1, "page": 1, "page_size": 5}, {"owner": 1, "page": 2, "page_size": 5}])
+
+    def test_reads_unpaginated_lists_as_one_page(self) -> None:
+        self.api_driver.handler = lambda call: self.items
+        self.assertEqual(list(Paginator(self.disk_driver.get_all, page_size=3)), self.items)
+        self.assertEqual(len(self.api_driver.calls), 1)
+
+    def test_raises_on_a_failed_page(self) -> None:
+        self.api_driver.handler = lambda call: self.handle(call) if call.body["page"] == 1 else StubResponse(None, 500)
+        paginator = iter(Paginator(self.disk_driver.get_all, page_size=3, prefetch=False))
+        self.assertEqual([next(paginator) for _ in range(3)], [0, 1, 2])
+        with self.assertRaises(PaginationError):
+            next(paginator)
+
+
+if __name__ == "__main__":
+    unittest.main()
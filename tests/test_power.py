@@ -0,0 +1,70 @@
+"""Tests of api.sdis.power"""
+from typing import Any
+
+import unittest
+
+from api.sdis.power import PowerError, PowerOrchestrator
+from tests.fakes import Call, StubAPIDriver, StubResponse
+
+
+class PowerOrchestratorTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.states = {}
+        self.refused = set()
+        self.stuck = set()
+        self.api_driver = StubAPIDriver(self.handle)
+        self.orchestrator = PowerOrchestrator(self.api_driver, poll_interval=0, timeout=0)
+
+    def handle(self, call: Call) -> Any:
+        sdi_id = call.url_args["sdi_id"]
+        if call.name == "status":
+            return {"state": self.states.get(sdi_id, "0")}
+        if sdi_id in self.refused:
+            return StubResponse(None, 409)
+        if sdi_id not in self.stuck:
+            self.states[sdi_id] = "2" if call.name == "start" else "0"
+        return None
+
+    def get_started(self) -> list:
+        return [call.url_args["sdi_id"] for call in self.api_driver.get_calls("POST", "start")]
+
+    def test_get_waves_groups_targets_by_role_in_order(self) -> None:
+        roles = {(1, "a"): "client", (1, "b"): "router", (1, "c"): "db", (1, "d"): "server", (1, "e"): "router"}
+        self.assertEqual(PowerOrchestrator.get_waves(roles, roles),
+                         [[(1, "b"), (1, "e")], [(1, "d")], [(1, "a")], [(1, "c")]])
+        self.assertEqual(PowerOrchestrator.get_waves([(1, "a")], lambda target: "server"), [[(1, "a")]])
+
+    def test_starts_waves_in_order_and_waits_for_each(self) -> None:
+        results = self.orchestrator.start([[(1, "a"), (1, "b")], [(1, "c")]])
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(sorted(self.get_started()[:2]), ["a", "b"])
+        self.assertEqual(self.get_started()[2], "c")
+        self.assertEqual(self.states, {"a": "2", "b": "2", "c": "2"})
+
+    def test_skips_later_waves_after_a_failure(self) -> None:
+        self.refused.add("a")
+        results = self.orchestrator.start([[(1, "a"), (1, "b")], [(1, "c")]])
+        self.assertEqual([result.ok for result in results], [False, True, False])
+        self.assertIsInstance(results[2].error, PowerError)
+        self.assertNotIn("c", self.get_started())
+
+    def test_runs_later_waves_when_asked_to(self) -> None:
+        self.refused.add("a")
+        results = self.orchestrator.start([[(1, "a")], [(1, "c")]], stop_on_failure=False)
+        self.assertEqual([result.ok for result in results], [False, True])
+
+    def test_fails_targets_that_do_not_reach_the_state(self) -> None:
+        self.stuck.add("b")
+        results = self.orchestrator.start([[(1, "a"), (1, "b")]])
+        self.assertEqual([result.ok for result in results], [True, False])
+        self.assertIsInstance(results[1].error, PowerError)
+
+    def test_refuses_actions_sdis_do_not_have(self) -> None:
+        results = self.orchestrator.run("suspend", [[(1, "a")]])
+        self.assertIsInstance(results[0].error, PowerError)
+        self.assertEqual(self.api_driver.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
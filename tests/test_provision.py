@@ -0,0 +1,96 @@
+"""Tests of api.accounts.provision"""
+from typing import Any
+
+import os
+import tempfile
+import unittest
+
+from api.accounts.provision import ProvisionError, Provisioner, get_unique_rows, read_roster
+from settings.urls import APICategory
+from tests.fakes import Call, StubAPIDriver, StubResponse, get_page
+
+
+class RosterTest(unittest.TestCase):
+
+    def test_read_roster_splits_csv_groups_and_drops_empty_fields(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "roster.csv")
+            with open(path, "w") as roster_file:
+                roster_file.write("username,email,groups\nann,,ops; dev\n")
+            self.assertEqual(read_roster(path), [{"username": "ann", "groups": ["ops", "dev"]}])
+
+    def test_read_roster_needs_usernames(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "roster.json")
+            with open(path, "w") as roster_file:
+                roster_file.write('{"users": [{"email": "ann@example.com"}]}')
+            with self.assertRaises(ProvisionError):
+                read_roster(path)
+
+    def test_get_unique_rows_merges_duplicates(self) -> None:
+        roster = [{"username": "ann", "email": "a@x", "groups": ["ops"]}, {"username": "bob"},
+                  {"username": "ann", "email": "b@x", "groups": ["dev", "ops"]}]
+        self.assertEqual(get_unique_rows(roster), [{"username": "ann", "email": "b@x", "groups": ["ops", "dev"]},
+                                                   {"username": "bob"}])
+
+
+class ProvisionerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.users = [{"pk": 1, "username": "ann", "email": "Ann@example.com", "is_active": True, "tenancy": {"pk": 5}}]
+        self.groups = [{"pk": 10, "name": "ops"}]
+        self.tenancies = [{"pk": 5, "name": "red"}]
+        self.new_pks = {APICategory.TENANCIES: 6, APICategory.GROUPS: 11, APICategory.USERS: 2}
+        self.failing = set()
+        self.api_driver = StubAPIDriver(self.handle)
+        self.provisioner = Provisioner(self.api_driver)
+        self.roster = [{"username": "ann", "email": "ann@example.com", "is_active": "true", "tenancy": "blue", "groups": ["ops"]},
+                       {"username": "bob", "tenancy": "red", "groups": ["ops", "dev"]}]
+
+    def handle(self, call: Call) -> Any:
+        if call.category in self.failing:
+            return StubResponse(None, 500)
+        if call.method == "GET":
+            if call.name == "membership":
+                return get_page([{"pk": 1}], call.body)
+            items = {APICategory.USERS: self.users, APICategory.GROUPS: self.groups, APICategory.TENANCIES: self.tenancies}
+            return get_page(items[call.category], call.body)
+        if call.method == "POST":
+            return StubResponse({"pk": self.new_pks[call.category]}, 201)
+        return call.body
+
+    def get_bodies(self, method: str, category: APICategory, name: str) -> list:
+        return [call.body for call in self.api_driver.get_calls(method, name) if call.category == category]
+
+    def test_plan_diffs_the_roster_against_sdi_os(self) -> None:
+        plan = self.provisioner.plan(self.roster)
+        self.assertEqual(plan.tenancies, ["blue"])
+        self.assertEqual(plan.groups, ["dev"])
+        self.assertEqual([row["username"] for row in plan.creates], ["bob"])
+        self.assertEqual(plan.updates, {"ann": {"tenancy": "blue"}})
+        self.assertEqual(plan.members, {"ops": {"bob"}, "dev": {"bob"}})
+
+    def test_plan_of_a_matching_roster_is_empty(self) -> None:
+        plan = self.provisioner.plan([{"username": "ann", "email": "ANN@example.com", "is_active": "1", "tenancy": "red"}])
+        self.assertTrue(plan.empty)
+
+    def test_apply_creates_in_order_and_keeps_existing_members(self) -> None:
+        report = self.provisioner.run(self.roster, logins=False)
+        self.assertEqual(report.failed, [])
+        self.assertEqual(self.get_bodies("POST", APICategory.USERS, "list"), [{"username": "bob", "tenancy": 5}])
+        self.assertEqual(self.get_bodies("PUT", APICategory.USERS, "detail"), [{"tenancy": 6}])
+        members = {call.url_args["group_pk"]: call.body for call in self.api_driver.get_calls("PUT", "membership")}
+        self.assertEqual(members, {10: {"members": [1, 2]}, 11: {"members": [2]}})
+
+    def test_apply_never_sends_a_user_whose_tenancy_failed(self) -> None:
+        plan = self.provisioner.plan(self.roster)
+        self.failing.add(APICategory.TENANCIES)
+        report = self.provisioner.apply(plan, logins=False)
+        failed = [result for result in report.users if not result.ok]
+        self.assertEqual([result.item for result in failed], ["ann"])
+        self.assertIsInstance(failed[0].error, ProvisionError)
+        self.assertEqual(self.get_bodies("PUT", APICategory.USERS, "detail"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""Tests of api.sdis.rollout"""
+from typing import Any
+
+import unittest
+
+from api.sdis.rollout import RolloutError, RouterPlan, RoutingRollout, get_canonical
+from tests.fakes import Call, StubAPIDriver, StubResponse
+
+KEY = {"key_id": 1, "secret": "s1"}
+NEW_KEY = {"key_id": 2, "secret": "s2"}
+
+
+class GetCanonicalTest(unittest.TestCase):
+
+    def test_ignores_order_and_ignored_fields(self) -> None:
+        self.assertEqual(get_canonical([dict(KEY, id=7), NEW_KEY], ("id",)), get_canonical([NEW_KEY, KEY]))
+        self.assertEqual(get_canonical(None), [])
+
+
+class RoutingRolloutTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.targets = [(1, "sdi", "r{}".format(index)) for index in range(4)]
+        self.keychains = {target[2]: [dict(KEY, id=1)] for target in self.targets}
+        self.keychains["r0"] = [KEY, NEW_KEY]
+        self.settings = {target[2]: {"asn": 65000, "bfd": False} for target in self.targets}
+        self.failing = set()
+        self.api_driver = StubAPIDriver(self.handle)
+        self.rollout = RoutingRollout(self.api_driver, max_workers=2)
+
+    def handle(self, call: Call) -> Any:
+        machine_id = call.url_args["machine_id"]
+        if (call.method, call.name, machine_id) in self.failing:
+            return StubResponse(None, 500)
+        stored = self.keychains if call.name == "keychains" else self.settings
+        if call.method == "PUT":
+            stored[machine_id] = call.body
+        return stored[machine_id]
+
+    def test_plan_only_changes_routers_that_differ(self) -> None:
+        plans, failed = self.rollout.plan(self.targets, keychain=lambda target, current: [KEY, NEW_KEY],
+                                          settings={"bfd": False})
+        self.assertEqual(failed, [])
+        self.assertEqual([plan.changed for plan in plans], [False, True, True, True])
+        self.assertEqual(plans[1].pending, ["keychain"])
+        self.assertEqual(plans[1].changes["keychain"][1], [KEY, NEW_KEY])
+
+    def test_plan_merges_partial_settings(self) -> None:
+        plans, _ = self.rollout.plan(self.targets[:1], settings={"bfd": True})
+        self.assertEqual(plans[0].settings, {"asn": 65000, "bfd": True})
+        self.assertEqual(plans[0].changes, {"bfd": (False, True)})
+        self.assertIsNone(plans[0].keychain)
+
+    def test_plan_returns_failed_reads(self) -> None:
+        self.failing.add(("GET", "settings", "r2"))
+        plans, failed = self.rollout.plan(self.targets, settings={"bfd": True})
+        self.assertEqual(len(plans), 3)
+        self.assertIsInstance(failed[0].error, RolloutError)
+        self.assertEqual(failed[0].item, self.targets[2])
+
+    def test_run_pushes_waves_and_stops_after_a_failure(self) -> None:
+        self.failing.add(("PUT", "settings", "r0"))
+        results = self.rollout.rollout(self.targets, settings={"bfd": True}, waves=(1,))
+        self.assertEqual([result.ok for result in results], [False, False, False, False])
+        self.assertIsInstance(results[1].error, RolloutError)
+        self.assertEqual(len(self.api_driver.get_calls("PUT")), 1)
+
+    def test_run_without_stop_pushes_every_wave(self) -> None:
+        self.failing.add(("PUT", "settings", "r0"))
+        results = self.rollout.rollout(self.targets, settings={"bfd": True}, waves=(1,), stop_on_failure=False)
+        self.assertEqual([result.ok for result in results], [False, True, True, True])
+        self.assertEqual(set(RoutingRollout.get_latencies(results)), set(self.targets))
+
+    def test_partial_apply_is_resumed_from_the_pending_part(self) -> None:
+        self.failing.add(("PUT", "settings", "r1"))
+        plans, _ = self.rollout.plan(self.targets[1:2], keychain=[KEY, NEW_KEY], settings={"bfd": True})
+        self.assertFalse(self.rollout.run(plans)[0].ok)
+        self.assertEqual((plans[0].applied, plans[0].pending), (["keychain"], ["settings"]))
+        self.failing.clear()
+        self.assertTrue(self.rollout.run(plans)[0].ok)
+        self.assertEqual([call.name for call in self.api_driver.get_calls("PUT")], ["keychains", "settings", "settings"])
+        self.assertEqual(self.rollout.run(plans), [])
+
+    def test_router_plan_repr(self) -> None:
+        self.assertIn("changes=[]", repr(RouterPlan(self.targets[0])))
+
+
+if __name__ == "__main__":
+    unittest.main()
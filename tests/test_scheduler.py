@@ -0,0 +1,75 @@
+"""Tests of api.system.scheduler"""
+from typing import Any
+
+import unittest
+from unittest import mock
+
+from api.system.scheduler import TaskScheduler
+from settings.urls import APICategory
+from tests.fakes import Call, StubAPIDriver, get_page
+
+
+class TaskSchedulerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tasks = []
+        self.api_driver = StubAPIDriver(self.handle)
+        self.scheduler = TaskScheduler(self.api_driver)
+
+    def handle(self, call: Call) -> Any:
+        self.assertEqual(call.category, APICategory.SYSTEM_TASKS)
+        if call.name == "system_list":
+            return get_page(self.tasks, call.body)
+        return call.body
+
+    def set_tasks(self, *states: str) -> None:
+        self.tasks = [{"lrpid": lrpid, "status": status} for lrpid, status in (state.split(":") for state in states)]
+
+    def test_get_reorder_sends_only_moved_tasks(self) -> None:
+        self.assertEqual(TaskScheduler.get_reorder(["a", "b", "c", "d"], ["a", "c", "b", "d"]), ["c", "b"])
+        self.assertEqual(TaskScheduler.get_reorder(["a", "b"], ["a", "b"]), [])
+
+    def test_get_order_sorts_by_priority_then_deadline_then_position(self) -> None:
+        self.scheduler.tag("c", priority=5)
+        self.scheduler.tag("d", priority=1, deadline=60)
+        self.scheduler.tag("b", priority=1, deadline=10)
+        self.assertEqual(self.scheduler.get_order(["a", "b", "c", "d", "e"]), ["c", "b", "d", "a", "e"])
+
+    def test_get_pending_skips_other_states_and_tasks_without_id(self) -> None:
+        self.set_tasks("a:pending", "b:running", "c:queued")
+        self.tasks.append({"status": "pending"})
+        self.assertEqual(self.scheduler.get_pending(), ["a", "c"])
+
+    @mock.patch("settings.general.PAGE_SIZE", 1)
+    def test_get_pending_reads_every_page(self) -> None:
+        self.set_tasks("a:pending", "b:running", "c:pending")
+        self.assertEqual(self.scheduler.get_pending(), ["a", "c"])
+        self.assertEqual(len(self.api_driver.get_calls("GET", "system_list")), 3)
+
+    def test_apply_submits_the_minimal_reorder(self) -> None:
+        self.set_tasks("a:pending", "b:pending", "c:pending")
+        self.scheduler.tag("c", priority=1)
+        self.assertEqual(self.scheduler.apply().detail, {"order": ["c", "a", "b"]})
+        self.set_tasks("c:pending", "a:pending", "b:pending")
+        self.assertIsNone(self.scheduler.apply())
+        self.assertEqual(len(self.api_driver.get_calls("POST", "reorder")), 1)
+
+    def test_apply_keeps_tags_of_tasks_not_listed_yet(self) -> None:
+        self.scheduler.tag("new", priority=1)
+        self.set_tasks("a:pending")
+        self.scheduler.apply()
+        self.assertEqual(self.scheduler.tagged, ["new"])
+
+    def test_apply_forgets_tags_of_finished_tasks(self) -> None:
+        self.scheduler.tag("a", priority=1)
+        self.scheduler.tag("b", priority=1)
+        self.set_tasks("a:pending", "b:running")
+        self.scheduler.apply()
+        self.assertEqual(self.scheduler.tagged, ["a"])
+        self.set_tasks()
+        self.scheduler.apply()
+        self.assertEqual(self.scheduler.tagged, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
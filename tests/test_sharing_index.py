@@ -0,0 +1,120 @@
+"""Tests of api.sharing.index"""
+from typing import Any
+
+import unittest
+
+from api.sharing.index import PermissionIndex, PermissionIndexError, get_grants
+from api.utils import get_key
+from settings.urls import APICategory
+from tests.fakes import Call, StubAPIDriver, StubResponse, get_page
+
+
+class GetKeyTest(unittest.TestCase):
+
+    def test_reads_the_first_field_found(self) -> None:
+        self.assertEqual(get_key({"id": 2, "pk": 1}), 1)
+        self.assertEqual(get_key(7), 7)
+        self.assertIsNone(get_key({"name": "x"}))
+
+    def test_reads_nested_objects_by_the_same_fields_or_their_pk(self) -> None:
+        self.assertEqual(get_key({"user": {"user": 3}}, ("user",)), 3)
+        self.assertEqual(get_key({"network": {"id": "n1"}}, ("network",)), "n1")
+        self.assertEqual(get_key({"disk": {"image_id": "d1", "id": 4}}, ("image_id", "disk")), "d1")
+
+
+class GetGrantsTest(unittest.TestCase):
+
+    def test_reads_users_and_groups_lists(self) -> None:
+        detail = {"users": [{"pk": 1, "permissions": ["read", "write"]}, 2], "groups": [{"id": 10, "level": "read"}]}
+        self.assertEqual(get_grants(detail), [(("user", 1), {"read", "write"}), (("user", 2), {"access"}),
+                                              (("group", 10), {"read"})])
+
+    def test_reads_lists_of_entries(self) -> None:
+        detail = {"results": [{"user": {"pk": 1}, "permission": "read"}, {"group": 10}]}
+        self.assertEqual(get_grants(detail), [(("user", 1), {"read"}), (("group", 10), {"access"})])
+
+
+class PermissionIndexTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.members = {10: [{"pk": 2}]}
+        self.permissions = {
+            ("sdi", "s1"): {"users": [{"pk": 3, "permissions": ["read"]}], "groups": [{"pk": 10, "permission": "write"}]},
+            ("disk", "d1"): [],
+        }
+        self.shared = {("user", 1): [{"id": "n1"}], ("group", 10): [{"id": "n2"}]}
+        self.failing = set()
+        self.api_driver = StubAPIDriver(self.handle)
+        self.index = PermissionIndex(self.api_driver)
+
+    def handle(self, call: Call) -> Any:
+        if call.name in self.failing:
+            return StubResponse(None, 500)
+        if call.name == "list":
+            items = {APICategory.USERS: [{"pk": 1}, {"pk": 2}, {"pk": 3}], APICategory.GROUPS: [{"pk": 10}],
+                     APICategory.SDIS: [{"sdi_id": "s1", "owner": {"pk": 1}}],
+                     APICategory.DISKS: [{"image_id": "d1", "user": 3}]}[call.category]
+            return get_page(items, call.body)
+        if call.name == "membership":
+            return get_page(self.members.get(call.url_args["group_pk"], []), call.body)
+        if call.name == "permissions":
+            kind = "sdi" if call.category == APICategory.SDIS else "disk"
+            return self.permissions[(kind, call.url_args.get("sdi_id", call.url_args.get("image_id")))]
+        if call.name == "user_detail":
+            return self.shared.get(("user", call.url_args["pk"]), [])
+        return self.shared.get(("group", call.url_args["group_pk"]), [])
+
+    def test_build_indexes_owners_grants_groups_and_shared_networks(self) -> None:
+        self.assertEqual(self.index.build(), [])
+        self.assertTrue(self.index.can_access(1, "sdi", "s1", "delete"))
+        self.assertTrue(self.index.can_access(2, "sdi", "s1", "write"))
+        self.assertFalse(self.index.can_access(2, "sdi", "s1", "read"))
+        self.assertTrue(self.index.can_access(3, "disk", "d1"))
+        self.assertFalse(self.index.can_access(2, "disk", "d1"))
+        self.assertEqual(self.index.get_user_resources(2), {("sdi", "s1"): {"write"}, ("network", "n2"): {"shared"}})
+        self.assertEqual(self.index.get_user_resources(1, "network"), {("network", "n1"): {"shared"}})
+        self.assertEqual(self.index.get_users("sdi", "s1"), {1, 2, 3})
+        self.assertEqual(self.index.get_principals("sdi", "s1"), {("user", 3): {"read"}, ("group", 10): {"write"}})
+
+    def test_build_returns_failed_lists(self) -> None:
+        self.failing.add("list")
+        failed = self.index.build()
+        self.assertEqual(len(failed), 4)
+        self.assertEqual(self.index.get_user_resources(1), {})
+
+    def test_refresh_group_moves_group_access(self) -> None:
+        self.index.build()
+        self.members[10] = [{"pk": 3}]
+        self.assertEqual(self.index.refresh_group(10), [])
+        self.assertEqual(self.index.get_members(10), {3})
+        self.assertEqual(self.index.get_user_resources(2), {})
+        self.assertEqual(self.index.get_user_resources(3, "sdi"), {("sdi", "s1"): {"read", "write"}})
+
+    def test_refresh_resource_updates_grants_and_owner(self) -> None:
+        self.index.build()
+        self.permissions[("sdi", "s1")] = {"users": [2]}
+        self.index.refresh_resource("sdi", "s1")
+        self.assertFalse(self.index.can_access(3, "sdi", "s1"))
+        self.assertEqual(self.index.get_users("sdi", "s1"), {1, 2})
+
+        self.index.refresh_resource("disk", "d1", owner=2)
+        self.assertTrue(self.index.can_access(2, "disk", "d1", "delete"))
+        self.assertFalse(self.index.can_access(3, "disk", "d1"))
+
+    def test_refresh_shared_replaces_shared_networks(self) -> None:
+        self.index.build()
+        self.shared[("user", 1)] = [{"id": "n3"}]
+        self.index.refresh_shared(("user", 1))
+        self.assertEqual(self.index.get_user_resources(1, "network"), {("network", "n3"): {"shared"}})
+        self.assertEqual(self.index.get_principals("network", "n1"), {})
+
+    def test_refresh_returns_failed_fetches(self) -> None:
+        self.index.build()
+        self.failing.add("permissions")
+        failed = self.index.refresh_resource("sdi", "s1")
+        self.assertIsInstance(failed[0].error, PermissionIndexError)
+        self.assertTrue(self.index.can_access(2, "sdi", "s1", "write"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+"""Tests of the APIStats counters of api.driver"""
+import threading
+import unittest
+
+from api.driver import APIStats
+
+
+class APIStatsTest(unittest.TestCase):
+
+    def test_ratios_default_to_one(self) -> None:
+        stats = APIStats()
+        self.assertEqual((stats.request_ratio, stats.response_ratio), (1.0, 1.0))
+        stats.add(request_bytes=300, request_bytes_sent=100, response_bytes=50, response_bytes_received=200)
+        self.assertEqual((stats.request_ratio, stats.response_ratio), (3.0, 0.25))
+        self.assertIn("Request Ratio: 3.00", str(stats))
+
+    def test_add_is_thread_safe_and_reset_clears_every_counter(self) -> None:
+        stats = APIStats()
+        threads = [threading.Thread(target=lambda: [stats.add(requests=1) for _ in range(1000)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(stats.requests, 4000)
+        stats.add(response_bytes=5)
+        stats.reset()
+        self.assertEqual((stats.requests, stats.response_bytes), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""Tests of api.system.telemetry"""
+from typing import Any
+
+import unittest
+from unittest import mock
+
+from api.system import telemetry
+from api.system.telemetry import SYSTEM, RingBuffer, TelemetryError, TelemetrySampler, get_numbers
+from tests.fakes import Call, StubAPIDriver, StubResponse
+
+
+class GetNumbersTest(unittest.TestCase):
+
+    def test_flattens_numeric_fields(self) -> None:
+        detail = {"cpu": 3, "up": True, "name": "node", "memory": {"used": 1.5, "free": float("nan")}, "disks": [1, 2]}
+        self.assertEqual(get_numbers(detail), {"cpu": 3.0, "up": 1.0, "memory.used": 1.5})
+        self.assertEqual(get_numbers([1, 2]), {})
+
+
+@unittest.skipIf(telemetry.numpy is None, "numpy is not installed")
+class RingBufferTest(unittest.TestCase):
+
+    def test_folds_values_into_buckets(self) -> None:
+        buffer = RingBuffer(10, 3)
+        for timestamp, value in ((0, 1), (5, 3), (12, 4), (25, 8)):
+            buffer.add(timestamp, value)
+        series = buffer.get()
+        self.assertEqual(list(series["time"]), [0, 10, 20])
+        self.assertEqual(list(series["min"]), [1, 4, 8])
+        self.assertEqual(list(series["max"]), [3, 4, 8])
+        self.assertEqual(list(series["avg"]), [2, 4, 8])
+        self.assertEqual(list(buffer.get(since=15)["time"]), [10, 20])
+
+    def test_overwrites_the_oldest_bucket_and_ignores_late_values(self) -> None:
+        buffer = RingBuffer(1, 2)
+        for timestamp in (0, 1, 2, 0.5):
+            buffer.add(timestamp, timestamp)
+        self.assertEqual(len(buffer), 2)
+        self.assertEqual(list(buffer.get()["time"]), [1, 2])
+        self.assertEqual(list(buffer.get()["count"]), [1, 1])
+
+
+@unittest.skipIf(telemetry.numpy is None, "numpy is not installed")
+class TelemetrySamplerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.cpu = 0.0
+        self.failing = False
+        self.api_driver = StubAPIDriver(self.handle)
+        self.sampler = TelemetrySampler(self.api_driver, tiers=[(60, 10), (10, 6)])
+
+    def handle(self, call: Call) -> Any:
+        if self.failing:
+            return StubResponse(None, 503)
+        if call.name == "nodes":
+            return {"nodes": [{"name": "node1", "cpu_used": self.cpu}, {"name": "node2", "cpu_used": 1.0}]}
+        return {"tasks": {"running": 2}}
+
+    def sample_at(self, timestamp: float) -> int:
+        with mock.patch("api.system.telemetry.time.time", return_value=timestamp):
+            return self.sampler.sample()
+
+    def test_sample_records_status_and_node_metrics(self) -> None:
+        self.assertEqual(self.sample_at(1000), 3)
+        self.assertEqual(self.sampler.nodes, [SYSTEM, "node1", "node2"])
+        self.assertEqual(self.sampler.get_metrics(), ["tasks.running"])
+        self.assertEqual(self.sampler.get_metrics("node1"), ["cpu_used"])
+
+    def test_failures_are_counted(self) -> None:
+        self.failing = True
+        self.assertEqual(self.sample_at(1000), 0)
+        self.assertEqual(self.sampler.failures, 2)
+        with self.assertRaises(TelemetryError):
+            self.sampler.get_series("cpu_used", "node1")
+
+    def test_queries_use_the_finest_tier_covering_the_window(self) -> None:
+        for step in range(6):
+            self.cpu = float(step)
+            self.sample_at(1000 + step * 10)
+        with mock.patch("api.system.telemetry.time.time", return_value=1050):
+            self.assertEqual(len(self.sampler.get_series("cpu_used", "node1", window=60)), 6)
+            self.assertEqual(len(self.sampler.get_series("cpu_used", "node1", window=600)), 2)
+            self.assertEqual(self.sampler.get_percentile("cpu_used", 50, "node1", window=60), 2.5)
+            rates = self.sampler.get_rate("cpu_used", "node1", window=60)[1]
+            maxima = self.sampler.get_rolling_percentile("cpu_used", 100, 3, "node1", window=60)[1]
+        self.assertEqual(list(rates), [0.1] * 5)
+        self.assertEqual(list(maxima), [2, 3, 4, 5])
+
+
+if __name__ == "__main__":
+    unittest.main()
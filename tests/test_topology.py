@@ -0,0 +1,122 @@
+"""Tests of api.sdis.topology"""
+from typing import Any
+
+import unittest
+from unittest import mock
+
+from api.sdis.topology import TopologyError, TopologyGraph, get_vlan_ids
+from settings.urls import APICategory
+from tests.fakes import Call, StubAPIDriver, StubResponse, get_page
+
+
+class GetVlanIdsTest(unittest.TestCase):
+
+    def test_reads_entries_and_skips_bad_ids(self) -> None:
+        self.assertEqual(get_vlan_ids([10, "20", {"vlan": 30}, {"id": "x"}, None]), frozenset({10, 20, 30}))
+        self.assertEqual(get_vlan_ids({"results": [{"vlan_id": 5}]}), frozenset({5}))
+
+
+class TopologyGraphTest(unittest.TestCase):
+    """lan and dmz are joined by router r1. r2 routes dmz but not iso, so lone on iso only reaches r2."""
+
+    def setUp(self) -> None:
+        self.networks = [{"id": "lan"}, {"id": "dmz"}, {"id": "iso"}]
+        self.machines = [{"id": "web"}, {"id": "db"}, {"id": "r1", "role": "router"}, {"id": "app"},
+                         {"id": "r2", "role": "router"}, {"id": "lone"}]
+        self.interfaces = {
+            "web": [{"id": "c1", "network": "lan", "vlans": [{"vlan": 10}]}],
+            "db": [{"id": "c2", "network": "lan"}],
+            "r1": [{"id": "c3", "network": "lan", "vlans": []}, {"id": "c4", "network": {"id": "dmz"}, "vlans": []}],
+            "app": [{"id": "c5", "network": "dmz", "vlans": []}, {"id": "c6", "network": None}],
+            "r2": [{"id": "c7", "network": "dmz", "vlans": []}, {"id": "c8", "network": "iso", "vlans": []}],
+            "lone": [{"id": "c9", "network": "iso", "vlans": []}],
+        }
+        self.vlans = {"c2": [{"vlan": 20}, {"vlan": 30}]}
+        self.router_interfaces = {"r1": [], "r2": [{"connection": "c8", "enabled": False}]}
+        self.failing = set()
+        self.api_driver = StubAPIDriver(self.handle)
+        self.graph = TopologyGraph(self.api_driver, 1, "sdi")
+
+    def handle(self, call: Call) -> Any:
+        if call.name in self.failing:
+            return StubResponse(None, 500)
+        if call.category == APICategory.NETWORKS:
+            if call.name == "detail":
+                return next(network for network in self.networks if network["id"] == call.url_args["network_id"])
+            if call.method == "PUT":
+                return None
+            return get_page(self.networks, call.body)
+        if call.category == APICategory.MACHINES:
+            return get_page(self.machines, call.body)
+        if call.category == APICategory.MACHINE_ROUTING:
+            return get_page(self.router_interfaces[call.url_args["machine_id"]], call.body)
+        if call.name == "vlan_list":
+            return get_page(self.vlans[call.url_args["connection_id"]], call.body)
+        if call.method == "PUT":
+            return None
+        return get_page(self.interfaces[call.url_args["machine_id"]], call.body)
+
+    @mock.patch("settings.general.PAGE_SIZE", 1)
+    def test_build_reads_every_page(self) -> None:
+        self.assertEqual(self.graph.build(), [])
+        self.assertEqual(len(self.graph), 9)
+        self.assertEqual(self.graph.get_attached("lan"), ["db", "r1", "web"])
+        self.assertEqual(self.graph.get_attached("dmz"), ["app", "r1", "r2"])
+
+    def test_get_reachable_crosses_routed_routers_only(self) -> None:
+        self.graph.build()
+        self.assertEqual(self.graph.get_reachable("web"), {"db", "r1", "app", "r2"})
+        self.assertEqual(self.graph.get_reachable("lone"), {"r2"})
+        self.assertEqual(self.graph.get_reachable("r2"), {"web", "db", "r1", "app", "lone"})
+        self.assertFalse(self.graph.can_reach("web", "lone"))
+
+    def test_get_reachable_over_a_vlan(self) -> None:
+        self.graph.build()
+        self.assertEqual(self.graph.get_reachable("web", vlan=10), {"r1", "app", "r2"})
+        self.assertEqual(self.graph.get_reachable("db", vlan=20), {"r1", "app", "r2"})
+        self.assertEqual(self.graph.get_reachable("db", vlan=10), set())
+
+    def test_get_path_is_a_shortest_path(self) -> None:
+        self.graph.build()
+        self.assertEqual(self.graph.get_path("web", "app"), ["web", "lan", "r1", "dmz", "app"])
+        self.assertIsNone(self.graph.get_path("web", "lone"))
+        with self.assertRaises(TopologyError):
+            self.graph.get_path("web", "nowhere")
+
+    def test_get_impact_of_removing_a_network(self) -> None:
+        self.graph.build()
+        impact = self.graph.get_impact("dmz")
+        self.assertEqual(impact["web"], {"app", "r2"})
+        self.assertEqual(impact["app"], {"web", "db", "r1", "r2"})
+        self.assertEqual(impact["r2"], {"web", "db", "r1", "app"})
+        self.assertNotIn("lone", impact)
+        self.assertEqual(self.graph.get_impact("iso"), {"r2": {"lone"}, "lone": {"r2"}})
+
+    def test_modify_interface_refreshes_the_machine(self) -> None:
+        self.graph.build()
+        self.interfaces["lone"] = [{"id": "c9", "network": "lan", "vlans": []}]
+        self.assertTrue(self.graph.modify_interface("lone", "c9", {"network": "lan"}).ok)
+        self.assertTrue(self.graph.can_reach("web", "lone"))
+        self.assertEqual(len(self.api_driver.get_calls("GET", "list")), 2 + 6 + 1)
+
+    def test_refresh_network_drops_removed_networks(self) -> None:
+        self.graph.build()
+        self.networks.pop()
+        self.failing.add("detail")
+        self.assertEqual(len(self.graph.refresh_network("iso")), 1)
+        self.failing.clear()
+        self.api_driver.handler = lambda call: StubResponse(None, 404) if call.name == "detail" else self.handle(call)
+        self.assertEqual(self.graph.refresh_network("iso"), [])
+        self.assertNotIn("iso", self.graph.networks)
+        self.assertEqual(self.graph.get_reachable("lone"), set())
+
+    def test_build_tolerates_missing_vlans_and_returns_failed_lists(self) -> None:
+        self.failing.add("vlan_list")
+        self.assertEqual(self.graph.build(), [])
+        self.assertEqual(self.graph.get_reachable("db", vlan=99), {"r1", "app", "r2"})
+        self.failing.add("list")
+        self.assertTrue(all(isinstance(result.error, TopologyError) for result in self.graph.build()))
+
+
+if __name__ == "__main__":
+    unittest.main()
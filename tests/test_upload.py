@@ -0,0 +1,131 @@
+"""Tests of api.storage.upload"""
+from typing import Any, List
+
+import io
+import unittest
+from unittest import mock
+
+from api.storage.upload import ChunkRejectedError, ChunkSizer, Uploader, UploadError, UploadStats
+from tests.fakes import StubResponse
+
+
+class StubStorageDriver:
+    """Storage driver look-alike answering chunks with the queued statuses, then 200"""
+
+    def __init__(self, *statuses: int, headers: dict = None) -> None:
+        self.statuses = list(statuses)
+        self.headers = headers
+        self.chunks = [] # type: List[bytes]
+        self.deleted = [] # type: List[Any]
+
+    def start_upload(self, data: dict) -> StubResponse:
+        return StubResponse({"key": "upload-1"})
+
+    def upload_chunk(self, key: Any, files: dict) -> StubResponse:
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status == 200:
+            self.chunks.append(files["file"][1])
+        return StubResponse(None, status, self.headers)
+
+    def finish_upload(self, key: Any) -> StubResponse:
+        return StubResponse({"key": key, "size": sum(len(chunk) for chunk in self.chunks)})
+
+    def delete_upload(self, key: Any) -> StubResponse:
+        self.deleted.append(key)
+        return StubResponse(None, 204)
+
+
+class ChunkSizerTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.sizer = ChunkSizer(4, min_size=2, max_size=64, target_seconds=1.0)
+
+    def test_doubles_until_the_first_backoff_then_grows_by_min_size(self) -> None:
+        self.sizer.record(4, 0.1, None)
+        self.assertEqual(self.sizer.size, 8)
+        self.sizer.record(8, 2.0, None)
+        self.assertEqual(self.sizer.size, 4)
+        self.sizer.record(4, 0.1, None)
+        self.assertEqual(self.sizer.size, 6)
+
+    def test_keeps_the_size_of_short_or_middling_chunks(self) -> None:
+        self.sizer.record(3, 0.1, None)
+        self.sizer.record(4, 0.7, None)
+        self.assertEqual(self.sizer.size, 4)
+
+    def test_grows_on_high_latency_links(self) -> None:
+        self.sizer.record(4, 0.7, 0.2)
+        self.assertEqual(self.sizer.size, 8)
+
+    def test_stays_within_bounds(self) -> None:
+        for _ in range(10):
+            self.sizer.backoff()
+        self.assertEqual(self.sizer.size, 2)
+        sizer = ChunkSizer(64, min_size=2, max_size=64, target_seconds=1.0)
+        sizer.record(64, 0.1, None)
+        self.assertEqual(sizer.size, 64)
+
+
+class UploadStatsTest(unittest.TestCase):
+
+    def test_rtt_is_the_intercept_of_chunk_times(self) -> None:
+        stats = UploadStats()
+        stats.record_chunk(1000, 0.2)
+        self.assertIsNone(stats.rtt)
+        stats.record_chunk(2000, 0.3)
+        self.assertAlmostEqual(stats.rtt, 0.1)
+        self.assertEqual(stats.bytes_sent, 3000)
+        self.assertAlmostEqual(stats.bandwidth, 6000)
+
+
+@mock.patch("api.storage.upload.time.sleep")
+class UploaderTest(unittest.TestCase):
+
+    def upload(self, storage_driver: StubStorageDriver, content: bytes, **kwargs: Any) -> Uploader:
+        uploader = Uploader(storage_driver, 4, **kwargs)
+        key = uploader.start({"name": "file", "size": len(content)})
+        uploader.send(key, io.BytesIO(content), "file", len(content))
+        return uploader
+
+    def test_sends_the_file_in_chunks(self, sleep: mock.Mock) -> None:
+        storage_driver = StubStorageDriver()
+        uploader = self.upload(storage_driver, b"0123456789")
+        self.assertEqual(storage_driver.chunks, [b"0123", b"4567", b"89"])
+        self.assertEqual(uploader.stats.chunks, 3)
+        sleep.assert_not_called()
+
+    def test_resends_refused_chunks_after_doubling_delays(self, sleep: mock.Mock) -> None:
+        storage_driver = StubStorageDriver(503, 429)
+        with mock.patch("settings.general.UPLOAD_RETRY_DELAY", 0.5):
+            uploader = self.upload(storage_driver, b"012345")
+        self.assertEqual(storage_driver.chunks, [b"0123", b"45"])
+        self.assertEqual(uploader.stats.retries, 2)
+        self.assertEqual([call[0][0] for call in sleep.call_args_list], [0.5, 1.0])
+
+    def test_waits_for_retry_after(self, sleep: mock.Mock) -> None:
+        storage_driver = StubStorageDriver(429, headers={"Retry-After": "7"})
+        self.upload(storage_driver, b"0123", adaptive=True)
+        sleep.assert_called_once_with(7.0)
+
+    def test_gives_up_after_retries(self, sleep: mock.Mock) -> None:
+        storage_driver = StubStorageDriver(503, 503, 503)
+        with self.assertRaises(ChunkRejectedError):
+            self.upload(storage_driver, b"0123", retries=2)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_never_resends_chunks_the_server_may_have_stored(self, sleep: mock.Mock) -> None:
+        storage_driver = StubStorageDriver(500)
+        with self.assertRaises(UploadError) as context:
+            self.upload(storage_driver, b"0123")
+        self.assertNotIsInstance(context.exception, ChunkRejectedError)
+        sleep.assert_not_called()
+
+    def test_get_retry_after_reads_seconds_and_dates(self, sleep: mock.Mock) -> None:
+        self.assertEqual(Uploader.get_retry_after(StubResponse(headers={"Retry-After": "3"})), 3.0)
+        self.assertEqual(Uploader.get_retry_after(StubResponse(headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})), 0.0)
+        self.assertIsNone(Uploader.get_retry_after(StubResponse(headers={"Retry-After": "soon"})))
+        self.assertIsNone(Uploader.get_retry_after(StubResponse()))
+
+
+if __name__ == "__main__":
+    unittest.main()
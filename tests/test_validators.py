@@ -0,0 +1,43 @@
+"""Tests of the ValidatorCache of api.driver"""
+import unittest
+
+from api.driver import ValidatorCache
+from tests.fakes import StubResponse
+
+
+class ValidatorCacheTest(unittest.TestCase):
+
+    def test_keeps_only_responses_with_a_validator(self) -> None:
+        cache = ValidatorCache(4)
+        cache.store(("disks/", None), StubResponse(headers={"ETag": "v1"}))
+        cache.store(("users/", None), StubResponse())
+        cache.store(("sdis/", None), StubResponse(headers={"ETag": "v1", "Cache-Control": "private, no-store"}))
+        cache.store(("tasks/", None), StubResponse(status_code=404, headers={"ETag": "v1"}))
+        self.assertEqual(len(cache), 1)
+        self.assertIsNotNone(cache.get(("disks/", None)))
+
+    def test_uncacheable_responses_forget_the_key(self) -> None:
+        cache = ValidatorCache(4)
+        cache.store(("disks/", None), StubResponse(headers={"Last-Modified": "Mon"}))
+        cache.store(("disks/", None), StubResponse())
+        self.assertIsNone(cache.get(("disks/", None)))
+
+    def test_evicts_the_least_recently_used(self) -> None:
+        cache = ValidatorCache(2)
+        for url in ("a", "b"):
+            cache.store((url, None), StubResponse(headers={"ETag": url}))
+        cache.get(("a", None))
+        cache.store(("c", None), StubResponse(headers={"ETag": "c"}))
+        self.assertIsNone(cache.get(("b", None)))
+        self.assertIsNotNone(cache.get(("a", None)))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_get_conditional_headers(self) -> None:
+        response = StubResponse(headers={"ETag": "\"v1\"", "Last-Modified": "Mon"})
+        self.assertEqual(ValidatorCache.get_conditional_headers(response), {"If-None-Match": "\"v1\"", "If-Modified-Since": "Mon"})
+        self.assertEqual(ValidatorCache.get_conditional_headers(StubResponse()), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
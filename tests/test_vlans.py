@@ -0,0 +1,83 @@
+"""Tests of api.sdis.vlans"""
+from typing import Any
+
+import unittest
+from unittest import mock
+
+from api.sdis.vlans import CREATE_PORT, CREATE_VLAN, DELETE_PORT, DELETE_VLAN, VLANConfigurator, VLANError
+from tests.fakes import Call, StubAPIDriver, StubResponse, get_page
+
+
+class VLANConfiguratorTest(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.vlans = {("m1", "c1"): [{"id": 101, "vlan": 10}, {"id": 102, "vlan": 20}, {"id": 103, "tag": "bad"}],
+                      ("m1", "c2"): [], ("m2", "c3"): [{"id": 301, "vlan_id": 30}]}
+        self.ports = {101: [{"id": 1, "port": 80}, {"id": 2, "port": 443}], 102: [{"id": 3, "name": "22"}], 301: []}
+        self.failing = set()
+        self.api_driver = StubAPIDriver(self.handle)
+        self.configurator = VLANConfigurator(self.api_driver, 1, "sdi")
+
+    def handle(self, call: Call) -> Any:
+        if call.name in self.failing:
+            return StubResponse(None, 500)
+        if call.method == "POST":
+            return StubResponse({"id": 500 + call.body.get("vlan", 0)}, 201) if call.name == "vlan_list" else StubResponse({}, 201)
+        if call.method == "DELETE":
+            return StubResponse(None, 204)
+        if call.name == "vlan_list":
+            return get_page(self.vlans[(call.url_args["machine_id"], call.url_args["connection_id"])], call.body)
+        return get_page(self.ports[call.url_args["vlan_id"]], call.body)
+
+    def summarize(self, changes: Any) -> Any:
+        return [(change.action, change.machine_id, change.conn_id, change.vlan, change.port) for change in changes]
+
+    @mock.patch("settings.general.PAGE_SIZE", 1)
+    def test_plan_reads_every_page_and_compares_ports_as_strings(self) -> None:
+        desired = {"m1": {"c1": {10: [80, 8080], "20": ["22"]}, "c2": {40: [1]}}, "m2": {"c3": {}}}
+        changes, failed = self.configurator.plan(desired)
+        self.assertEqual(failed, [])
+        self.assertEqual(sorted(self.summarize(changes), key=repr), sorted([
+            (DELETE_PORT, "m1", "c1", 10, "443"),
+            (CREATE_PORT, "m1", "c1", 10, 8080),
+            (CREATE_VLAN, "m1", "c2", 40, None),
+            (CREATE_PORT, "m1", "c2", 40, 1),
+            (DELETE_VLAN, "m2", "c3", 30, None),
+        ], key=repr))
+        delete = next(change for change in changes if change.action == DELETE_PORT)
+        self.assertEqual((delete.vlan_pk, delete.port_pk), (101, 2))
+
+    def test_plan_without_prune_only_creates(self) -> None:
+        changes, _ = self.configurator.plan({"m1": {"c1": {10: [80, 81]}}, "m2": {"c3": {}}}, prune=False)
+        self.assertEqual(self.summarize(changes), [(CREATE_PORT, "m1", "c1", 10, 81)])
+        self.assertEqual(changes[0].vlan_pk, 101)
+
+    def test_plan_skips_interfaces_whose_fetch_failed(self) -> None:
+        self.failing.add("vlan_port_list")
+        changes, failed = self.configurator.plan({"m1": {"c1": {10: []}, "c2": {40: []}}})
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(self.summarize(changes), [(CREATE_VLAN, "m1", "c2", 40, None)])
+
+    def test_plan_fetches_ports_of_kept_vlans_only(self) -> None:
+        self.configurator.plan({"m1": {"c1": {10: [80]}}})
+        self.assertEqual([call.url_args["vlan_id"] for call in self.api_driver.get_calls("GET", "vlan_port_list")], [101])
+
+    def test_push_runs_phases_in_order_and_uses_created_vlans(self) -> None:
+        results = self.configurator.apply({"m1": {"c1": {10: [80]}, "c2": {40: [1]}}})
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual([(call.method, call.name) for call in self.api_driver.get_calls() if call.method != "GET"], [
+            ("DELETE", "vlan_port_detail"), ("DELETE", "vlan_detail"), ("POST", "vlan_list"), ("POST", "vlan_port_list")])
+        port = self.api_driver.get_calls("POST", "vlan_port_list")[0]
+        self.assertEqual((port.url_args["vlan_id"], port.body), (540, {"port": 1}))
+
+    def test_ports_of_failed_vlans_are_not_pushed(self) -> None:
+        self.api_driver.handler = lambda call: (StubResponse(None, 500) if call.method == "POST" and call.name == "vlan_list"
+                                                else self.handle(call))
+        results = self.configurator.apply({"m1": {"c2": {40: [1]}}})
+        self.assertEqual([result.ok for result in results], [False, False])
+        self.assertIsInstance(results[1].error, VLANError)
+        self.assertEqual(self.api_driver.get_calls("POST", "vlan_port_list"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()